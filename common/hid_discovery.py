@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Cached sysfs discovery for the ROG Flow Z13 keyboard
+Resolves vendor:product to its hidraw nodes, USB port and interface numbers
+without hidapi enumerating every HID device or reading every USB device's
+idVendor/idProduct. Results are cached, checked against sysfs when used,
+rescanned (at most once a second) when a device is not in them, and
+dropped on hotplug add/remove uevents.
+
+Shared by keyboard_controller.py, the resume fix daemon and the diagnostics.
+
+    python3 hid_discovery.py            # list the keyboard's interfaces
+    python3 hid_discovery.py 0b05:19b6  # another device
+"""
+
+import argparse
+import glob
+import os
+import threading
+import time
+
+HIDRAW_CLASS = "class/hidraw"
+USB_DEVICES = "bus/usb/devices"
+# Usage Page (0xFF31), the ASUS vendor page Aura reports are sent to
+AURA_USAGE_PAGE = b"\x06\x31\xff"
+# Seconds between rescans for a device that was not found
+MISS_RESCAN_INTERVAL = 1.0
+
+
+def read_attribute(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def parse_hid_id(name):
+    """(vendor, product) from a HID device name such as 0003:0B05:1A30.0001, or None"""
+    parts = name.split(".")[0].split(":")
+    if len(parts) != 3:
+        return None
+    try:
+        return int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+
+
+class HidInterface:
+    """One HID interface of a USB device and its hidraw node"""
+
+    def __init__(self, hidraw, path, target, port, interface):
+        self.hidraw = hidraw
+        self.path = path
+        # Where /sys/class/hidraw/<hidraw> pointed when scanned; the HID
+        # device name in it changes whenever the device is re-probed
+        self.target = target
+        self.port = port
+        self.interface = interface
+        self._aura = None
+
+    @property
+    def node(self):
+        return f"/dev/{self.hidraw}"
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def aura(self):
+        """Whether the report descriptor is on the ASUS vendor usage page"""
+        if self._aura is None:
+            try:
+                with open(os.path.join(self.path, "report_descriptor"), "rb") as f:
+                    self._aura = AURA_USAGE_PAGE in f.read()
+            except OSError:
+                self._aura = False
+        return self._aura
+
+    def __repr__(self):
+        return f"HidInterface({self.node}, port {self.port}, interface {self.interface})"
+
+
+class DeviceIndex:
+    """Map vendor:product to hidraw interfaces and USB ports, scanned once
+
+    A cached entry is used only while its sysfs link still points where it
+    did, so a replugged or re-probed device is found again. A device that is
+    not cached triggers a rescan, at most once per MISS_RESCAN_INTERVAL so
+    repeated lookups of an absent device stay cheap. on_uevent() drops the
+    cache for hotplug add and remove events.
+    """
+
+    def __init__(self, sysfs_root="/sys", clock=time.monotonic):
+        self.root = sysfs_root
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.interfaces = None
+        self.ports = None
+        # When each table was last scanned
+        self.interfaces_time = None
+        self.ports_time = None
+        # Full scans of sysfs, for tests and benchmarks
+        self.scans = 0
+
+    def _scan_hidraw(self):
+        """Read every hidraw link once; the link target names the HID
+        device, its USB interface and port, so nothing else is read"""
+        self.scans += 1
+        found = {}
+        directory = os.path.join(self.root, HIDRAW_CLASS)
+        try:
+            entries = sorted(os.listdir(directory))
+        except OSError:
+            return found
+        for entry in entries:
+            link = os.path.join(directory, entry)
+            try:
+                target = os.readlink(link)
+            except OSError:
+                continue
+            # .../<port>/<port>:<config>.<interface>/<bus>:<vendor>:<product>.<n>/hidraw/hidrawN
+            parts = target.split("/")
+            if len(parts) < 4:
+                continue
+            ids = parse_hid_id(parts[-3])
+            # Only USB HID devices (bus 0003) have a port and interface number
+            if ids is None or not parts[-3].startswith("0003:"):
+                continue
+            port, _, config = parts[-4].partition(":")
+            try:
+                number = int(config.rpartition(".")[2])
+            except ValueError:
+                continue
+            path = os.path.normpath(os.path.join(directory, target, "..", ".."))
+            found.setdefault(ids, []).append(HidInterface(entry, path, target, port, number))
+        for interfaces in found.values():
+            interfaces.sort(key=lambda i: i.interface)
+        return found
+
+    def _scan_usb(self):
+        self.scans += 1
+        found = {}
+        for path in sorted(glob.glob(os.path.join(self.root, USB_DEVICES, "*"))):
+            vendor = read_attribute(os.path.join(path, "idVendor"))
+            product = read_attribute(os.path.join(path, "idProduct"))
+            if vendor and product:
+                found.setdefault((int(vendor, 16), int(product, 16)), os.path.basename(path))
+        return found
+
+    def _hidraw_valid(self, interface):
+        try:
+            return os.readlink(os.path.join(self.root, HIDRAW_CLASS, interface.hidraw)) == interface.target
+        except OSError:
+            return False
+
+    def _usb_valid(self, key, name):
+        path = os.path.join(self.root, USB_DEVICES, name)
+        ids = (read_attribute(os.path.join(path, "idVendor")),
+               read_attribute(os.path.join(path, "idProduct")))
+        return ids == (f"{key[0]:04x}", f"{key[1]:04x}")
+
+    def _stale_miss(self, scanned):
+        """Whether a lookup that missed may rescan a table scanned at scanned"""
+        return self.clock() - scanned >= MISS_RESCAN_INTERVAL
+
+    def hid_interfaces(self, vendor, product):
+        """HidInterfaces of vendor:product, ordered by interface number"""
+        key = (vendor, product)
+        with self.lock:
+            cached = self.interfaces.get(key) if self.interfaces is not None else None
+            if (self.interfaces is None or (cached and not all(map(self._hidraw_valid, cached)))
+                    or (not cached and self._stale_miss(self.interfaces_time))):
+                self.interfaces = self._scan_hidraw()
+                self.interfaces_time = self.clock()
+            return list(self.interfaces.get(key, []))
+
+    def aura_interface(self, vendor, product, port=None):
+        """The interface Aura reports go to: the first one on the ASUS
+        vendor usage page, else the first one; None if not attached
+
+        With several devices of the same product, port picks one of them.
+        """
+        interfaces = [i for i in self.hid_interfaces(vendor, product) if port is None or i.port == port]
+        for interface in interfaces:
+            if interface.aura:
+                return interface
+        return interfaces[0] if interfaces else None
+
+    def aura_interfaces(self, vendor):
+        """((vendor, product), HidInterface) for every interface of vendor
+        on the ASUS vendor usage page, ordered by product and port"""
+        with self.lock:
+            if self.interfaces is None:
+                self.interfaces = self._scan_hidraw()
+                self.interfaces_time = self.clock()
+            found = [(key, interface) for key, interfaces in self.interfaces.items()
+                     if key[0] == vendor for interface in interfaces]
+        found.sort(key=lambda f: (f[0], f[1].port, f[1].interface))
+        return [(key, interface) for key, interface in found if interface.aura]
+
+    def usb_port(self, vendor, product):
+        """USB device name (such as "1-5") for vendor:product, or None
+
+        Read from the USB devices rather than hidraw, so a device whose
+        HID driver failed to probe is still found.
+        """
+        key = (vendor, product)
+        with self.lock:
+            name = self.ports.get(key) if self.ports is not None else None
+            if (self.ports is None or (name and not self._usb_valid(key, name))
+                    or (not name and self._stale_miss(self.ports_time))):
+                self.ports = self._scan_usb()
+                self.ports_time = self.clock()
+            return self.ports.get(key)
+
+    def on_uevent(self, action, subsystem):
+        """Drop cached results when a USB, HID or hidraw device comes or goes"""
+        if action in ("add", "remove") and subsystem in ("usb", "hid", "hidraw"):
+            self.invalidate()
+
+    def invalidate(self):
+        with self.lock:
+            self.interfaces = None
+            self.ports = None
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def shared_index(sysfs_root="/sys"):
+    """The process-wide DeviceIndex for sysfs_root"""
+    with _indexes_lock:
+        if sysfs_root not in _indexes:
+            _indexes[sysfs_root] = DeviceIndex(sysfs_root)
+        return _indexes[sysfs_root]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the hidraw nodes and USB port of a HID device")
+    parser.add_argument("device", nargs="?", default="0b05:1a30", help="vendor:product (default: 0b05:1a30)")
+    parser.add_argument("--sysfs", default="/sys", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    vendor, product = (int(part, 16) for part in args.device.split(":"))
+    index = DeviceIndex(args.sysfs)
+    port = index.usb_port(vendor, product)
+    interfaces = index.hid_interfaces(vendor, product)
+    if port is None and not interfaces:
+        print(f"{args.device} not found")
+        return
+    print(f"{args.device} on USB port {port or 'unknown'}")
+    aura = index.aura_interface(vendor, product)
+    for interface in interfaces:
+        marker = "  <- Aura" if interface is aura else ""
+        print(f"  interface {interface.interface}: {interface.node} ({interface.name}){marker}")
+
+
+if __name__ == "__main__":
+    main()
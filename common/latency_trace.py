@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Opt-in latency tracing from a UI event to its completion
+Each traced change carries timestamps for the stages it passes through
+(signal, enqueue, then e.g. encode and write for the RGB tools, or the
+asusctl exit or asusd reply for the AsusCtrl GUI); the time between stages
+is collected and exported as p50/p95/p99 to a JSON file or a Prometheus
+textfile. Each program picks its metric name and environment variable:
+
+    ROG_RGB_TRACE=/tmp/rgb-latency.json python3 keyboard_rgb.py gui
+    ASUSCTRL_TRACE=/var/lib/node_exporter/textfile/asusctrl.prom python3 asusctrl_gui.py
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Samples kept per stage; older ones fall out
+MAX_SAMPLES = 5000
+# Minimum seconds between exports while traces keep finishing
+EXPORT_INTERVAL = 5.0
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class Trace:
+    """Timestamps of one change as it moves through the stages"""
+
+    __slots__ = ("tracer", "source", "stages")
+
+    def __init__(self, tracer, source):
+        self.tracer = tracer
+        self.source = source
+        self.stages = [("signal", time.perf_counter())]
+
+    def mark(self, stage):
+        self.stages.append((stage, time.perf_counter()))
+
+    def finish(self, stage):
+        """Mark the final stage and hand the trace to the tracer"""
+        self.mark(stage)
+        self.tracer.record(self)
+
+    def drop(self):
+        """The change was superseded before it completed"""
+        with self.tracer.lock:
+            self.tracer.dropped += 1
+
+    def total(self):
+        return self.stages[-1][1] - self.stages[0][1]
+
+
+class LatencyTracer:
+    """Collect stage latencies and export them
+
+    begin() returns None when tracing is off, so call sites cost a single
+    truth test. path ending in .prom selects the Prometheus textfile format.
+    """
+
+    def __init__(self, metric, path=None):
+        self.metric = metric
+        self.path = path
+        self.samples = {}
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.last_export = 0.0
+
+    def begin(self, source):
+        if not self.path:
+            return None
+        return Trace(self, source)
+
+    def record(self, trace):
+        with self.lock:
+            previous = trace.stages[0][1]
+            for stage, t in trace.stages[1:]:
+                self._add(stage, t - previous)
+                previous = t
+            self._add("total", trace.total())
+            due = time.monotonic() - self.last_export >= EXPORT_INTERVAL
+        if due:
+            self.export()
+
+    def _add(self, stage, seconds):
+        if stage not in self.samples:
+            self.samples[stage] = deque(maxlen=MAX_SAMPLES)
+        self.samples[stage].append(seconds)
+
+    def summary(self):
+        """{stage: {"count", "sum", "p50", "p95", "p99"}} in seconds"""
+        with self.lock:
+            snapshot = {stage: sorted(values) for stage, values in self.samples.items()}
+        result = {}
+        for stage, values in snapshot.items():
+            stats = {"count": len(values), "sum": sum(values)}
+            for q in QUANTILES:
+                stats[f"p{int(q * 100)}"] = percentile(values, q)
+            result[stage] = stats
+        return result
+
+    def prometheus(self):
+        summary = self.summary()
+        lines = [
+            f"# HELP {self.metric}_latency_seconds Latency from UI event to completion, per stage",
+            f"# TYPE {self.metric}_latency_seconds summary",
+        ]
+        for stage, stats in summary.items():
+            for q in QUANTILES:
+                lines.append(f'{self.metric}_latency_seconds{{stage="{stage}",quantile="{q}"}} '
+                             f'{stats[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'{self.metric}_latency_seconds_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+            lines.append(f'{self.metric}_latency_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        lines.append(f"# HELP {self.metric}_superseded_total Changes superseded before they completed")
+        lines.append(f"# TYPE {self.metric}_superseded_total counter")
+        with self.lock:
+            lines.append(f"{self.metric}_superseded_total {self.dropped}")
+        return "\n".join(lines) + "\n"
+
+    def export(self):
+        """Write the current percentiles to path, atomically"""
+        if not self.path:
+            return
+        self.last_export = time.monotonic()
+        if self.path.endswith(".prom"):
+            data = self.prometheus()
+        else:
+            with self.lock:
+                dropped = self.dropped
+            data = json.dumps({"stages": self.summary(), "superseded": dropped}, indent=1)
+        try:
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Could not write latency trace: {e}")
+
+
+_tracers = {}
+_tracers_lock = threading.Lock()
+
+
+def shared_tracer(metric, env):
+    """The process-wide LatencyTracer for metric, writing to the file named by $env"""
+    with _tracers_lock:
+        if metric not in _tracers:
+            _tracers[metric] = LatencyTracer(metric, os.environ.get(env))
+        return _tracers[metric]
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+ASUS HID resume fix daemon for the ROG Flow Z13
+Waits for logind's PrepareForSleep signal, then watches the keyboard
+(0b05:1a30) come back through kernel uevents. The USB device is only
+unbound and rebound if it is still broken once the kernel has had its
+chance, and the time from resume to a usable keyboard is logged.
+
+    sudo python3 asus_resume_fix.py           # run as a daemon
+    sudo python3 asus_resume_fix.py --check   # probe now, reset only if broken
+"""
+
+import argparse
+import glob
+import os
+import select
+import socket
+import subprocess
+import sys
+import time
+
+# hid_discovery is shared with the RGB tools; the installer copies it next to this file
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "rog_flow_keyboard_color"))
+from hid_discovery import DeviceIndex
+
+VENDOR_ID = 0x0B05
+PRODUCT_ID = 0x1A30
+
+# sysfs paths, relative to the sysfs root
+USB_DEVICES = "bus/usb/devices"
+USB_UNBIND = "bus/usb/drivers/usb/unbind"
+USB_BIND = "bus/usb/drivers/usb/bind"
+
+# How long the kernel gets to bring the device back on its own after resume
+SETTLE_TIMEOUT = 3.0
+# How long a rebind (and then a hid_multitouch reload) gets to fix it
+RESET_TIMEOUT = 5.0
+
+NETLINK_KOBJECT_UEVENT = 15
+KERNEL_GROUP = 1
+LOGIND_MONITOR = ["gdbus", "monitor", "--system", "--dest", "org.freedesktop.login1",
+                  "--object-path", "/org/freedesktop/login1"]
+
+IDLE = "idle"
+SETTLING = "settling"
+REBINDING = "rebinding"
+RELOADING = "reloading"
+
+
+def parse_uevent(data):
+    """Return (action, devpath, props) for a kernel uevent, or None"""
+    parts = data.split(b"\0")
+    header = parts[0].decode(errors="replace")
+    if "@" not in header:
+        # udev's own re-broadcasts start with "libudev"
+        return None
+    action, devpath = header.split("@", 1)
+    props = {}
+    for part in parts[1:]:
+        key, sep, value = part.decode(errors="replace").partition("=")
+        if sep:
+            props[key] = value
+    return action, devpath, props
+
+
+def parse_sleep_signal(line):
+    """True/False for a PrepareForSleep line from gdbus monitor, else None"""
+    if "PrepareForSleep" not in line:
+        return None
+    return "true" in line.split("PrepareForSleep", 1)[1]
+
+
+def probe(sysfs_root, name):
+    """Return None if the device is usable, else what is wrong with it
+
+    Usable means every interface and every HID device under it is bound to
+    a driver, and at least one hidraw node exists.
+    """
+    if name is None:
+        return "not found"
+    device = os.path.join(sysfs_root, USB_DEVICES, name)
+    interfaces = sorted(glob.glob(os.path.join(device, f"{name}:*")))
+    if not interfaces:
+        return "no interfaces"
+    for interface in interfaces:
+        if not os.path.exists(os.path.join(interface, "driver")):
+            return f"{os.path.basename(interface)} has no driver"
+        for hid in glob.glob(os.path.join(interface, "????:????:????.*")):
+            if not os.path.exists(os.path.join(hid, "driver")):
+                return f"{os.path.basename(hid)} has no driver"
+    if not glob.glob(os.path.join(device, "*", "*", "hidraw", "hidraw*")):
+        return "no hidraw node"
+    return None
+
+
+class ResumeFixer:
+    """State machine from resume to a usable keyboard
+
+    Fed with on_sleep() and on_uevent(); the caller calls on_timeout() once
+    timeout() seconds have passed without an event. Nothing sleeps: each
+    step waits for the kernel's uevents or its deadline.
+    """
+
+    def __init__(self, sysfs_root="/sys", vendor=VENDOR_ID, product=PRODUCT_ID,
+                 clock=time.monotonic, run=subprocess.run):
+        self.sysfs_root = sysfs_root
+        self.vendor = vendor
+        self.product = product
+        self.clock = clock
+        self.run = run
+        self.index = DeviceIndex(sysfs_root)
+        self.state = IDLE
+        self.name = None
+        self.resumed_at = None
+        self.deadline = None
+        self.resets = 0
+        # (milliseconds from resume to usable, whether a reset was needed)
+        self.results = []
+
+    def timeout(self):
+        """Seconds until on_timeout() is due, or None while idle"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self.clock())
+
+    def on_sleep(self, going_down):
+        if going_down:
+            self.state = IDLE
+            self.deadline = None
+            print("Suspending")
+            return
+        self.resumed_at = self.clock()
+        self.resets = 0
+        self._wait(SETTLING, SETTLE_TIMEOUT)
+        self.check()
+
+    def on_uevent(self, action, devpath, props):
+        self.index.on_uevent(action, props.get("SUBSYSTEM", ""))
+        if self.state == IDLE:
+            return
+        if self.name is None or f"/{self.name}/" in devpath + "/":
+            self.check()
+
+    def on_timeout(self):
+        if self.state == SETTLING:
+            self.reset()
+        elif self.state == REBINDING:
+            print(f"Still broken after rebinding ({probe(self.sysfs_root, self.name)}), "
+                  "reloading hid_multitouch")
+            self.run(["modprobe", "-r", "hid_multitouch"], check=False)
+            self.run(["modprobe", "hid_multitouch"], check=False)
+            self._wait(RELOADING, RESET_TIMEOUT)
+            self.check()
+        elif self.state == RELOADING:
+            print(f"Giving up: keyboard still broken ({probe(self.sysfs_root, self.name)})")
+            self._wait(IDLE, None)
+
+    def check(self):
+        """Finish if the device is usable now"""
+        self.name = self.index.usb_port(self.vendor, self.product)
+        problem = probe(self.sysfs_root, self.name)
+        if problem is not None:
+            return False
+        if self.state != IDLE:
+            ms = (self.clock() - self.resumed_at) * 1000
+            self.results.append((ms, self.resets > 0))
+            print(f"Keyboard usable {ms:.0f} ms after resume"
+                  f"{' (after reset)' if self.resets else ' (no reset needed)'}")
+            if self.resets:
+                # The backlight LED class device was re-created; let udev apply its rules
+                self.run(["udevadm", "trigger", "--subsystem-match=leds"], check=False)
+            self._wait(IDLE, None)
+        return True
+
+    def reset(self):
+        """Unbind and rebind the USB device; the bind uevent re-checks it"""
+        self.name = self.index.usb_port(self.vendor, self.product)
+        if self.name is None:
+            print(f"ASUS HID device {self.vendor:04x}:{self.product:04x} not found")
+            self._wait(IDLE, None)
+            return
+        print(f"Resetting ASUS HID device {self.name}: {probe(self.sysfs_root, self.name)}")
+        self.resets += 1
+        self._wait(REBINDING, RESET_TIMEOUT)
+        for attribute in (USB_UNBIND, USB_BIND):
+            try:
+                with open(os.path.join(self.sysfs_root, attribute), "w") as f:
+                    f.write(self.name)
+            except OSError as e:
+                print(f"Could not write {attribute}: {e}")
+        self.check()
+
+    def _wait(self, state, seconds):
+        self.state = state
+        self.deadline = self.clock() + seconds if seconds is not None else None
+
+
+def uevent_socket():
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+    sock.bind((0, KERNEL_GROUP))
+    return sock
+
+
+def serve(fixer, uevents, sleep_signals):
+    """Feed fixer from a uevent socket and a pipe of gdbus monitor output"""
+    pending = b""
+    while True:
+        readable, _, _ = select.select([uevents, sleep_signals], [], [], fixer.timeout())
+        if not readable:
+            fixer.on_timeout()
+            continue
+        if uevents in readable:
+            event = parse_uevent(uevents.recv(65536))
+            if event:
+                fixer.on_uevent(*event)
+        if sleep_signals in readable:
+            # Read the fd directly: a buffered readline would hide lines from select
+            data = os.read(sleep_signals.fileno(), 4096)
+            if not data:
+                print("logind monitor exited")
+                return
+            *lines, pending = (pending + data).split(b"\n")
+            for line in lines:
+                going_down = parse_sleep_signal(line.decode(errors="replace"))
+                if going_down is not None:
+                    fixer.on_sleep(going_down)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reset the ASUS keyboard after resume, only when needed")
+    parser.add_argument("--check", action="store_true",
+                        help="probe the keyboard now and reset it if it is broken")
+    parser.add_argument("--sysfs", default="/sys", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if os.geteuid() != 0 and args.sysfs == "/sys":
+        print("This needs root to rebind USB devices. Try running with sudo.")
+        sys.exit(1)
+
+    # Line-buffered so the journal sees each message as it happens
+    sys.stdout.reconfigure(line_buffering=True)
+    fixer = ResumeFixer(args.sysfs)
+    uevents = uevent_socket()
+
+    if args.check:
+        fixer.on_sleep(False)
+        if fixer.state == SETTLING:
+            # Broken right now: no point waiting for the kernel
+            fixer.on_timeout()
+        while fixer.state != IDLE:
+            readable, _, _ = select.select([uevents], [], [], fixer.timeout())
+            if readable:
+                event = parse_uevent(uevents.recv(65536))
+                if event:
+                    fixer.on_uevent(*event)
+            else:
+                fixer.on_timeout()
+        return
+
+    try:
+        logind = subprocess.Popen(LOGIND_MONITOR, stdout=subprocess.PIPE)
+    except OSError as e:
+        print(f"Could not watch logind: {e}")
+        sys.exit(1)
+    print(f"Watching for resume; keyboard is {fixer.index.usb_port(VENDOR_ID, PRODUCT_ID) or 'not present'}")
+    try:
+        serve(fixer, uevents, logind.stdout)
+    except KeyboardInterrupt:
+        pass
+    logind.terminate()
+
+
+if __name__ == "__main__":
+    main()
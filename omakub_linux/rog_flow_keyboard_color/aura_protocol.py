@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+ASUS Aura HID report encoder for the ROG Flow Z13 keyboard
+Shared by the GUIs and the HID test script
+
+Every report is 65 bytes: report ID 0x00 followed by the 64-byte packet
+    0x5d, mode, zone, 0x00, R, G, B, speed, direction, 0x00 ... 0x00
+
+Zone 0 addresses the whole keyboard; zones 1-4 address the keyboard's
+lighting zones on models that have them, numbered as asusd numbers them.
+"""
+
+# Report layout
+REPORT_ID = 0x00
+PACKET_SIZE = 64
+REPORT_SIZE = PACKET_SIZE + 1
+COMMAND = 0x5d
+
+# Byte offsets inside the full report (after the report ID)
+OFFSET_MODE = 2
+OFFSET_ZONE = 3
+OFFSET_RED = 5
+OFFSET_GREEN = 6
+OFFSET_BLUE = 7
+OFFSET_SPEED = 8
+OFFSET_DIRECTION = 9
+
+# Modes
+MODE_INIT = 0x01
+MODE_STATIC = 0xb3
+MODE_BREATHE = 0xb4
+MODE_RAINBOW = 0xb5
+MODE_PULSE = 0xbc
+
+# The apply/commit packet shares its mode byte with rainbow
+MODE_APPLY = MODE_RAINBOW
+
+# Zones
+ZONE_ALL = 0x00
+ZONE_KEY1 = 0x01
+ZONE_KEY2 = 0x02
+ZONE_KEY3 = 0x03
+ZONE_KEY4 = 0x04
+ZONE_LOGO = 0x05
+ZONE_BAR_LEFT = 0x06
+ZONE_BAR_RIGHT = 0x07
+KEYBOARD_ZONES = (ZONE_KEY1, ZONE_KEY2, ZONE_KEY3, ZONE_KEY4)
+
+SPEED_MEDIUM = 0xeb
+
+
+def build_template(mode, speed=SPEED_MEDIUM):
+    """Build a fresh report for mode with all color bytes zeroed"""
+    report = bytearray(REPORT_SIZE)
+    report[0] = REPORT_ID
+    report[1] = COMMAND
+    report[OFFSET_MODE] = mode
+    report[OFFSET_SPEED] = speed
+    return report
+
+
+class AuraEncoder:
+    """Encode Aura reports into preallocated per-mode buffers
+
+    Each call patches the mode's buffer in place and returns it, ready to
+    pass to hid.device.write. The returned buffer is reused by the next
+    call for the same mode, so an encoder must only be used from the thread
+    that writes to the device.
+    """
+
+    def __init__(self):
+        self.reports = {
+            MODE_STATIC: build_template(MODE_STATIC),
+            MODE_BREATHE: build_template(MODE_BREATHE),
+            MODE_PULSE: build_template(MODE_PULSE),
+            MODE_RAINBOW: build_template(MODE_RAINBOW),
+            MODE_INIT: build_template(MODE_INIT, speed=0x00),
+        }
+        self.views = {mode: memoryview(report) for mode, report in self.reports.items()}
+        # The bare apply packet must stay all zeroes after the mode byte
+        self.apply_report = build_template(MODE_APPLY, speed=0x00)
+
+    def encode(self, mode, r=0, g=0, b=0, speed=SPEED_MEDIUM, direction=0, zone=ZONE_ALL):
+        """Patch the report for mode and return it"""
+        view = self.views[mode]
+        view[OFFSET_ZONE] = zone
+        view[OFFSET_RED] = r
+        view[OFFSET_GREEN] = g
+        view[OFFSET_BLUE] = b
+        view[OFFSET_SPEED] = speed
+        view[OFFSET_DIRECTION] = direction
+        return self.reports[mode]
+
+    def static(self, r, g, b, zone=ZONE_ALL):
+        """Static color report"""
+        return self.encode(MODE_STATIC, r, g, b, SPEED_MEDIUM, 0, zone)
+
+    def breathe(self, r, g, b, speed=SPEED_MEDIUM, zone=ZONE_ALL):
+        """Breathing effect report"""
+        return self.encode(MODE_BREATHE, r, g, b, speed, 0, zone)
+
+    def pulse(self, r, g, b, speed=SPEED_MEDIUM, zone=ZONE_ALL):
+        """Pulse effect report"""
+        return self.encode(MODE_PULSE, r, g, b, speed, 0, zone)
+
+    def rainbow(self, speed=SPEED_MEDIUM, direction=0, zone=ZONE_ALL):
+        """Rainbow cycle report"""
+        return self.encode(MODE_RAINBOW, 0, 0, 0, speed, direction, zone)
+
+    def init(self):
+        """Initialization report"""
+        return self.reports[MODE_INIT]
+
+    def apply(self):
+        """Apply/commit report"""
+        return self.apply_report
+
+
+class ZoneFrame:
+    """The state last sent to each zone, so updates only emit what changed
+
+    A state is any comparable value describing a zone's effect, e.g.
+    ("static", (r, g, b)). Setting ZONE_ALL sets every zone at once.
+    """
+
+    def __init__(self, zones=KEYBOARD_ZONES):
+        self.zones = tuple(zones)
+        self.state = dict.fromkeys(self.zones)
+
+    def update(self, zone, state):
+        """Record state for zone; returns False if it is already showing it"""
+        targets = self.zones if zone == ZONE_ALL else (zone,)
+        if all(self.state.get(z) == state for z in targets):
+            return False
+        for z in targets:
+            self.state[z] = state
+        return True
+
+    def diff(self, states):
+        """Record {zone: state} and return the zones that changed, in order"""
+        return [zone for zone, state in states.items() if self.update(zone, state)]
+
+    def invalidate(self):
+        """Forget what was sent, e.g. after something else changed the lighting"""
+        self.state = dict.fromkeys(self.zones)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the Aura report encoder
+Compares encodes/sec of aura_protocol against the old per-call list building
+"""
+
+import sys
+import time
+import tracemalloc
+
+from aura_protocol import AuraEncoder
+
+
+def legacy_static(r, g, b):
+    """Report building as KeyboardController.set_static_color used to do it"""
+    packet = [
+        0x5d, 0xb3, 0x00, 0x00,
+        r, g, b,
+        0xeb, 0x00, 0x00,
+        0x00, 0x00, 0x00, 0x00, 0x00, 0x00
+    ]
+    packet += [0x00] * (64 - len(packet))
+    return [0x00] + packet
+
+
+def run(encode, iterations):
+    """Return encodes/sec for encode over iterations calls"""
+    start = time.perf_counter()
+    for i in range(iterations):
+        encode(i & 0xff, 0x80, 0xff - (i & 0xff))
+    return iterations / (time.perf_counter() - start)
+
+
+def allocations(encode, iterations=1000):
+    """Return memory blocks still allocated per call after iterations calls"""
+    encode(1, 2, 3)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    reports = [encode(i & 0xff, 0, 0) for i in range(iterations)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del reports
+    stats = after.compare_to(before, "filename")
+    return sum(stat.count_diff for stat in stats) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print("Aura Report Encoder Benchmark")
+    print("=" * 50)
+
+    encoder = AuraEncoder()
+    if bytes(encoder.static(1, 2, 3)) != bytes(legacy_static(1, 2, 3)):
+        print("Encoded report does not match the legacy layout!")
+        sys.exit(1)
+
+    legacy_rate = run(legacy_static, iterations)
+    encoder_rate = run(encoder.static, iterations)
+
+    print(f"Iterations:        {iterations}")
+    print(f"List building:     {legacy_rate:>12,.0f} encodes/s")
+    print(f"aura_protocol:     {encoder_rate:>12,.0f} encodes/s")
+    print(f"Speedup:           {encoder_rate / legacy_rate:>12.2f}x")
+    print(f"Allocations/call:  list {allocations(legacy_static):.1f}, "
+          f"aura_protocol {allocations(encoder.static):.1f}")
+
+
+if __name__ == "__main__":
+    main()
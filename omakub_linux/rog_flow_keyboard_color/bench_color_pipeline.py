@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the color pipeline
+Compares frames/sec for scalar per-frame color math against the NumPy
+precomputed cycle, both producing ready static-color reports
+"""
+
+import colorsys
+import sys
+import time
+
+from aura_protocol import AuraEncoder
+from color_pipeline import LED_GAMMA, rainbow
+
+
+def scalar_frames(frames, brightness=1.0):
+    """HSV -> RGB, brightness and gamma in Python for every frame"""
+    encoder = AuraEncoder()
+    for i in range(frames):
+        r, g, b = colorsys.hsv_to_rgb(i / frames, 1.0, 1.0)
+        levels = [int(round((int(c * brightness * 255.0 + 0.5) / 255.0) ** LED_GAMMA * 255.0))
+                  for c in (r, g, b)]
+        encoder.static(*levels)
+
+
+def vectorized_frames(frames):
+    """Precompute the cycle with NumPy, then pick each ready report"""
+    cycle = rainbow(period=frames / 30.0, fps=30.0)
+    for i in range(frames):
+        cycle.report(i / 30.0)
+
+
+def rate(generate, frames):
+    start = time.perf_counter()
+    generate(frames)
+    return frames / (time.perf_counter() - start)
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    print("Color Pipeline Benchmark")
+    print("=" * 50)
+
+    scalar = rate(scalar_frames, frames)
+    vectorized = rate(vectorized_frames, frames)
+
+    start = time.perf_counter()
+    cycle = rainbow(period=frames / 30.0, fps=30.0)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(frames):
+        cycle.report(i / 30.0)
+    playback = frames / (time.perf_counter() - start)
+
+    print(f"Frames:                  {frames}")
+    print(f"Scalar Python:           {scalar:>12,.0f} frames/s")
+    print(f"NumPy precompute + play: {vectorized:>12,.0f} frames/s")
+    print(f"  precompute only:       {frames / build:>12,.0f} frames/s")
+    print(f"  playback only:         {playback:>12,.0f} frames/s")
+    print(f"Speedup:                 {vectorized / scalar:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
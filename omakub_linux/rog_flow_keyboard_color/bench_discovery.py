@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Device lookup benchmark on a synthetic sysfs tree
+Compares walking every USB device's idVendor/idProduct (what the old
+asus-hid-reset.sh did on each resume) and a full hidraw scan (what each
+open by VID/PID costs) with cached DeviceIndex lookups.
+
+    python3 bench_discovery.py [devices] [lookups]
+"""
+
+import glob
+import os
+import sys
+import time
+
+from hid_discovery import DeviceIndex, USB_DEVICES, read_attribute
+from test_hid_discovery import KEYBOARD, fake_sysfs
+
+
+def walk_usb(root, vendor, product):
+    """One lookup the way the shell script did it"""
+    for path in glob.glob(os.path.join(root, USB_DEVICES, "*")):
+        if (read_attribute(os.path.join(path, "idVendor")) == f"{vendor:04x}"
+                and read_attribute(os.path.join(path, "idProduct")) == f"{product:04x}"):
+            return os.path.basename(path)
+    return None
+
+
+def measure(lookup, lookups):
+    """Mean microseconds per lookup"""
+    start = time.perf_counter()
+    for _ in range(lookups):
+        lookup()
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print("Device Discovery Benchmark")
+    print("=" * 50)
+    print(f"{devices} USB devices with one HID interface each, plus the keyboard")
+    root = fake_sysfs(other_devices=devices)
+
+    def cold_hidraw():
+        DeviceIndex(root).aura_interface(*KEYBOARD)
+
+    cached = DeviceIndex(root)
+
+    results = [
+        ("USB walk per lookup", measure(lambda: walk_usb(root, *KEYBOARD), lookups)),
+        ("hidraw scan per lookup", measure(cold_hidraw, lookups)),
+        ("cached USB port", measure(lambda: cached.usb_port(*KEYBOARD), lookups)),
+        ("cached Aura interface", measure(lambda: cached.aura_interface(*KEYBOARD), lookups)),
+    ]
+    baseline = results[0][1]
+    print(f"\nMean per lookup ({lookups} lookups):")
+    for label, us in results:
+        print(f"  {label:<24} {us:10.1f} us   {baseline / us:7.1f}x")
+    print(f"\nCached index scans: {cached.scans} (one USB, one hidraw)")
+
+    ok = walk_usb(root, *KEYBOARD) == cached.usb_port(*KEYBOARD) and cached.scans == 2
+    if not ok:
+        print("FAIL: the cached index disagrees with the walk or rescanned")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
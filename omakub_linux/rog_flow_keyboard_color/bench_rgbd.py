@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for rgbd
+Runs the daemon against a fake HID device and measures commands/sec from
+several concurrent client processes, one request at a time, pipelined and
+batched
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from keyboard_controller import KeyboardController
+from rgbd import RgbDaemon
+from rgbd_client import DaemonController
+
+WINDOW = 64
+
+
+def client(path, mode, count, ready, go, results):
+    """Send count static-color commands and report how many succeeded"""
+    controller = DaemonController(path)
+    commands = [("static", (i & 0xff, 0x40, 0xff - (i & 0xff))) for i in range(count)]
+    ready.wait()
+    go.wait()
+    ok = 0
+    if mode == "single":
+        for cmd, args in commands:
+            ok += controller.request(cmd, *args)["ok"]
+    elif mode == "pipelined":
+        for i in range(0, count, WINDOW):
+            ok += sum(r["ok"] for r in controller.pipeline(commands[i:i + WINDOW]))
+    else:
+        for i in range(0, count, WINDOW):
+            ok += sum(r["ok"] for r in controller.batch(commands[i:i + WINDOW])["results"])
+    controller.close()
+    results.put(ok)
+
+
+def run(path, mode, clients, count):
+    """Return commands/sec for clients processes sending count commands each"""
+    ready = multiprocessing.Barrier(clients + 1)
+    go = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=client, args=(path, mode, count, ready, go, results))
+             for _ in range(clients)]
+    for proc in procs:
+        proc.start()
+    ready.wait()
+    start = time.perf_counter()
+    go.set()
+    ok = sum(results.get() for _ in procs)
+    elapsed = time.perf_counter() - start
+    for proc in procs:
+        proc.join()
+    if ok != clients * count:
+        print(f"  {clients * count - ok} commands failed!")
+    return ok / elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    print("rgbd Throughput Benchmark")
+    print("=" * 50)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="rgbd-"), "rgbd.sock")
+    controller = KeyboardController(max_rate=0, fake=True)
+    daemon = RgbDaemon(controller, path)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+
+    print(f"{count} commands per client\n")
+    print(f"{'clients':>8} {'single':>14} {'pipelined':>14} {'batched':>14}")
+    for clients in (1, 2, 4, 8):
+        rates = [run(path, mode, clients, count) for mode in ("single", "pipelined", "batched")]
+        print(f"{clients:>8} " + " ".join(f"{rate:>10,.0f}/s" for rate in rates))
+
+    daemon.shutdown()
+    thread.join()
+    daemon.close()
+    writer = controller.writer
+    controller.close()
+    print(f"\nCommands handled: {daemon.commands_handled}, "
+          f"reports written after coalescing: {writer.packets_written}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark for the RGB tools
+Measures time-to-first-packet for the CLI (direct and through rgbd) and the
+Qt GUI, and breaks import time down with -X importtime
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from keyboard_controller import KeyboardController
+from rgbd import RgbDaemon
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Builds the simple GUI offscreen and applies its color once
+GUI_SNIPPET = """
+import keyboard_rgb_simple as gui
+app = gui.QApplication([])
+window = gui.MainWindow()
+window.apply_color()
+window.controller.close()
+"""
+
+
+def time_command(args, env, runs):
+    """Median wall time of running args, in milliseconds"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(args, cwd=HERE, env=env, capture_output=True, text=True)
+        times.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            print(f"  {' '.join(args[1:])} failed: {result.stdout}{result.stderr}")
+            return None
+    times.sort()
+    return times[len(times) // 2]
+
+
+def import_profile(code, env):
+    """Return (total ms, heaviest top-level imports, imported module names)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=HERE, env=env, capture_output=True, text=True)
+    top = []
+    names = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        names.add(name.strip())
+        # Nested imports are indented under the module that pulled them in
+        if not name.startswith("  "):
+            top.append((int(cumulative) / 1000, name.strip()))
+    top.sort(reverse=True)
+    return sum(ms for ms, _ in top), top[:5], names
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("RGB Tools Startup Benchmark")
+    print("=" * 50)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="rgbd-"), "rgbd.sock")
+    controller = KeyboardController(max_rate=0, fake=True)
+    daemon = RgbDaemon(controller, path)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    env = dict(os.environ, ROG_RGBD_SOCKET=path, QT_QPA_PLATFORM="offscreen")
+
+    print(f"\nTime to first packet (median of {runs} runs):")
+    paths = [
+        ("CLI, fake device", [sys.executable, "keyboard_rgb.py", "set", "static", "ff8000", "--fake"]),
+        ("CLI, through rgbd", [sys.executable, "keyboard_rgb.py", "set", "static", "ff8000"]),
+        ("GUI, through rgbd", [sys.executable, "-c", GUI_SNIPPET]),
+    ]
+    for label, args in paths:
+        ms = time_command(args, env, runs)
+        if ms is not None:
+            print(f"  {label:<20} {ms:8.1f} ms")
+
+    print("\nImport time:")
+    ok = True
+    for label, module in (("CLI", "keyboard_rgb"), ("GUI", "keyboard_rgb_simple")):
+        total, top, names = import_profile(f"import {module}", env)
+        print(f"  {label}: {total:.1f} ms")
+        for ms, name in top:
+            print(f"    {ms:8.1f} ms  {name}")
+        if label == "CLI" and any(name.startswith(("PyQt6", "hid")) for name in names):
+            print("  FAIL: the CLI imports Qt or hid")
+            ok = False
+
+    daemon.shutdown()
+    thread.join()
+    daemon.close()
+    controller.close()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Packets per update for multi-zone effects, with and without zone diffing
+Drives typical effects through KeyboardController against a fake device
+and counts the reports queued per frame
+"""
+
+import math
+import sys
+
+from aura_protocol import KEYBOARD_ZONES, ZONE_ALL
+from effects import lerp_color
+from keyboard_controller import KeyboardController
+
+FRAMES = 300
+OFF = (0, 0, 0)
+WARM = (0xff, 0x80, 0x20)
+BLUE = (0x20, 0x40, 0xff)
+
+
+def hold(frame):
+    """Static per-zone colors, re-sent every frame"""
+    return {zone: lerp_color(WARM, BLUE, i / 3) for i, zone in enumerate(KEYBOARD_ZONES)}
+
+
+def chase(frame):
+    """One lit zone stepping across the keyboard every 4 frames"""
+    lit = KEYBOARD_ZONES[(frame // 4) % len(KEYBOARD_ZONES)]
+    return {zone: WARM if zone == lit else OFF for zone in KEYBOARD_ZONES}
+
+
+def wave(frame):
+    """A color wave moving across all zones; every zone changes every frame"""
+    return {zone: lerp_color(WARM, BLUE, 0.5 + 0.5 * math.sin(frame / 10 + i))
+            for i, zone in enumerate(KEYBOARD_ZONES)}
+
+
+def flash(frame):
+    """Notification flash on the first zone, the rest steady"""
+    colors = hold(frame)
+    colors[KEYBOARD_ZONES[0]] = (0xff, 0xff, 0xff) if (frame // 5) % 2 else OFF
+    return colors
+
+
+EFFECTS = {"hold": hold, "chase": chase, "wave": wave, "flash": flash}
+
+
+def run_diffed(effect):
+    controller = KeyboardController(max_rate=0, fake=True)
+    for frame in range(FRAMES):
+        controller.set_zone_colors(effect(frame))
+    submitted = controller.writer.packets_submitted
+    controller.close()
+    return submitted
+
+
+def run_full(effect):
+    """Every zone rewritten every frame, as without diffing"""
+    controller = KeyboardController(max_rate=0, fake=True)
+    writer, encoder = controller.writer, controller.encoder
+    for frame in range(FRAMES):
+        for zone, rgb in effect(frame).items():
+            writer.submit(zone, encoder.static, *rgb, zone)
+    submitted = writer.packets_submitted
+    controller.close()
+    return submitted
+
+
+def main():
+    print("Zone Diffing Benchmark")
+    print("=" * 50)
+    print(f"{FRAMES} frames, {len(KEYBOARD_ZONES)} zones\n")
+    print(f"{'effect':<8} {'full frames':>14} {'diffed':>14} {'saved':>8}")
+    ok = True
+    for name, effect in EFFECTS.items():
+        full = run_full(effect) / FRAMES
+        diffed = run_diffed(effect) / FRAMES
+        print(f"{name:<8} {full:>9.2f}/frame {diffed:>9.2f}/frame {1 - diffed / full:>7.0%}")
+        ok = ok and diffed <= full
+
+    # A whole-keyboard color that does not change is not sent again
+    controller = KeyboardController(max_rate=0, fake=True)
+    for _ in range(FRAMES):
+        controller.set_static_color(*WARM, zone=ZONE_ALL)
+    whole = controller.writer.packets_submitted
+    controller.close()
+    print(f"{'whole':<8} {1:>9.2f}/frame {whole / FRAMES:>9.2f}/frame")
+    ok = ok and whole == 1
+
+    if not ok:
+        print("\nFAIL: diffing sent more reports than full frames")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
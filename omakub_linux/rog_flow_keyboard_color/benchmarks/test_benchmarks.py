@@ -0,0 +1,125 @@
+"""
+Hardware-free benchmark suite for the keyboard RGB tools
+
+    uv run --group dev pytest benchmarks
+    pytest benchmarks --benchmark-compare   # against a saved run
+
+Covers report encoding, controller throughput, the GUI slider callback to
+device.write latency path, reconnects, and capture replay.
+"""
+
+import time
+
+import pytest
+
+from aura_protocol import AuraEncoder
+from fake_hid import FakeDevice
+from hid_capture import KIND_WRITE, RecordingDevice, ReplayDevice, read_capture
+from keyboard_controller import KeyboardController
+
+
+@pytest.fixture
+def controller():
+    FakeDevice.plug()
+    controller = KeyboardController(max_rate=0, fake=True)
+    yield controller
+    controller.close()
+
+
+def test_encode_static(benchmark):
+    encoder = AuraEncoder()
+    report = benchmark(encoder.static, 0xff, 0x80, 0x00)
+    assert bytes(report[1:8]) == bytes([0x5d, 0xb3, 0x00, 0x00, 0xff, 0x80, 0x00])
+
+
+def test_encode_zone_frame(benchmark, controller):
+    colors = [{zone: (i, zone * 40, 0xff - i) for zone in (1, 2, 3, 4)} for i in range(256)]
+
+    def update_all():
+        for frame in colors:
+            controller.set_zone_colors(frame)
+
+    benchmark(update_all)
+
+
+def test_controller_throughput(benchmark, controller):
+    """Commands per round: 1000 distinct colors, flushed to the device"""
+
+    def burst():
+        for i in range(1000):
+            controller.set_static_color(i & 0xff, (i >> 2) & 0xff, 0x40)
+        controller.writer.flush(timeout=5)
+
+    benchmark(burst)
+    assert controller.writer.write_errors == 0
+
+
+def test_callback_to_write_latency(benchmark, controller):
+    """What a slider's valueChanged handler pays until the report is written"""
+    device = controller.device
+    step = [0]
+
+    def slider_changed():
+        step[0] += 1
+        start = time.monotonic()
+        controller.set_static_color(step[0] & 0xff, 0x80, 0x80)
+        controller.writer.flush(timeout=1)
+        return device.writes[-1][0] - start
+
+    latency = benchmark.pedantic(slider_changed, rounds=300)
+    assert latency < 0.05
+
+
+def test_reconnect_restore(benchmark, controller):
+    """Write failure to restored lighting, without hotplug events"""
+
+    def unplug_and_replug():
+        reconnects = controller.reconnects
+        controller.set_static_color(0x10, 0x20, 0x30)
+        controller.writer.flush(timeout=1)
+        FakeDevice.unplug()
+        controller.set_static_color(0x40, 0x50, 0x60)
+        deadline = time.monotonic() + 3
+        while controller.device is not None and time.monotonic() < deadline:
+            time.sleep(0.0005)
+        FakeDevice.plug()
+        while controller.reconnects == reconnects and time.monotonic() < deadline:
+            time.sleep(0.0005)
+        return controller.reconnects > reconnects
+
+    assert benchmark.pedantic(unplug_and_replug, rounds=10)
+    assert controller.metrics()["last_restore_ms"] is not None
+
+
+def test_capture_replay(benchmark, tmp_path):
+    """A replayed capture reproduces the recorded write timing and failures"""
+    path = str(tmp_path / "session.cap")
+    recording = RecordingDevice(FakeDevice(write_delay=0.002, min_gap=0.004), path)
+    recording.open(0x0B05, 0x1A30)
+    encoder = AuraEncoder()
+    errors = 0
+    for i in range(20):
+        try:
+            recording.write(encoder.static(i, 0, 0))
+        except IOError:
+            errors += 1
+    recording.close()
+    recording.capture.close()
+
+    records = [r for r in read_capture(path) if r.kind == KIND_WRITE]
+    assert len(records) == 20 and sum(not r.ok for r in records) == errors > 0
+
+    def replay():
+        device = ReplayDevice(read_capture(path))
+        device.open(0x0B05, 0x1A30)
+        failures = 0
+        for i in range(20):
+            try:
+                device.write(encoder.static(i, 0, 0))
+            except IOError:
+                failures += 1
+        return device, failures
+
+    device, failures = benchmark.pedantic(replay, rounds=3)
+    assert failures == errors
+    assert len(device.writes) == 20 - errors
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Vectorized color pipeline for host-driven keyboard effects
+Precomputes whole animation cycles as uint8 arrays and ready-to-write
+static-color reports, so playback does no per-frame color math
+"""
+
+import numpy as np
+
+from aura_protocol import MODE_STATIC, OFFSET_RED, OFFSET_BLUE, REPORT_SIZE, build_template
+
+# Keyboard LEDs look washed out at low levels without gamma correction
+LED_GAMMA = 2.2
+
+
+def hsv_to_rgb(h, s, v):
+    """Convert HSV arrays (all 0..1) to an (..., 3) float RGB array in 0..1"""
+    h = np.asarray(h, dtype=np.float64) % 1.0 * 6.0
+    s = np.asarray(s, dtype=np.float64)
+    v = np.asarray(v, dtype=np.float64)
+    h, s, v = np.broadcast_arrays(h, s, v)
+    i = h.astype(np.int64) % 6
+    f = h - np.floor(h)
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    return np.stack([r, g, b], axis=-1)
+
+
+def rgb_to_hsv(rgb):
+    """Convert an (..., 3) float RGB array in 0..1 to (h, s, v) arrays"""
+    rgb = np.asarray(rgb, dtype=np.float64)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    v = rgb.max(axis=-1)
+    delta = v - rgb.min(axis=-1)
+    s = np.divide(delta, v, out=np.zeros_like(v), where=v > 0)
+    safe = np.where(delta > 0, delta, 1.0)
+    h = np.where(v == r, (g - b) / safe,
+                 np.where(v == g, 2.0 + (b - r) / safe, 4.0 + (r - g) / safe))
+    h = np.where(delta > 0, (h / 6.0) % 1.0, 0.0)
+    return h, s, v
+
+
+def gamma_lut(gamma=LED_GAMMA):
+    """256-entry uint8 lookup table mapping linear levels to LED levels"""
+    levels = np.arange(256, dtype=np.float64) / 255.0
+    return np.round(levels ** gamma * 255.0).astype(np.uint8)
+
+
+def kelvin_to_rgb(kelvin):
+    """Approximate white point of a color temperature as float RGB in 0..1"""
+    t = np.asarray(kelvin, dtype=np.float64) / 100.0
+    r = np.where(t <= 66, 255.0, 329.698727446 * np.power(np.maximum(t - 60, 1e-9), -0.1332047592))
+    g = np.where(t <= 66, 99.4708025861 * np.log(np.maximum(t, 1e-9)) - 161.1195681661,
+                 288.1221695283 * np.power(np.maximum(t - 60, 1e-9), -0.0755148492))
+    b = np.where(t >= 66, 255.0,
+                 np.where(t <= 19, 0.0, 138.5177312231 * np.log(np.maximum(t - 10, 1e-9)) - 305.0447927307))
+    return np.clip(np.stack([r, g, b], axis=-1), 0, 255) / 255.0
+
+
+def blend_temperature(rgb, kelvin, amount=1.0):
+    """Tint float RGB frames toward a color temperature"""
+    tint = kelvin_to_rgb(kelvin)
+    return rgb * (1.0 - amount + amount * tint)
+
+
+def to_levels(rgb, brightness=1.0, lut=None):
+    """Scale float RGB frames by brightness and quantize to uint8 LED levels"""
+    levels = np.clip(np.asarray(rgb) * (brightness * 255.0) + 0.5, 0, 255).astype(np.uint8)
+    return levels if lut is None else lut[levels]
+
+
+def rainbow_cycle(frames, saturation=1.0, value=1.0):
+    """Float RGB frames for one trip around the hue wheel"""
+    return hsv_to_rgb(np.arange(frames) / frames, saturation, value)
+
+
+def breathe_cycle(color, frames):
+    """Float RGB frames fading color in and out with a raised cosine"""
+    level = 0.5 - 0.5 * np.cos(np.arange(frames) / frames * 2.0 * np.pi)
+    return level[:, None] * (np.asarray(color, dtype=np.float64) / 255.0)
+
+
+def gradient_cycle(colors, frames):
+    """Float RGB frames blending through colors and back to the first"""
+    stops = np.asarray(colors + colors[:1], dtype=np.float64) / 255.0
+    position = np.arange(frames) / frames * len(colors)
+    index = position.astype(np.int64)
+    f = (position - index)[:, None]
+    return stops[index] * (1.0 - f) + stops[index + 1] * f
+
+
+class PrecomputedCycle:
+    """A looping effect whose reports are all encoded up front
+
+    levels is an (N, 3) uint8 array. Every frame is written into a copy of
+    the static-color report template at build time; playback only picks the
+    row for the current time. Works as an effect for EffectsEngine, which
+    writes report(t) directly.
+    """
+
+    def __init__(self, levels, period):
+        levels = np.ascontiguousarray(levels, dtype=np.uint8)
+        self.levels = levels
+        self.period = period
+        self.count = len(levels)
+        template = np.frombuffer(build_template(MODE_STATIC), dtype=np.uint8)
+        self.reports = np.repeat(template[None, :], self.count, axis=0)
+        self.reports[:, OFFSET_RED:OFFSET_BLUE + 1] = levels
+        view = memoryview(self.reports).cast("B")
+        self.rows = [view[i * REPORT_SIZE:(i + 1) * REPORT_SIZE] for i in range(self.count)]
+        self.colors = [tuple(row) for row in levels.tolist()]
+
+    def index(self, t):
+        return int(t * self.count / self.period) % self.count
+
+    def frame(self, t):
+        return self.colors[self.index(t)]
+
+    def report(self, t):
+        return self.rows[self.index(t)]
+
+
+def rainbow(period=6.0, fps=30.0, brightness=1.0, kelvin=None):
+    """Gamma-corrected rainbow cycle, optionally tinted to a color temperature"""
+    rgb = rainbow_cycle(int(period * fps))
+    if kelvin:
+        rgb = blend_temperature(rgb, kelvin, 0.5)
+    return PrecomputedCycle(to_levels(rgb, brightness, gamma_lut()), period)
+
+
+def breathe(color, period=4.0, fps=30.0, brightness=1.0):
+    """Gamma-corrected breathing cycle for one color"""
+    rgb = breathe_cycle(color, int(period * fps))
+    return PrecomputedCycle(to_levels(rgb, brightness, gamma_lut()), period)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Host-driven lighting effects for the ROG Flow Z13 keyboard
+Effects generate one color per frame and stream it as static-color reports
+
+Run an effect from the command line (add --fake to use a fake device):
+
+    sudo python3 effects.py gradient --fps 30 --duration 10
+"""
+
+import argparse
+import math
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from aura_protocol import AuraEncoder, ZONE_ALL
+from hid_writer import CoalescingWriter
+from keyboard_controller import open_device
+
+
+def lerp_color(a, b, f):
+    """Linear blend between two RGB tuples"""
+    return (
+        int(a[0] + (b[0] - a[0]) * f),
+        int(a[1] + (b[1] - a[1]) * f),
+        int(a[2] + (b[2] - a[2]) * f),
+    )
+
+
+def passthrough(report):
+    """Build function for reports that are already encoded"""
+    return report
+
+
+class FrameStats:
+    """Timing statistics for a scheduler run"""
+
+    def __init__(self):
+        self.frames = 0
+        self.dropped = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+        self.cpu_total = 0.0
+        self.elapsed = 0.0
+
+    def record(self, lateness, cpu):
+        self.frames += 1
+        self.jitter_total += lateness
+        self.jitter_max = max(self.jitter_max, lateness)
+        self.cpu_total += cpu
+
+    @property
+    def fps(self):
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def jitter_mean(self):
+        return self.jitter_total / self.frames if self.frames else 0.0
+
+    @property
+    def cpu_per_frame(self):
+        return self.cpu_total / self.frames if self.frames else 0.0
+
+    def summary(self):
+        return (f"{self.frames} frames in {self.elapsed:.2f}s ({self.fps:.1f} fps), "
+                f"{self.dropped} dropped, jitter mean {self.jitter_mean * 1000:.2f} ms "
+                f"max {self.jitter_max * 1000:.2f} ms, "
+                f"CPU {self.cpu_per_frame * 1e6:.0f} us/frame")
+
+
+class FrameScheduler:
+    """Call render at a fixed rate on the monotonic clock
+
+    Frame deadlines are computed from the start time, never from the
+    previous frame, so timing errors do not accumulate. When rendering falls
+    behind, the frames whose deadline has already passed are dropped rather
+    than rendered late one after another.
+    """
+
+    def __init__(self, fps):
+        self.period = 1.0 / fps
+        self.stats = FrameStats()
+        self.stop_event = threading.Event()
+
+    def run(self, render, duration=None):
+        """Render frames until stop() or duration seconds; returns FrameStats"""
+        self.stats = stats = FrameStats()
+        self.stop_event.clear()
+        start = time.monotonic()
+        frame = 0
+        while True:
+            deadline = start + frame * self.period
+            now = time.monotonic()
+            if now < deadline:
+                if self.stop_event.wait(deadline - now):
+                    break
+                now = time.monotonic()
+            elif self.stop_event.is_set():
+                break
+            if duration is not None and now - start >= duration:
+                break
+            cpu = time.thread_time()
+            render(now - start, frame)
+            stats.record(now - deadline, time.thread_time() - cpu)
+            # Skip every frame whose deadline has already passed
+            next_frame = max(frame + 1, int((time.monotonic() - start) / self.period))
+            stats.dropped += next_frame - frame - 1
+            frame = next_frame
+        stats.elapsed = time.monotonic() - start
+        return stats
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class Gradient:
+    """Cycle smoothly through a list of colors"""
+
+    def __init__(self, colors, period=6.0):
+        self.colors = colors
+        self.period = period
+
+    def frame(self, t):
+        position = (t / self.period) % 1.0 * len(self.colors)
+        index = int(position)
+        return lerp_color(self.colors[index], self.colors[(index + 1) % len(self.colors)],
+                          position - index)
+
+
+class NotificationFlash:
+    """Flash a color a few times on top of another effect"""
+
+    def __init__(self, base, color=(255, 255, 255), flashes=3, rate=4.0):
+        self.base = base
+        self.color = color
+        self.flashes = flashes
+        self.rate = rate
+        self.pending = False
+        self.started = None
+
+    def trigger(self):
+        """Start flashing on the next frame"""
+        self.pending = True
+
+    def frame(self, t):
+        if self.pending:
+            self.pending = False
+            self.started = t
+        if self.started is not None:
+            phase = (t - self.started) * self.rate
+            if phase < self.flashes:
+                return self.color if phase % 1.0 < 0.5 else (0, 0, 0)
+            self.started = None
+        return self.base.frame(t)
+
+
+class AudioReactive:
+    """Blend between two colors following an audio level in 0..1"""
+
+    def __init__(self, level, low=(0, 0, 48), high=(255, 0, 64), decay=0.85):
+        self.level = level
+        self.low = low
+        self.high = high
+        self.decay = decay
+        self.value = 0.0
+
+    def frame(self, t):
+        # Rise instantly, fall off smoothly
+        self.value = max(self.level(), self.value * self.decay)
+        return lerp_color(self.low, self.high, min(self.value, 1.0))
+
+
+class ParecLevel:
+    """Audio level of the default monitor source, read from parec"""
+
+    RATE = 8000
+    CHUNK = 256
+
+    def __init__(self, source="@DEFAULT_MONITOR@"):
+        self.level = 0.0
+        self.proc = subprocess.Popen(
+            ["parec", f"--device={source}", "--raw", "--format=s16le",
+             "--channels=1", f"--rate={self.RATE}"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        while True:
+            data = self.proc.stdout.read(self.CHUNK * 2)
+            if not data:
+                return
+            samples = struct.unpack(f"<{len(data) // 2}h", data)
+            rms = math.sqrt(sum(s * s for s in samples) / len(samples))
+            self.level = min(rms / 8192.0, 1.0)
+
+    def __call__(self):
+        return self.level
+
+    def close(self):
+        self.proc.terminate()
+
+
+class EffectsEngine:
+    """Stream an effect to the keyboard from a scheduler thread
+
+    Frames go through the CoalescingWriter, so a slow device makes the
+    writer coalesce frames instead of blocking the scheduler. Frames whose
+    color did not change are not sent. Effects that provide report(t), such
+    as color_pipeline.PrecomputedCycle, hand over ready-encoded reports.
+    """
+
+    def __init__(self, writer, effect, fps=30.0, zone=ZONE_ALL):
+        self.writer = writer
+        self.effect = effect
+        self.zone = zone
+        self.scheduler = FrameScheduler(fps)
+        # Only used on the writer thread
+        self.encoder = AuraEncoder()
+        self.last_color = None
+        self.thread = None
+        # Scales every frame; below 1.0 precomputed reports are re-encoded
+        self.brightness = 1.0
+        # Effect time carried over when the engine is restarted
+        self.offset = 0.0
+
+    def set_effect(self, effect):
+        self.effect = effect
+
+    def set_fps(self, fps):
+        """Change the frame rate, restarting the scheduler if it is running"""
+        running = self.thread is not None
+        if running:
+            self.stop()
+        self.scheduler = FrameScheduler(fps)
+        if running:
+            self.start()
+
+    def color(self, t):
+        """The effect's color at effect time t, with brightness applied"""
+        r, g, b = self.effect.frame(t)
+        scale = self.brightness
+        return int(r * scale), int(g * scale), int(b * scale)
+
+    def render(self, t, frame):
+        t += self.offset
+        report = getattr(self.effect, "report", None)
+        if report is not None and self.brightness >= 1.0:
+            data = report(t)
+            if data is not self.last_color:
+                self.last_color = data
+                self.writer.submit(self.zone, passthrough, data)
+            return
+        color = self.color(t) if self.brightness < 1.0 else self.effect.frame(t)
+        if color != self.last_color:
+            self.last_color = color
+            self.writer.submit(self.zone, self.encoder.static, *color, self.zone)
+
+    def start(self, duration=None):
+        self.thread = threading.Thread(
+            target=self.scheduler.run, args=(self.render, duration),
+            name="effects", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        self.scheduler.stop()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+            self.offset += self.scheduler.stats.elapsed
+        return self.scheduler.stats
+
+
+def precomputed_rainbow(args):
+    """NumPy-precomputed, gamma-corrected rainbow cycle"""
+    from color_pipeline import rainbow
+    return rainbow(fps=args.fps)
+
+
+EFFECTS = {
+    "gradient": lambda args: Gradient([(255, 0, 0), (255, 128, 0), (0, 64, 255), (160, 0, 255)]),
+    "flash": lambda args: NotificationFlash(Gradient([(0, 32, 128), (0, 128, 96)])),
+    "audio": lambda args: AudioReactive(ParecLevel()),
+    "rainbow": precomputed_rainbow,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a host-driven keyboard lighting effect")
+    parser.add_argument("effect", choices=sorted(EFFECTS))
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--duration", type=float, default=None, help="seconds to run")
+    parser.add_argument("--fake", action="store_true", help="use a fake HID device")
+    parser.add_argument("--power-aware", action="store_true",
+                        help="dim, slow down or stop the effect on battery (see power_rules.py)")
+    parser.add_argument("--rules", help="JSON power rules file for --power-aware")
+    parser.add_argument("--idle-socket", nargs="?", const="", metavar="PATH",
+                        help="pause and fade out on idle_lighting.py hooks (default socket "
+                             "/run/rog-rgb-effects.sock)")
+    args = parser.parse_args()
+
+    if args.power_aware:
+        import power_rules
+        try:
+            rules = power_rules.load_rules(args.rules) if args.rules else power_rules.DEFAULT_RULES
+        except (OSError, ValueError) as e:
+            print(f"Could not load rules: {e}")
+            sys.exit(1)
+
+    try:
+        device = open_device(args.fake)
+    except IOError as e:
+        print(f"Error opening device: {e}")
+        print(f"\nTry running with sudo:\n  sudo python3 {sys.argv[0]}")
+        sys.exit(1)
+
+    writer = CoalescingWriter(device, max_rate=args.fps * 2)
+    engine = EffectsEngine(writer, EFFECTS[args.effect](args), args.fps)
+    idle_socket = None
+    if args.idle_socket is not None:
+        import idle_lighting
+        idle_socket = idle_lighting.IdleSocket(idle_lighting.IdleLighting(engine=engine),
+                                               args.idle_socket or idle_lighting.EFFECTS_SOCKET)
+    if args.power_aware:
+        power = power_rules.PowerAwareEffects(engine, rules, args.fps)
+        monitor = power_rules.PowerMonitor(power.apply_state)
+        power.apply_state(monitor.state)
+        try:
+            monitor.thread.join(args.duration)
+        except KeyboardInterrupt:
+            pass
+        monitor.stop()
+        for policy, rate in power.stop():
+            print(f"{policy}: {rate:.1f} wakeups/s")
+        if idle_socket:
+            idle_socket.close()
+        writer.close()
+        return
+
+    engine.start(args.duration)
+    try:
+        if isinstance(engine.effect, NotificationFlash):
+            # The thread is None while paused for idle
+            while engine.thread is None or engine.thread.is_alive():
+                engine.effect.trigger()
+                if engine.thread:
+                    engine.thread.join(3.0)
+                else:
+                    time.sleep(3.0)
+        elif idle_socket:
+            # Idle stops and restarts the engine, so wait for the duration instead
+            threading.Event().wait(args.duration)
+        else:
+            engine.thread.join()
+    except KeyboardInterrupt:
+        pass
+    if idle_socket:
+        idle_socket.close()
+    stats = engine.stop()
+    writer.close()
+    print(stats.summary())
+    print(f"Reports written: {writer.packets_written}")
+
+
+if __name__ == "__main__":
+    main()
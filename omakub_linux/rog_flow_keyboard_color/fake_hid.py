@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Fake hid.device stand-in for testing the keyboard tools without hardware
+"""
+
+import threading
+import time
+
+
+class FakeDevice:
+    """Records every written report instead of sending it to a keyboard"""
+
+    # Shared by all instances, like the one physical keyboard
+    connected = True
+
+    def __init__(self, write_delay=0.0, min_gap=0.0, limit="error"):
+        self.write_delay = write_delay
+        # Rate limit: reports closer than min_gap are rejected ("error") or
+        # held until the device is ready ("block")
+        self.min_gap = min_gap
+        self.limit = limit
+        self.rejected = 0
+        self.last_accepted = None
+        self.writes = []
+        self.opened = False
+        self.lock = threading.Lock()
+
+    @classmethod
+    def unplug(cls):
+        """Simulate the keyboard disappearing (suspend, USB unbind)"""
+        cls.connected = False
+
+    @classmethod
+    def plug(cls):
+        """Simulate the keyboard coming back"""
+        cls.connected = True
+
+    def open(self, vendor_id, product_id):
+        if not self.connected:
+            raise IOError("open failed")
+        self.opened = True
+        self.path = None
+
+    def open_path(self, path):
+        self.open(None, None)
+        self.path = path
+
+    def close(self):
+        self.opened = False
+
+    def write(self, data):
+        if not self.opened:
+            raise IOError("device not open")
+        if not self.connected:
+            raise IOError("write error: No such device")
+        if self.min_gap and self.last_accepted is not None:
+            wait = self.last_accepted + self.min_gap - time.monotonic()
+            if wait > 0:
+                if self.limit == "error":
+                    self.rejected += 1
+                    raise IOError("write error: Broken pipe")
+                time.sleep(wait)
+        if self.write_delay:
+            time.sleep(self.write_delay)
+        self.last_accepted = time.monotonic()
+        with self.lock:
+            self.writes.append((time.monotonic(), bytes(data)))
+        return len(data)
+
+    def get_manufacturer_string(self):
+        return "ASUSTeK Computer Inc."
+
+    def get_product_string(self):
+        return "Fake N-KEY Device"
+
+    def get_serial_number_string(self):
+        return "FAKE0001"
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+HID traffic capture and replay for the ROG Flow Z13 keyboard
+RecordingDevice wraps a hid.device and logs every report with timestamps to
+a compact binary capture; ReplayDevice plays a capture back as a fake device
+with the same write timing and failures
+
+    ROG_HID_CAPTURE=session.cap sudo -E python3 keyboard_rgb.py set static ff8000
+    python3 hid_capture.py dump session.cap
+    sudo python3 hid_capture.py replay session.cap [--speed 2] [--fake]
+
+Capture format: an 8-byte header (b"HIDC", version, 0, 0) followed by
+records of <offset_us:u64 duration_us:u32 kind:u8 ok:u8 length:u16> and
+length bytes of data (the report, or the error message of a failed call).
+"""
+
+import argparse
+import atexit
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"HIDC"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sBxxx")
+RECORD = struct.Struct("<QIBBH")
+
+KIND_OPEN = 1
+KIND_WRITE = 2
+KIND_CLOSE = 3
+KIND_NAMES = {KIND_OPEN: "open", KIND_WRITE: "write", KIND_CLOSE: "close"}
+
+
+class Record:
+    """One captured call: when it started, how long it took, and its data"""
+
+    __slots__ = ("offset", "duration", "kind", "ok", "data")
+
+    def __init__(self, offset, duration, kind, ok, data):
+        self.offset = offset
+        self.duration = duration
+        self.kind = kind
+        self.ok = ok
+        self.data = data
+
+    def __repr__(self):
+        return (f"{self.offset * 1000:10.3f} ms  {KIND_NAMES.get(self.kind, self.kind):<5} "
+                f"{self.duration * 1e6:7.0f} us  {'ok ' if self.ok else 'ERR'} "
+                f"{self.data[:17].hex(' ') if self.ok else self.data.decode(errors='replace')}")
+
+
+class CaptureWriter:
+    """Append records to a capture file; safe to share between threads"""
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, start, duration, kind, ok, data):
+        data = bytes(data)
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(RECORD.pack(int((start - self.start) * 1e6), int(duration * 1e6),
+                                        kind, ok, len(data)))
+            self.file.write(data)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+_captures = {}
+
+
+def open_capture(path):
+    """Return the capture for path, shared by every device opened this run
+
+    Reconnects reopen the device, so all of them log into one capture.
+    """
+    if path not in _captures:
+        _captures[path] = CaptureWriter(path)
+        atexit.register(_captures[path].close)
+    return _captures[path]
+
+
+def read_capture(path):
+    """Return the records of a capture file"""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a HID capture")
+    records = []
+    pos = FILE_HEADER.size
+    while pos + RECORD.size <= len(data):
+        offset, duration, kind, ok, length = RECORD.unpack_from(data, pos)
+        pos += RECORD.size
+        records.append(Record(offset / 1e6, duration / 1e6, kind, bool(ok), data[pos:pos + length]))
+        pos += length
+    return records
+
+
+class RecordingDevice:
+    """hid.device wrapper that captures open, write and close calls"""
+
+    def __init__(self, device, path):
+        self.device = device
+        self.capture = open_capture(path)
+
+    def _call(self, kind, data, method, *args):
+        start = time.monotonic()
+        try:
+            result = method(*args)
+        except Exception as e:
+            self.capture.add(start, time.monotonic() - start, kind, False, str(e).encode())
+            raise
+        self.capture.add(start, time.monotonic() - start, kind, True, data)
+        return result
+
+    def open(self, vendor_id, product_id):
+        return self._call(KIND_OPEN, struct.pack("<HH", vendor_id, product_id),
+                          self.device.open, vendor_id, product_id)
+
+    def open_path(self, path):
+        return self._call(KIND_OPEN, path, self.device.open_path, path)
+
+    def write(self, data):
+        return self._call(KIND_WRITE, data, self.device.write, data)
+
+    def close(self):
+        return self._call(KIND_CLOSE, b"", self.device.close)
+
+    def __getattr__(self, name):
+        # get_serial_number_string() and friends go straight to the device
+        return getattr(self.device, name)
+
+
+class ReplayDevice:
+    """Fake device that answers writes the way a captured session did
+
+    The n-th write takes as long as the n-th captured write and fails if it
+    failed. Written reports are kept in writes, like FakeDevice. Past the
+    end of the capture, writes succeed immediately.
+    """
+
+    def __init__(self, records, timing=True):
+        self.results = [r for r in records if r.kind == KIND_WRITE]
+        opens = [r for r in records if r.kind == KIND_OPEN]
+        self.open_error = opens[0].data.decode(errors="replace") if opens and not opens[0].ok else None
+        self.timing = timing
+        self.position = 0
+        self.writes = []
+        self.opened = False
+
+    @classmethod
+    def from_file(cls, path, timing=True):
+        return cls(read_capture(path), timing)
+
+    def open(self, vendor_id, product_id):
+        if self.open_error:
+            raise IOError(self.open_error)
+        self.opened = True
+
+    def close(self):
+        self.opened = False
+
+    def write(self, data):
+        if not self.opened:
+            raise IOError("device not open")
+        record = self.results[self.position] if self.position < len(self.results) else None
+        self.position += 1
+        if record and self.timing and record.duration:
+            time.sleep(record.duration)
+        if record and not record.ok:
+            raise IOError(record.data.decode(errors="replace"))
+        self.writes.append((time.monotonic(), bytes(data)))
+        return len(data)
+
+    def get_manufacturer_string(self):
+        return "ASUSTeK Computer Inc."
+
+    def get_product_string(self):
+        return "Replayed N-KEY Device"
+
+    def get_serial_number_string(self):
+        return "REPLAY0001"
+
+
+def replay(records, device, speed=1.0):
+    """Write the captured reports to device with their original spacing"""
+    start = time.monotonic()
+    written = 0
+    for record in records:
+        if record.kind != KIND_WRITE or not record.ok:
+            continue
+        wait = start + record.offset / speed - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        device.write(record.data)
+        written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay HID captures")
+    parser.add_argument("command", choices=["dump", "replay"])
+    parser.add_argument("capture")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay time scale")
+    parser.add_argument("--fake", action="store_true", help="replay to a fake HID device")
+    args = parser.parse_args()
+
+    try:
+        records = read_capture(args.capture)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Could not read {args.capture}: {e}")
+        sys.exit(1)
+
+    if args.command == "dump":
+        for record in records:
+            print(record)
+        writes = [r for r in records if r.kind == KIND_WRITE]
+        failed = sum(not r.ok for r in writes)
+        print(f"\n{len(writes)} writes, {failed} failed")
+        return
+
+    from keyboard_controller import open_device
+    try:
+        device = open_device(args.fake)
+    except Exception as e:
+        print(f"Error opening device: {e}")
+        sys.exit(1)
+    written = replay(records, device, args.speed)
+    device.close()
+    print(f"Replayed {written} reports")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Background HID writer for the ROG Flow Z13 keyboard
+Owns the hid.device so UI callbacks only queue reports and return immediately
+"""
+
+import threading
+import time
+
+
+class CoalescingWriter:
+    """Write HID reports from a background thread, newest report per key wins
+
+    Reports are queued under a key (the lighting zone). While a report is
+    still pending, a newer one for the same key replaces it instead of being
+    queued behind it, so a slider drag collapses into a handful of writes.
+    Writes are paced to at most max_rate reports per second.
+
+    The last report written for each key is remembered. When a write fails
+    the device is dropped and on_error(exception) is called; reports keep
+    coalescing until set_device() hands over a new device, which first gets
+    the last state of every key replayed.
+
+    With a pacer (pacing.AdaptivePacer) the gap between writes is learned
+    from the device instead of fixed by max_rate, and failed writes are
+    retried a few times before the device is given up on.
+    """
+
+    def __init__(self, device, max_rate=20.0, on_error=None, pacer=None):
+        self.device = device
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.on_error = on_error
+        self.pacer = pacer
+        self.pending = {}
+        self.applied = {}
+        # Latency traces (latency_trace.Trace) of pending reports, by key
+        self.traces = {}
+        self.busy = False
+        self.running = True
+        self.packets_submitted = 0
+        self.packets_written = 0
+        self.write_errors = 0
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="hid-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, key, build, *args, trace=None):
+        """Queue build(*args) for key, replacing any report still pending for it
+
+        build runs on the writer thread and must return the full report,
+        including the leading report ID byte. A trace gets its encode and
+        write stages marked when the report is written.
+        """
+        with self.cond:
+            if not self.running:
+                return False
+            # Re-assigning an existing key keeps its place in the queue
+            self.pending[key] = (build, args)
+            self.packets_submitted += 1
+            replaced = self.traces.pop(key, None)
+            if replaced:
+                replaced.drop()
+            if trace:
+                trace.mark("enqueue")
+                self.traces[key] = trace
+            self.cond.notify_all()
+        return True
+
+    def drop(self, keys):
+        """Forget pending and replay state for keys, e.g. zones a whole-keyboard report overrides"""
+        with self.cond:
+            for key in keys:
+                self.pending.pop(key, None)
+                self.applied.pop(key, None)
+                trace = self.traces.pop(key, None)
+                if trace:
+                    trace.drop()
+
+    def set_device(self, device):
+        """Swap in a (re)opened device and replay the last state of every key
+
+        Passing None detaches the current device; reports keep coalescing
+        until a device is set again. The detached device is closed once no
+        write is using it.
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: not self.busy)
+            old, self.device = self.device, device
+            if device is not None:
+                for key, entry in self.applied.items():
+                    # A newer pending report for the key takes precedence
+                    self.pending.setdefault(key, entry)
+            self.cond.notify_all()
+        if old is not None and old is not device:
+            try:
+                old.close()
+            except Exception:
+                pass
+
+    def flush(self, timeout=None):
+        """Block until every pending report has been written"""
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.busy, timeout)
+
+    def close(self, timeout=2.0):
+        """Write what is still pending, stop the thread and close the device"""
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join(timeout)
+        with self.cond:
+            # Reports that never reached a device
+            for trace in self.traces.values():
+                trace.drop()
+            self.traces.clear()
+        if self.device:
+            self.device.close()
+            self.device = None
+
+    def _run(self):
+        last_write = float("-inf")
+        while True:
+            with self.cond:
+                while self.running and (not self.pending or self.device is None):
+                    self.cond.wait()
+                if not self.pending or self.device is None:
+                    return
+                interval = self.pacer.interval if self.pacer else self.min_interval
+                delay = last_write + interval - time.monotonic()
+                if delay > 0:
+                    # Newer submissions arriving meanwhile replace the pending ones
+                    self.cond.wait(delay)
+                    continue
+                key = next(iter(self.pending))
+                build, args = self.pending.pop(key)
+                trace = self.traces.pop(key, None)
+                device = self.device
+                self.busy = True
+            error = None
+            start = time.monotonic()
+            try:
+                report = build(*args)
+                if trace:
+                    trace.mark("encode")
+                device.write(report)
+                self.packets_written += 1
+                if trace:
+                    trace.finish("write")
+            except Exception as e:
+                self.write_errors += 1
+                error = e
+            last_write = time.monotonic()
+            retry = self.pacer.record(start, last_write - start, error) if self.pacer else False
+            with self.cond:
+                if error is None:
+                    self.applied[key] = (build, args)
+                else:
+                    self._requeue(key, build, args, trace)
+                    if retry:
+                        # Probably too fast for the device; try again after backing off
+                        error = None
+                    elif self.device is device:
+                        # Keep the report so it is written once a device is back
+                        self.device = None
+                self.busy = False
+                self.cond.notify_all()
+            if error is not None:
+                print(f"Error sending packet: {error}")
+                try:
+                    device.close()
+                except Exception:
+                    pass
+                if self.on_error:
+                    self.on_error(error)
+
+    def _requeue(self, key, build, args, trace):
+        """Put back a report whose write failed, unless a newer one replaced it"""
+        if key in self.pending:
+            if trace:
+                trace.drop()
+            return
+        self.pending[key] = (build, args)
+        if trace:
+            self.traces[key] = trace
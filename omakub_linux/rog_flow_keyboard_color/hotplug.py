@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Kernel hotplug (uevent) notifications for the ROG Flow Z13 keyboard
+Reads the kernel's NETLINK_KOBJECT_UEVENT broadcast directly, so no udev
+bindings are needed
+"""
+
+import select
+import socket
+import threading
+
+NETLINK_KOBJECT_UEVENT = 15
+KERNEL_GROUP = 1
+
+
+class Uevent:
+    """One kernel uevent: action, devpath and its KEY=VALUE properties"""
+
+    def __init__(self, action, devpath, props):
+        self.action = action
+        self.devpath = devpath
+        self.props = props
+
+    @property
+    def subsystem(self):
+        return self.props.get("SUBSYSTEM", "")
+
+    def __repr__(self):
+        return f"Uevent({self.action}, {self.devpath})"
+
+
+def parse_uevent(data):
+    """Parse a kernel uevent datagram; returns None for anything else"""
+    parts = data.split(b"\0")
+    header = parts[0].decode(errors="replace")
+    if "@" not in header:
+        # udev's own re-broadcasts start with "libudev"
+        return None
+    action, devpath = header.split("@", 1)
+    props = {}
+    for part in parts[1:]:
+        key, sep, value = part.decode(errors="replace").partition("=")
+        if sep:
+            props[key] = value
+    return Uevent(action, devpath, props)
+
+
+def device_matcher(vendor_id, product_id):
+    """Return a function that tells whether a uevent belongs to the device"""
+    hid_tag = f":{vendor_id:04X}:{product_id:04X}."
+    usb_product = f"{vendor_id:x}/{product_id:x}/"
+
+    def matches(event):
+        return (hid_tag in event.devpath.upper()
+                or event.props.get("PRODUCT", "").startswith(usb_product))
+    return matches
+
+
+class UeventMonitor:
+    """Receive kernel uevents; sock may be any datagram socket for testing"""
+
+    def __init__(self, sock=None):
+        if sock is None:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, KERNEL_GROUP))
+        self.sock = sock
+
+    def receive(self, timeout=None):
+        """Return the next uevent, or None if none arrived within timeout"""
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        if not readable:
+            return None
+        return parse_uevent(self.sock.recv(65536))
+
+    def close(self):
+        self.sock.close()
+
+
+class HotplugWatcher:
+    """Call on_add/on_remove from a background thread for matching uevents
+
+    on_add fires when a hidraw node for the device appears, which is the
+    point where hidapi can open it again; on_remove fires for any removal.
+    """
+
+    def __init__(self, monitor, match, on_add, on_remove):
+        self.monitor = monitor
+        self.match = match
+        self.on_add = on_add
+        self.on_remove = on_remove
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="hotplug", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.running:
+            try:
+                event = self.monitor.receive(timeout=0.5)
+            except OSError:
+                return
+            if event is None or not self.match(event):
+                continue
+            if event.action == "remove":
+                self.on_remove(event)
+            elif event.action == "add" and event.subsystem == "hidraw":
+                self.on_add(event)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.monitor.close()
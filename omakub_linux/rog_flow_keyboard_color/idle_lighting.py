@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Idle-aware keyboard lighting
+Dims or turns off the keyboard lighting when hypridle or logind reports the
+machine idle, locked or going to sleep, and restores it at once on resume.
+Host effect loops are paused while idle instead of rendering frames nobody
+sees. Fades use a brightness ramp precomputed per transition, and every
+report of a fade is built before the first one is sent.
+
+The hooks only tell rgbd (and effects.py --idle-socket) what to do and
+return; they are idempotent, so hypridle may call them repeatedly:
+
+    python3 idle_lighting.py dim      # hypridle on-timeout
+    python3 idle_lighting.py off      # on-timeout, before_sleep_cmd
+    python3 idle_lighting.py resume   # on-resume, after_sleep_cmd
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+from aura_protocol import ZONE_ALL
+from rgbd_client import SOCKET_PATH
+
+EFFECTS_SOCKET = os.environ.get("ROG_RGB_IDLE_SOCKET", "/run/rog-rgb-effects.sock")
+
+ACTIVE = 0
+DIM = 1
+OFF = 2
+LEVELS = {"dim": DIM, "off": OFF}
+# Brightness of each level
+BRIGHTNESS = {ACTIVE: 1.0, DIM: 0.3, OFF: 0.0}
+
+FADE_TIME = 0.4
+FADE_STEPS = 10
+# Modes whose first three arguments are a color that can be scaled
+COLOR_MODES = ("static", "breathe", "pulse")
+
+
+def fade_ramp(start, end, steps=FADE_STEPS):
+    """Brightness factors from start to end, easing out, ending exactly at end"""
+    ramp = [start + (end - start) * (1 - (1 - n / steps) ** 2) for n in range(1, steps)]
+    return tuple(ramp) + (end,)
+
+
+RAMPS = {(a, b): fade_ramp(BRIGHTNESS[a], BRIGHTNESS[b]) for a in BRIGHTNESS for b in BRIGHTNESS if b > a}
+
+
+def scale_state(state, factor):
+    """A zone state ("static", (r, g, b)) scaled by factor; modes without a
+    color (rainbow) are kept until factor reaches 0, then turned off"""
+    name, args = state
+    if name in COLOR_MODES:
+        return name, tuple(int(c * factor) for c in args[:3]) + tuple(args[3:])
+    if factor <= 0:
+        return "static", (0, 0, 0)
+    return state
+
+
+class IdleLighting:
+    """Idle state for a KeyboardController, or an EffectsEngine
+
+    idle(level) and resume() return as soon as the change is queued; a
+    fade runs on its own thread and is dropped the moment resume() comes
+    in. How long each hook took is kept in hook_times.
+    """
+
+    def __init__(self, controller=None, engine=None):
+        self.controller = controller
+        self.engine = engine
+        self.level = ACTIVE
+        self.saved = None
+        self.engine_running = False
+        self.brightness = 1.0
+        # Bumped on every transition; a fade only sends while it is current
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.hook_times = {"idle": [], "resume": []}
+
+    def idle(self, level):
+        """Fade down to level (DIM or OFF); a no-op if already there or lower"""
+        start = time.perf_counter()
+        with self.lock:
+            if level > self.level:
+                if self.level == ACTIVE:
+                    self._pause()
+                steps = [self._frame(factor) for factor in RAMPS[(self.level, level)]]
+                self.level = level
+                self.generation += 1
+                threading.Thread(target=self._fade, args=(steps, self.generation),
+                                 name="idle-fade", daemon=True).start()
+        self._record("idle", start)
+        return True
+
+    def resume(self):
+        """Restore the lighting from before idle() at once"""
+        start = time.perf_counter()
+        with self.lock:
+            if self.level != ACTIVE:
+                self.generation += 1
+                self.level = ACTIVE
+                self._restore()
+        self._record("resume", start)
+        return True
+
+    def activity(self):
+        """Someone set new lighting while idle: drop the saved state"""
+        with self.lock:
+            if self.level != ACTIVE:
+                self.generation += 1
+                self.level = ACTIVE
+                self.saved = None
+                self.engine_running = False
+
+    def _pause(self):
+        if self.engine:
+            self.engine_running = self.engine.thread is not None
+            self.engine.stop()
+            self.brightness = self.engine.brightness
+        else:
+            frame = self.controller.frame
+            self.saved = {zone: state for zone, state in frame.state.items() if state is not None}
+            states = set(self.saved.values())
+            if len(states) == 1 and len(self.saved) == len(frame.zones):
+                # One whole-keyboard report instead of one per zone
+                self.saved = {ZONE_ALL: states.pop()}
+
+    def _frame(self, factor):
+        """Everything one fade step sends, built ahead of the fade"""
+        if self.engine:
+            r, g, b = self.engine.effect.frame(self.engine.offset)
+            scale = self.brightness * factor
+            return [(self.engine.zone, ("static", (int(r * scale), int(g * scale), int(b * scale))))]
+        return [(zone, scale_state(state, factor)) for zone, state in self.saved.items()]
+
+    def _fade(self, steps, generation):
+        interval = FADE_TIME / len(steps)
+        for n, frame in enumerate(steps):
+            if n:
+                time.sleep(interval)
+            with self.lock:
+                if generation != self.generation:
+                    return
+                self._send(frame)
+
+    def _send(self, frame):
+        if self.engine:
+            self.engine.last_color = None
+            for zone, (name, args) in frame:
+                self.engine.writer.submit(zone, getattr(self.engine.encoder, name), *args, zone)
+            return
+        for zone, (name, args) in frame:
+            self.controller.send_packet(getattr(self.controller.encoder, name), *args, zone=zone)
+
+    def _restore(self):
+        if self.engine:
+            self.engine.brightness = self.brightness
+            self.engine.last_color = None
+            if self.engine_running:
+                self.engine.start()
+            else:
+                self._send(self._frame(1.0))
+            return
+        if self.saved:
+            self._send(list(self.saved.items()))
+        self.saved = None
+
+    def _record(self, hook, start):
+        times = self.hook_times[hook]
+        times.append((time.perf_counter() - start) * 1000)
+        del times[:-100]
+
+    def metrics(self):
+        """Idle level and the last and slowest hook handling times in milliseconds"""
+        metrics = {"idle_level": self.level}
+        for hook, times in self.hook_times.items():
+            if times:
+                metrics[f"{hook}_hook_ms"] = round(times[-1], 3)
+                metrics[f"{hook}_hook_max_ms"] = round(max(times), 3)
+        return metrics
+
+
+def parse_hook(text):
+    """("idle", level) or ("resume", None) from "dim", "off" or "resume", else None"""
+    if text in LEVELS:
+        return "idle", LEVELS[text]
+    if text == "resume":
+        return "resume", None
+    return None
+
+
+class IdleSocket:
+    """Serve dim/off/resume datagrams for an IdleLighting, e.g. in effects.py"""
+
+    def __init__(self, idle, path=EFFECTS_SOCKET, mode=0o666):
+        self.idle = idle
+        self.path = path
+        if os.path.exists(path):
+            os.unlink(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        os.chmod(path, mode)
+        self.thread = threading.Thread(target=self._run, name="idle-socket", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                data = self.sock.recv(64)
+            except OSError:
+                return
+            hook = parse_hook(data.decode(errors="replace").strip())
+            if hook == ("resume", None):
+                self.idle.resume()
+            elif hook:
+                self.idle.idle(hook[1])
+
+    def close(self):
+        self.sock.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def send_hook(name, rgbd_path=SOCKET_PATH, effects_path=EFFECTS_SOCKET, timeout=1.0):
+    """Tell rgbd and a running effects.py; returns how many of them took it"""
+    cmd, level = parse_hook(name)
+    delivered = 0
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(rgbd_path)
+            request = {"cmd": cmd, "args": [level] if level is not None else []}
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            # rgbd answers once the change is queued
+            delivered += json.loads(sock.makefile("rb").readline() or b"{}").get("ok", False)
+    except (OSError, ValueError):
+        pass
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(name.encode(), effects_path)
+            delivered += 1
+    except OSError:
+        pass
+    return delivered
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    verbose = "-v" in argv
+    argv = [arg for arg in argv if arg != "-v"]
+    if len(argv) != 1 or parse_hook(argv[0]) is None:
+        print("usage: idle_lighting.py dim|off|resume [-v]")
+        return 2
+    start = time.perf_counter()
+    delivered = send_hook(argv[0])
+    if verbose:
+        print(f"{argv[0]}: delivered to {delivered} listener(s) in "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    # Nothing listening is not an error: the lighting may simply not be in use
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/bin/bash
+
+# Installation script for the keyboard RGB daemon (rgbd)
+# Keeps the HID device open so the RGB tools can run without sudo
+
+set -e
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PYTHON="$SCRIPT_DIR/.venv/bin/python3"
+if [ ! -x "$PYTHON" ]; then
+    PYTHON="$(command -v python3)"
+fi
+
+echo "Installing ROG keyboard RGB daemon..."
+
+# Only members of this group may use the daemon's socket
+GROUP=rog-rgb
+echo "Adding $USER to the $GROUP group..."
+sudo groupadd -f "$GROUP"
+sudo usermod -aG "$GROUP" "$USER"
+
+# Create the systemd service
+cat > /tmp/rog-rgbd.service << EOF2
+[Unit]
+Description=ROG Flow Z13 keyboard RGB daemon
+After=systemd-udevd.service
+
+[Service]
+Type=simple
+ExecStart=$PYTHON $SCRIPT_DIR/rgbd.py --adaptive --group $GROUP
+Restart=on-failure
+
+[Install]
+WantedBy=multi-user.target
+EOF2
+
+# Install the systemd service
+echo "Installing systemd service..."
+sudo cp /tmp/rog-rgbd.service /etc/systemd/system/
+
+# Enable the service
+echo "Enabling service..."
+sudo systemctl daemon-reload
+sudo systemctl enable --now rog-rgbd.service
+
+# Install the idle hook that hypridle calls
+echo "Installing rog-rgb-idle..."
+chmod +x "$SCRIPT_DIR/idle_lighting.py"
+sudo ln -sf "$SCRIPT_DIR/idle_lighting.py" /usr/local/bin/rog-rgb-idle
+
+# Clean up temp files
+rm /tmp/rog-rgbd.service
+
+echo ""
+echo "✓ Installation complete!"
+echo ""
+echo "The RGB tools now talk to rgbd and no longer need sudo."
+echo "Log out and back in so the $GROUP group membership applies."
+echo ""
+echo "hypridle dims the keyboard with rog-rgb-idle dim|off|resume."
+echo ""
+echo "To check service status: systemctl status rog-rgbd.service"
+echo "To uninstall: sudo systemctl disable --now rog-rgbd.service && sudo rm /etc/systemd/system/rog-rgbd.service /usr/local/bin/rog-rgb-idle && sudo groupdel $GROUP"
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+ROG Flow Z13 keyboard controller shared by the GUIs, CLI tools and rgbd
+Reconnects by itself when the keyboard comes back after suspend or a USB
+unbind/rebind, and replays the last lighting state
+"""
+
+import os
+import threading
+import time
+
+from aura_protocol import AuraEncoder, KEYBOARD_ZONES, ZONE_ALL, ZoneFrame
+from hid_discovery import shared_index
+from hid_writer import CoalescingWriter
+from hotplug import HotplugWatcher, UeventMonitor, device_matcher
+from pacing import AdaptivePacer, PacingStore, device_key
+
+# Device IDs
+VENDOR_ID = 0x0B05
+PRODUCT_ID = 0x1A30
+
+# Maximum HID reports per second sent to the keyboard
+MAX_WRITE_RATE = 20.0
+
+# Reopen backoff: the hidraw node can show up before hid-asus is ready
+RECONNECT_DELAY = 0.05
+RECONNECT_MAX_DELAY = 2.0
+RECONNECT_ATTEMPTS = 8
+# How long replaying the last state may take before it counts as failed
+RESTORE_TIMEOUT = 2.0
+# Usage page of the Aura interface, as hid.enumerate() reports it
+AURA_USAGE_PAGE = 0xFF31
+
+
+def open_interface(device, interface, vendor_id, product_id, enumerate_devices):
+    """Open device on the Aura interface the discovery index found
+
+    hidapi's hidraw backend opens /dev/hidrawN directly. The libusb backend,
+    which the pip hidapi wheel uses on Linux, names devices bus:addr:iface
+    instead; when the node is rejected, the path of the interface on the Aura
+    usage page is taken from enumerate_devices(vendor_id, product_id), and
+    as a last resort the first vendor_id:product_id device is opened.
+    """
+    if interface is not None:
+        try:
+            device.open_path(interface.node.encode())
+            return
+        except OSError:
+            pass
+    candidates = [info for info in enumerate_devices(vendor_id, product_id)
+                  if info.get("usage_page") == AURA_USAGE_PAGE]
+    if interface is not None:
+        # Several interfaces can share the usage page; prefer the index's
+        candidates.sort(key=lambda info: info.get("interface_number") != interface.interface)
+    for info in candidates:
+        try:
+            device.open_path(info["path"])
+            return
+        except OSError:
+            continue
+    device.open(vendor_id, product_id)
+
+
+def open_device(fake=False, vendor_id=VENDOR_ID, product_id=PRODUCT_ID, port=None):
+    """Open the keyboard, or a fake device for headless runs
+
+    The real keyboard is opened by the hidraw path the discovery index
+    resolves, so hidapi does not enumerate every HID device on each open;
+    see open_interface() for hidapi builds that do not take hidraw paths.
+    port (a USB port such as "1-5") picks one of several identical devices.
+    With ROG_HID_CAPTURE=path set, all traffic is captured to path.
+    """
+    if fake:
+        from fake_hid import FakeDevice
+        device = FakeDevice()
+    else:
+        import hid
+        device = hid.device()
+        interface = shared_index().aura_interface(vendor_id, product_id, port)
+        if interface is None and port is not None:
+            raise IOError(f"no {vendor_id:04x}:{product_id:04x} device on USB port {port}")
+    capture = os.environ.get("ROG_HID_CAPTURE")
+    if capture:
+        from hid_capture import RecordingDevice
+        device = RecordingDevice(device, capture)
+    if fake:
+        device.open(vendor_id, product_id)
+    else:
+        open_interface(device, interface, vendor_id, product_id, hid.enumerate)
+    return device
+
+
+class KeyboardController:
+    """Lighting state and writer for one Aura device, the Z13 keyboard by default
+
+    opener() returns an opened device; it defaults to open_device() for
+    vendor_id:product_id on port.
+    """
+
+    def __init__(self, max_rate=MAX_WRITE_RATE, fake=False, monitor=None, adaptive=False,
+                 vendor_id=VENDOR_ID, product_id=PRODUCT_ID, port=None, opener=None):
+        self.vendor_id = vendor_id
+        self.product_id = product_id
+        self.port = port
+        self.opener = opener or (lambda: open_device(fake, vendor_id, product_id, port))
+        self.device = None
+        self.writer = None
+        self.max_rate = max_rate
+        self.fake = fake
+        # Learn the report gap per device instead of pacing at max_rate
+        self.adaptive = adaptive
+        self.pacer = None
+        # Only used on the writer thread, which owns the encoded buffers
+        self.encoder = AuraEncoder()
+        # Last state sent per zone; unchanged zones are not sent again
+        self.frame = ZoneFrame(KEYBOARD_ZONES)
+        self.packets_skipped = 0
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.reconnecting = False
+        self.device_added = False
+        self.disconnected_at = None
+        self.reconnects = 0
+        self.restore_times = []
+        self.watcher = None
+        self.connect()
+        self.watch_hotplug(monitor)
+
+    def connect(self):
+        """Connect to the keyboard device"""
+        try:
+            device = self.opener()
+        except Exception as e:
+            print(f"Error connecting to device: {e}")
+            return False
+        self.device = device
+        if self.writer:
+            self.writer.set_device(device)
+        else:
+            if self.adaptive:
+                self.pacer = AdaptivePacer(store=PacingStore(),
+                                           key=device_key(device, self.vendor_id, self.product_id))
+            self.writer = CoalescingWriter(device, self.max_rate, on_error=self.on_write_error,
+                                           pacer=self.pacer)
+        return True
+
+    def watch_hotplug(self, monitor=None):
+        """Reconnect on kernel hotplug events instead of polling for the device"""
+        if monitor is None and not self.fake:
+            try:
+                monitor = UeventMonitor()
+            except OSError as e:
+                print(f"Hotplug events unavailable, falling back to retries: {e}")
+                return
+        if monitor is not None:
+            self.watcher = HotplugWatcher(monitor, device_matcher(self.vendor_id, self.product_id),
+                                          self.on_device_added, self.on_device_removed)
+
+    def on_device_removed(self, event):
+        """The keyboard went away; keep coalescing reports until it is back"""
+        shared_index().on_uevent(event.action, event.subsystem)
+        with self.lock:
+            self._mark_disconnected()
+            self.device = None
+        if self.writer:
+            self.writer.set_device(None)
+
+    def on_device_added(self, event):
+        """A hidraw node for the keyboard appeared; reopen it"""
+        shared_index().on_uevent(event.action, event.subsystem)
+        with self.lock:
+            self.device_added = True
+            if self.device is not None or self.reconnecting:
+                return
+            self.reconnecting = True
+        threading.Thread(target=self._reconnect, args=(RECONNECT_ATTEMPTS,),
+                         name="hid-reconnect", daemon=True).start()
+
+    def on_write_error(self, error):
+        """Called on the writer thread when a report could not be written"""
+        with self.lock:
+            self._mark_disconnected()
+            self.device = None
+            if self.reconnecting:
+                return
+            self.reconnecting = True
+            self.device_added = False
+        # With hotplug events one quick retry covers transient errors and the
+        # add event does the rest; without them, back off on our own
+        attempts = 1 if self.watcher else RECONNECT_ATTEMPTS
+        threading.Thread(target=self._reconnect, args=(attempts,),
+                         name="hid-reconnect", daemon=True).start()
+
+    def _mark_disconnected(self):
+        # CLOCK_MONOTONIC stops during suspend, so this measures awake time only
+        if self.disconnected_at is None:
+            self.disconnected_at = time.monotonic()
+
+    def _reconnect(self, attempts):
+        delay = RECONNECT_DELAY
+        while True:
+            with self.lock:
+                self.device_added = False
+            for _ in range(attempts):
+                if self.connect():
+                    self._restored()
+                    with self.lock:
+                        self.reconnecting = False
+                    return
+                if self.stopping.wait(delay):
+                    break
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+            with self.lock:
+                # An add event that came in meanwhile earns another round
+                if self.stopping.is_set() or not self.device_added:
+                    self.reconnecting = False
+                    return
+            attempts = RECONNECT_ATTEMPTS
+
+    def _restored(self):
+        """Wait for the replayed state to be written and record how long it took"""
+        if not self.writer.flush(RESTORE_TIMEOUT):
+            print("Keyboard reconnected, but restoring the lighting timed out")
+            return
+        with self.lock:
+            disconnected_at, self.disconnected_at = self.disconnected_at, None
+            self.reconnects += 1
+            if disconnected_at is None:
+                return
+            restore_ms = (time.monotonic() - disconnected_at) * 1000
+            self.restore_times.append(restore_ms)
+        print(f"Keyboard reconnected, lighting restored in {restore_ms:.0f} ms")
+
+    def metrics(self):
+        """Reconnect count, time-to-restored-lighting and report gap in milliseconds"""
+        with self.lock:
+            metrics = {
+                "reconnects": self.reconnects,
+                "last_restore_ms": round(self.restore_times[-1], 1) if self.restore_times else None,
+                "max_restore_ms": round(max(self.restore_times), 1) if self.restore_times else None,
+            }
+        if self.pacer:
+            metrics["report_gap_ms"] = round(self.pacer.interval * 1000, 2)
+        return metrics
+
+    def send_packet(self, encode, *args, zone=ZONE_ALL, trace=None):
+        """Queue a HID report for zone unless the zone already shows it
+
+        Only the newest pending report per zone is sent. A whole-keyboard
+        report replaces whatever single zones were queued or set before.
+        """
+        if not self.writer:
+            return False
+        if not self.frame.update(zone, (encode.__name__, args)):
+            self.packets_skipped += 1
+            if trace:
+                trace.finish("skipped")
+            return True
+        if zone == ZONE_ALL:
+            self.writer.drop(self.frame.zones)
+        # The report is encoded on the writer thread right before it is written
+        return self.writer.submit(zone, self._encode, encode, zone, *args, trace=trace)
+
+    @staticmethod
+    def _encode(encode, zone, *args):
+        return encode(*args, zone=zone)
+
+    def set_zone_colors(self, colors):
+        """Set static colors per zone from {zone: (r, g, b)}; only changed zones are sent"""
+        if not self.writer:
+            return False
+        ok = True
+        for zone, rgb in colors.items():
+            ok = self.send_packet(self.encoder.static, *rgb, zone=zone) and ok
+        return ok
+
+    def invalidate(self):
+        """Send the next update for every zone even if it looks unchanged"""
+        self.frame.invalidate()
+
+    def set_static_color(self, r, g, b, zone=ZONE_ALL, trace=None):
+        """Set static color mode"""
+        return self.send_packet(self.encoder.static, r, g, b, zone=zone, trace=trace)
+
+    def set_breathe_mode(self, r, g, b, speed=0xeb, zone=ZONE_ALL, trace=None):
+        """Set breathing effect"""
+        return self.send_packet(self.encoder.breathe, r, g, b, speed, zone=zone, trace=trace)
+
+    def set_pulse_mode(self, r, g, b, speed=0xeb, zone=ZONE_ALL, trace=None):
+        """Set pulse effect"""
+        return self.send_packet(self.encoder.pulse, r, g, b, speed, zone=zone, trace=trace)
+
+    def set_rainbow_mode(self, speed=0xeb, zone=ZONE_ALL, trace=None):
+        """Set rainbow cycle mode"""
+        return self.send_packet(self.encoder.rainbow, speed, zone=zone, trace=trace)
+
+    def close(self):
+        """Flush pending packets and close device connection"""
+        self.stopping.set()
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        if self.pacer:
+            self.pacer.save()
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+        elif self.device:
+            self.device.close()
+        self.device = None
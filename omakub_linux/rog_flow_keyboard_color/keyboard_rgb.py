@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+ROG Flow Z13 keyboard RGB command line
+Sets the lighting without starting Qt; the GUIs are only imported on request
+
+    python3 keyboard_rgb.py set static ff8000
+    python3 keyboard_rgb.py set breathe 00ff00 --speed 0xe1
+    python3 keyboard_rgb.py set rainbow
+    python3 keyboard_rgb.py gui [--full]
+"""
+
+import argparse
+import os
+import sys
+
+from aura_protocol import SPEED_MEDIUM
+from rgbd_client import SOCKET_PATH, connect_daemon
+
+MODES = ("static", "breathe", "pulse", "rainbow")
+
+
+def parse_color(text):
+    """Parse "ff8000" or "#ff8000" into an (r, g, b) tuple"""
+    text = text.lstrip("#")
+    if len(text) != 6:
+        raise argparse.ArgumentTypeError(f"expected a hex color like ff8000, got {text!r}")
+    try:
+        value = int(text, 16)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a hex color like ff8000, got {text!r}")
+    return (value >> 16) & 0xff, (value >> 8) & 0xff, value & 0xff
+
+
+def parse_byte(text):
+    value = int(text, 0)
+    if not 0 <= value <= 255:
+        raise argparse.ArgumentTypeError("must be 0-255")
+    return value
+
+
+def can_control(socket_path=SOCKET_PATH):
+    """Opening the device directly needs root; rgbd clients do not"""
+    return os.path.exists(socket_path) or os.geteuid() == 0
+
+
+def open_controller(socket_path=SOCKET_PATH, fake=False):
+    """Use rgbd when it is running, otherwise open the device directly"""
+    controller = None if fake else connect_daemon(socket_path)
+    if controller:
+        return controller
+    from keyboard_controller import KeyboardController
+    controller = KeyboardController(fake=fake)
+    return controller if controller.writer else None
+
+
+def set_lighting(args):
+    if args.mode != "rainbow" and args.color is None:
+        print(f"{args.mode} needs a color, e.g. ff8000")
+        return 2
+    if not args.fake and not can_control(args.socket):
+        print("Root privileges required. Start rgbd or run with sudo.")
+        return 1
+    controller = open_controller(args.socket, args.fake)
+    if not controller:
+        print("Could not open the keyboard")
+        return 1
+    if args.mode == "static":
+        ok = controller.set_static_color(*args.color)
+    elif args.mode == "breathe":
+        ok = controller.set_breathe_mode(*args.color, args.speed)
+    elif args.mode == "pulse":
+        ok = controller.set_pulse_mode(*args.color, args.speed)
+    else:
+        ok = controller.set_rainbow_mode(args.speed)
+    # Closing flushes the queued report to the device
+    controller.close()
+    return 0 if ok else 1
+
+
+def run_gui(args):
+    # Checked before Qt is imported, so a misconfigured launch fails fast
+    if not can_control(args.socket):
+        print("Root privileges required. Start rgbd or run with sudo:\n"
+              "  sudo python3 keyboard_rgb.py gui")
+        return 1
+    if args.full:
+        import keyboard_rgb_control as gui
+    else:
+        import keyboard_rgb_simple as gui
+    return gui.main()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ROG Flow Z13 keyboard RGB control")
+    parser.add_argument("--socket", default=SOCKET_PATH, help=f"rgbd socket (default {SOCKET_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    set_parser = commands.add_parser("set", help="set the keyboard lighting")
+    set_parser.add_argument("mode", choices=MODES)
+    set_parser.add_argument("color", nargs="?", type=parse_color, help="hex color, e.g. ff8000")
+    set_parser.add_argument("--speed", type=parse_byte, default=SPEED_MEDIUM,
+                            help="effect speed byte (default 0xeb)")
+    set_parser.add_argument("--fake", action="store_true", help="use a fake HID device")
+    set_parser.set_defaults(run=set_lighting)
+
+    gui_parser = commands.add_parser("gui", help="open the Qt GUI")
+    gui_parser.add_argument("--full", action="store_true", help="GUI with effect modes")
+    gui_parser.set_defaults(run=run_gui)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,101 +4,29 @@ ROG Flow Z13 Keyboard RGB Control GUI
 Simple GUI for controlling keyboard backlight colors
 """
 
-import hid
+import os
 import sys
-import time
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                               QHBoxLayout, QPushButton, QLabel, QSlider, 
                               QComboBox, QColorDialog, QMessageBox)
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import QSettings, Qt
 from PyQt6.QtGui import QColor
 
-# Device IDs
-VENDOR_ID = 0x0B05
-PRODUCT_ID = 0x1A30
+from keyboard_controller import KeyboardController
+from latency_trace import shared_tracer
+from rgbd_client import SOCKET_PATH, connect_daemon
 
-class KeyboardController:
-    def __init__(self):
-        self.device = None
-        self.connect()
-    
-    def connect(self):
-        """Connect to the keyboard device"""
-        try:
-            self.device = hid.device()
-            self.device.open(VENDOR_ID, PRODUCT_ID)
-            return True
-        except Exception as e:
-            print(f"Error connecting to device: {e}")
-            return False
-    
-    def send_packet(self, packet):
-        """Send a HID packet to the device"""
-        try:
-            if self.device:
-                full_packet = [0x00] + packet
-                self.device.write(full_packet)
-                time.sleep(0.05)
-                return True
-        except Exception as e:
-            print(f"Error sending packet: {e}")
-            return False
-        return False
-    
-    def set_static_color(self, r, g, b):
-        """Set static color mode"""
-        packet = [
-            0x5d, 0xb3, 0x00, 0x00,
-            r, g, b,
-            0xeb, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00, 0x00, 0x00
-        ]
-        packet += [0x00] * (64 - len(packet))
-        return self.send_packet(packet)
-    
-    def set_breathe_mode(self, r, g, b, speed=0xeb):
-        """Set breathing effect"""
-        packet = [
-            0x5d, 0xb4, 0x00, 0x00,
-            r, g, b,
-            speed, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00, 0x00, 0x00
-        ]
-        packet += [0x00] * (64 - len(packet))
-        return self.send_packet(packet)
-    
-    def set_pulse_mode(self, r, g, b, speed=0xeb):
-        """Set pulse effect"""
-        packet = [
-            0x5d, 0xbc, 0x00, 0x00,
-            r, g, b,
-            speed, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00, 0x00, 0x00
-        ]
-        packet += [0x00] * (64 - len(packet))
-        return self.send_packet(packet)
-    
-    def set_rainbow_mode(self, speed=0xeb):
-        """Set rainbow cycle mode"""
-        packet = [
-            0x5d, 0xb5, 0x00, 0x00,
-            0x00, 0x00, 0x00,
-            speed, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00, 0x00, 0x00
-        ]
-        packet += [0x00] * (64 - len(packet))
-        return self.send_packet(packet)
-    
-    def close(self):
-        """Close device connection"""
-        if self.device:
-            self.device.close()
+tracer = shared_tracer("rog_rgb", "ROG_RGB_TRACE")
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.controller = KeyboardController()
-        self.current_color = QColor(255, 255, 255)
+        # Use rgbd when it is running, otherwise open the device directly
+        self.controller = connect_daemon() or KeyboardController()
+        # Last applied settings; QSettings replaces its file atomically
+        self.settings = QSettings("rog-flow-z13", "keyboard-rgb")
+        self.saved_color = self.settings.value("color")
+        self.current_color = QColor(self.saved_color or "#ffffff")
         self.init_ui()
     
     def init_ui(self):
@@ -120,8 +48,8 @@ class MainWindow(QMainWindow):
         # RGB sliders
         layout.addWidget(QLabel("Red:"))
         self.red_slider = self.create_slider()
-        self.red_slider.setValue(255)
-        self.red_value_label = QLabel("255")
+        self.red_slider.setValue(self.current_color.red())
+        self.red_value_label = QLabel(str(self.current_color.red()))
         slider_layout = QHBoxLayout()
         slider_layout.addWidget(self.red_slider)
         slider_layout.addWidget(self.red_value_label)
@@ -129,8 +57,8 @@ class MainWindow(QMainWindow):
         
         layout.addWidget(QLabel("Green:"))
         self.green_slider = self.create_slider()
-        self.green_slider.setValue(255)
-        self.green_value_label = QLabel("255")
+        self.green_slider.setValue(self.current_color.green())
+        self.green_value_label = QLabel(str(self.current_color.green()))
         slider_layout = QHBoxLayout()
         slider_layout.addWidget(self.green_slider)
         slider_layout.addWidget(self.green_value_label)
@@ -138,8 +66,8 @@ class MainWindow(QMainWindow):
         
         layout.addWidget(QLabel("Blue:"))
         self.blue_slider = self.create_slider()
-        self.blue_slider.setValue(255)
-        self.blue_value_label = QLabel("255")
+        self.blue_slider.setValue(self.current_color.blue())
+        self.blue_value_label = QLabel(str(self.current_color.blue()))
         slider_layout = QHBoxLayout()
         slider_layout.addWidget(self.blue_slider)
         slider_layout.addWidget(self.blue_value_label)
@@ -159,6 +87,7 @@ class MainWindow(QMainWindow):
         layout.addWidget(QLabel("Effect Mode:"))
         self.mode_combo = QComboBox()
         self.mode_combo.addItems(["Static", "Breathe", "Pulse", "Rainbow"])
+        self.mode_combo.setCurrentText(self.settings.value("mode", "Static"))
         layout.addWidget(self.mode_combo)
         
         # Speed slider (for effects)
@@ -166,13 +95,14 @@ class MainWindow(QMainWindow):
         self.speed_slider = QSlider(Qt.Orientation.Horizontal)
         self.speed_slider.setMinimum(0)
         self.speed_slider.setMaximum(255)
-        self.speed_slider.setValue(235)  # 0xeb
+        self.speed_slider.setValue(int(self.settings.value("speed", 235)))  # 0xeb
         self.speed_value_label = QLabel("Medium")
         slider_layout = QHBoxLayout()
         slider_layout.addWidget(self.speed_slider)
         slider_layout.addWidget(self.speed_value_label)
         layout.addLayout(slider_layout)
         self.speed_slider.valueChanged.connect(self.update_speed_label)
+        self.update_speed_label()
         
         # Apply button
         apply_btn = QPushButton("Apply")
@@ -201,6 +131,10 @@ class MainWindow(QMainWindow):
         layout.addLayout(quick_colors_layout)
         
         layout.addStretch()
+        
+        # Restore the last settings; nothing is sent if rgbd already shows them
+        if self.saved_color:
+            self.apply_settings()
     
     def create_slider(self):
         slider = QSlider(Qt.Orientation.Horizontal)
@@ -246,6 +180,7 @@ class MainWindow(QMainWindow):
         self.apply_settings()
     
     def apply_settings(self):
+        trace = tracer.begin("apply_settings")
         r = self.red_slider.value()
         g = self.green_slider.value()
         b = self.blue_slider.value()
@@ -254,35 +189,36 @@ class MainWindow(QMainWindow):
         
         success = False
         if mode == "Static":
-            success = self.controller.set_static_color(r, g, b)
+            success = self.controller.set_static_color(r, g, b, trace=trace)
         elif mode == "Breathe":
-            success = self.controller.set_breathe_mode(r, g, b, speed)
+            success = self.controller.set_breathe_mode(r, g, b, speed, trace=trace)
         elif mode == "Pulse":
-            success = self.controller.set_pulse_mode(r, g, b, speed)
+            success = self.controller.set_pulse_mode(r, g, b, speed, trace=trace)
         elif mode == "Rainbow":
-            success = self.controller.set_rainbow_mode(speed)
+            success = self.controller.set_rainbow_mode(speed, trace=trace)
         
         if not success:
             QMessageBox.warning(self, "Error", "Failed to apply settings. Make sure you're running with sudo.")
+            return
+        self.settings.setValue("color", QColor(r, g, b).name())
+        self.settings.setValue("mode", mode)
+        self.settings.setValue("speed", speed)
     
     def closeEvent(self, event):
         self.controller.close()
+        self.settings.sync()
+        tracer.export()
         event.accept()
 
 def main():
-    app = QApplication(sys.argv)
-    
-    # Check if running as root
-    import os
-    if os.geteuid() != 0:
-        msg = QMessageBox()
-        msg.setIcon(QMessageBox.Icon.Warning)
-        msg.setText("Root privileges required")
-        msg.setInformativeText("Please run this application with sudo:\nsudo python3 keyboard_rgb_control.py")
-        msg.setWindowTitle("Permission Error")
-        msg.exec()
+    # Opening the device directly needs root; rgbd clients do not.
+    # Checked before QApplication so a misconfigured launch fails fast.
+    if not os.path.exists(SOCKET_PATH) and os.geteuid() != 0:
+        print("Root privileges required. Start rgbd or run this application with sudo:\n"
+              "  sudo python3 keyboard_rgb_control.py")
         sys.exit(1)
     
+    app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
@@ -4,68 +4,29 @@ ROG Flow Z13 Keyboard RGB Control - Simple Static Mode
 Simplified GUI for static keyboard backlight colors only
 """
 
-import hid
+import os
 import sys
-import time
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                               QHBoxLayout, QPushButton, QLabel, QSlider, 
-                              QColorDialog, QMessageBox)
-from PyQt6.QtCore import Qt
+                              QColorDialog)
+from PyQt6.QtCore import QSettings, Qt
 from PyQt6.QtGui import QColor
 
-# Device IDs
-VENDOR_ID = 0x0B05
-PRODUCT_ID = 0x1A30
+from keyboard_controller import KeyboardController
+from latency_trace import shared_tracer
+from rgbd_client import SOCKET_PATH, connect_daemon
 
-class KeyboardController:
-    def __init__(self):
-        self.device = None
-        self.connect()
-    
-    def connect(self):
-        """Connect to the keyboard device"""
-        try:
-            self.device = hid.device()
-            self.device.open(VENDOR_ID, PRODUCT_ID)
-            return True
-        except Exception as e:
-            print(f"Error connecting to device: {e}")
-            return False
-    
-    def send_packet(self, packet):
-        """Send a HID packet to the device"""
-        try:
-            if self.device:
-                full_packet = [0x00] + packet
-                self.device.write(full_packet)
-                time.sleep(0.05)
-                return True
-        except Exception as e:
-            print(f"Error sending packet: {e}")
-            return False
-        return False
-    
-    def set_static_color(self, r, g, b):
-        """Set static color mode"""
-        packet = [
-            0x5d, 0xb3, 0x00, 0x00,
-            r, g, b,
-            0xeb, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00, 0x00, 0x00
-        ]
-        packet += [0x00] * (64 - len(packet))
-        return self.send_packet(packet)
-    
-    def close(self):
-        """Close device connection"""
-        if self.device:
-            self.device.close()
+tracer = shared_tracer("rog_rgb", "ROG_RGB_TRACE")
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.controller = KeyboardController()
-        self.current_color = QColor(255, 255, 255)
+        # Use rgbd when it is running, otherwise open the device directly
+        self.controller = connect_daemon() or KeyboardController()
+        # Last applied settings; QSettings replaces its file atomically
+        self.settings = QSettings("rog-flow-z13", "keyboard-rgb")
+        self.saved_color = self.settings.value("color")
+        self.current_color = QColor(self.saved_color or "#ffffff")
         self.init_ui()
     
     def init_ui(self):
@@ -93,8 +54,8 @@ class MainWindow(QMainWindow):
         # RGB sliders
         layout.addWidget(QLabel("Red:"))
         self.red_slider = self.create_slider()
-        self.red_slider.setValue(255)
-        self.red_value_label = QLabel("255")
+        self.red_slider.setValue(self.current_color.red())
+        self.red_value_label = QLabel(str(self.current_color.red()))
         self.red_value_label.setFixedWidth(40)
         self.red_value_label.setAlignment(Qt.AlignmentFlag.AlignRight)
         slider_layout = QHBoxLayout()
@@ -104,8 +65,8 @@ class MainWindow(QMainWindow):
         
         layout.addWidget(QLabel("Green:"))
         self.green_slider = self.create_slider()
-        self.green_slider.setValue(255)
-        self.green_value_label = QLabel("255")
+        self.green_slider.setValue(self.current_color.green())
+        self.green_value_label = QLabel(str(self.current_color.green()))
         self.green_value_label.setFixedWidth(40)
         self.green_value_label.setAlignment(Qt.AlignmentFlag.AlignRight)
         slider_layout = QHBoxLayout()
@@ -115,8 +76,8 @@ class MainWindow(QMainWindow):
         
         layout.addWidget(QLabel("Blue:"))
         self.blue_slider = self.create_slider()
-        self.blue_slider.setValue(255)
-        self.blue_value_label = QLabel("255")
+        self.blue_slider.setValue(self.current_color.blue())
+        self.blue_value_label = QLabel(str(self.current_color.blue()))
         self.blue_value_label.setFixedWidth(40)
         self.blue_value_label.setAlignment(Qt.AlignmentFlag.AlignRight)
         slider_layout = QHBoxLayout()
@@ -159,8 +120,9 @@ class MainWindow(QMainWindow):
         
         layout.addStretch()
         
-        # Set initial color
-        self.apply_color()
+        # Restore the last color; nothing is sent if rgbd already shows it
+        if self.saved_color:
+            self.apply_color()
     
     def create_slider(self):
         slider = QSlider(Qt.Orientation.Horizontal)
@@ -169,6 +131,7 @@ class MainWindow(QMainWindow):
         return slider
     
     def slider_changed(self):
+        trace = tracer.begin("slider")
         r = self.red_slider.value()
         g = self.green_slider.value()
         b = self.blue_slider.value()
@@ -181,7 +144,7 @@ class MainWindow(QMainWindow):
         self.color_label.setStyleSheet(f"background-color: {self.current_color.name()}; border: 2px solid black; border-radius: 5px;")
         
         # Apply color immediately
-        self.apply_color()
+        self.apply_color(trace)
     
     def choose_color(self):
         color = QColorDialog.getColor(self.current_color, self)
@@ -199,33 +162,32 @@ class MainWindow(QMainWindow):
         self.blue_slider.setValue(color.blue())
         # Color is applied automatically by slider_changed
     
-    def apply_color(self):
+    def apply_color(self, trace=None):
         r = self.red_slider.value()
         g = self.green_slider.value()
         b = self.blue_slider.value()
         
-        success = self.controller.set_static_color(r, g, b)
+        success = self.controller.set_static_color(r, g, b, trace=trace)
         if not success:
             print("Failed to apply color")
+        else:
+            self.settings.setValue("color", QColor(r, g, b).name())
     
     def closeEvent(self, event):
         self.controller.close()
+        self.settings.sync()
+        tracer.export()
         event.accept()
 
 def main():
-    app = QApplication(sys.argv)
-    
-    # Check if running as root
-    import os
-    if os.geteuid() != 0:
-        msg = QMessageBox()
-        msg.setIcon(QMessageBox.Icon.Warning)
-        msg.setText("Root privileges required")
-        msg.setInformativeText("Please run this application with sudo:\nsudo python3 keyboard_rgb_simple.py")
-        msg.setWindowTitle("Permission Error")
-        msg.exec()
+    # Opening the device directly needs root; rgbd clients do not.
+    # Checked before QApplication so a misconfigured launch fails fast.
+    if not os.path.exists(SOCKET_PATH) and os.geteuid() != 0:
+        print("Root privileges required. Start rgbd or run this application with sudo:\n"
+              "  sudo python3 keyboard_rgb_simple.py")
         sys.exit(1)
     
+    app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
@@ -1,3 +1,7 @@
 #!/bin/bash
 cd "$(dirname "$0")"
-sudo DISPLAY=$DISPLAY XAUTHORITY=$XAUTHORITY .venv/bin/python3 keyboard_rgb_simple.py
+# rgbd holds the keyboard open, so the GUI only needs sudo without it
+if [ -S "${ROG_RGBD_SOCKET:-/run/rog-rgbd.sock}" ]; then
+    exec .venv/bin/python3 keyboard_rgb.py gui
+fi
+sudo DISPLAY=$DISPLAY XAUTHORITY=$XAUTHORITY .venv/bin/python3 keyboard_rgb.py gui
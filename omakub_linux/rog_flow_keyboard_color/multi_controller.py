@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Drive every Aura device at once: the Z13 keyboard, the lightbar and
+external ROG keyboards
+Each device gets its own KeyboardController and so its own writer thread.
+An update is queued to all of them and they write concurrently, so it takes
+as long as the slowest device rather than the sum of all of them.
+
+    sudo python3 multi_controller.py list
+    sudo python3 multi_controller.py static ff8000 [--target keyboard]
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+from aura_protocol import ZONE_ALL
+from hid_discovery import shared_index
+from keyboard_controller import MAX_WRITE_RATE, KeyboardController
+from keyboard_rgb import parse_color
+
+ASUS_VENDOR_ID = 0x0B05
+# Logical target names for known products; anything else is "external-<product>"
+TARGET_NAMES = {
+    0x1A30: "keyboard",  # Z13 detachable keyboard
+    0x18C6: "lightbar",  # N-KEY device behind the Z13 lightbar
+}
+
+
+class AuraTarget:
+    """One logical target: every attached device of one product"""
+
+    def __init__(self, name, vendor_id, product_id, ports):
+        self.name = name
+        self.vendor_id = vendor_id
+        self.product_id = product_id
+        self.ports = ports
+
+    def __repr__(self):
+        return f"AuraTarget({self.name}, {self.vendor_id:04x}:{self.product_id:04x}, ports {self.ports})"
+
+
+def target_name(product_id):
+    return TARGET_NAMES.get(product_id, f"external-{product_id:04x}")
+
+
+def discover_targets(index=None, vendor_id=ASUS_VENDOR_ID):
+    """Group every interface on the Aura usage page into targets by product"""
+    index = index or shared_index()
+    targets = {}
+    for (vendor, product), interface in index.aura_interfaces(vendor_id):
+        name = target_name(product)
+        target = targets.setdefault(name, AuraTarget(name, vendor, product, []))
+        if interface.port not in target.ports:
+            target.ports.append(interface.port)
+    return list(targets.values())
+
+
+class MultiController:
+    """The KeyboardController lighting API, fanned out to several devices
+
+    controllers maps a target name to the KeyboardControllers of its
+    devices. The set_* methods take targets, a list of names, to address
+    only some of them; by default every device is updated.
+    """
+
+    def __init__(self, controllers):
+        self.targets = controllers
+
+    @classmethod
+    def discover(cls, max_rate=MAX_WRITE_RATE, adaptive=False, names=None, index=None):
+        """Open every Aura device found, or those of the named targets"""
+        controllers = {}
+        for target in discover_targets(index):
+            if names and target.name not in names:
+                continue
+            for port in target.ports:
+                controller = KeyboardController(max_rate, adaptive=adaptive, vendor_id=target.vendor_id,
+                                                product_id=target.product_id, port=port)
+                if controller.writer:
+                    controllers.setdefault(target.name, []).append(controller)
+                else:
+                    controller.close()
+        return cls(controllers)
+
+    def controllers(self, targets=None):
+        return [controller for name, controllers in self.targets.items()
+                if targets is None or name in targets for controller in controllers]
+
+    def _fan_out(self, method, *args, targets=None, **kwargs):
+        """Queue the same update on every device; True if all of them took it
+
+        Each call only hands the report to that device's writer thread.
+        """
+        controllers = self.controllers(targets)
+        ok = bool(controllers)
+        for controller in controllers:
+            ok = getattr(controller, method)(*args, **kwargs) and ok
+        return ok
+
+    def set_static_color(self, r, g, b, zone=ZONE_ALL, targets=None):
+        """Set static color mode"""
+        return self._fan_out("set_static_color", r, g, b, zone=zone, targets=targets)
+
+    def set_breathe_mode(self, r, g, b, speed=0xeb, zone=ZONE_ALL, targets=None):
+        """Set breathing effect"""
+        return self._fan_out("set_breathe_mode", r, g, b, speed, zone=zone, targets=targets)
+
+    def set_pulse_mode(self, r, g, b, speed=0xeb, zone=ZONE_ALL, targets=None):
+        """Set pulse effect"""
+        return self._fan_out("set_pulse_mode", r, g, b, speed, zone=zone, targets=targets)
+
+    def set_rainbow_mode(self, speed=0xeb, zone=ZONE_ALL, targets=None):
+        """Set rainbow cycle mode"""
+        return self._fan_out("set_rainbow_mode", speed, zone=zone, targets=targets)
+
+    def set_zone_colors(self, colors, targets=None):
+        """Set static colors per zone from {zone: (r, g, b)}"""
+        return self._fan_out("set_zone_colors", colors, targets=targets)
+
+    def flush(self, timeout=None):
+        """Wait until every device has written its queued reports"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ok = True
+        for controller in self.controllers():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if controller.writer:
+                ok = controller.writer.flush(remaining) and ok
+        return ok
+
+    def metrics(self):
+        """Per-target lists of each device's KeyboardController metrics"""
+        return {name: [controller.metrics() for controller in controllers]
+                for name, controllers in self.targets.items()}
+
+    def close(self):
+        """Flush and close every device; the devices close in parallel"""
+        threads = [threading.Thread(target=controller.close) for controller in self.controllers()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.targets = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Set the lighting of every Aura device at once")
+    parser.add_argument("mode", choices=["list", "static", "breathe", "pulse", "rainbow"])
+    parser.add_argument("color", nargs="?", type=parse_color, help="hex color, e.g. ff8000")
+    parser.add_argument("--target", action="append", help="only this target (repeatable)")
+    args = parser.parse_args()
+
+    if args.mode == "list":
+        targets = discover_targets()
+        if not targets:
+            print("No Aura devices found")
+        for target in targets:
+            print(f"{target.name}: {target.vendor_id:04x}:{target.product_id:04x} on USB port(s) "
+                  f"{', '.join(target.ports)}")
+        return
+    if args.mode != "rainbow" and not args.color:
+        print(f"{args.mode} needs a color, e.g. ff8000")
+        sys.exit(2)
+
+    multi = MultiController.discover(names=args.target)
+    if not multi.controllers():
+        print("Could not open any Aura device. Try running with sudo.")
+        sys.exit(1)
+    start = time.monotonic()
+    if args.mode == "rainbow":
+        ok = multi.set_rainbow_mode()
+    else:
+        setters = {"static": multi.set_static_color, "breathe": multi.set_breathe_mode,
+                   "pulse": multi.set_pulse_mode}
+        ok = setters[args.mode](*args.color)
+    ok = multi.flush(2.0) and ok
+    print(f"Updated {len(multi.controllers())} device(s) in {(time.monotonic() - start) * 1000:.0f} ms")
+    multi.close()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
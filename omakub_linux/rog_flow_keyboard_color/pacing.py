@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Adaptive report pacing for the ROG Flow Z13 keyboard
+Learns the smallest safe gap between HID reports from how writes complete,
+instead of always waiting a fixed 50 ms, and remembers it per device
+"""
+
+import json
+import os
+
+CACHE_PATH = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                          "rog-flow-keyboard", "pacing.json")
+
+# Starting gap for a device we know nothing about (the old fixed sleep)
+DEFAULT_INTERVAL = 0.05
+MIN_INTERVAL = 0.001
+MAX_INTERVAL = 0.25
+# Shrink the gap after this many clean writes in a row
+PROBE_AFTER = 4
+PROBE_FACTOR = 0.8
+# A write taking this many times the usual write time means the device
+# pushed back; never less than BLOCK_MIN, so sub-millisecond noise is ignored
+BLOCK_FACTOR = 4
+BLOCK_MIN = 0.001
+# Safety margin added on top of a gap that was too short
+MARGIN = 1.1
+# Slow writes must come this many in a row to raise the floor, and a floor
+# is only saved once this many pushbacks agree with it: one slow write is
+# as likely to be scheduler jitter as the device
+CONFIRM_AFTER = 2
+# After this many clean writes in a row the floor is lowered a little and
+# probed again, so a floor learned too high does not stick
+DECAY_AFTER = 256
+DECAY_FACTOR = 0.9
+# Consecutive errors before the device is treated as gone
+MAX_RETRIES = 3
+
+
+def device_key(device, vendor_id, product_id):
+    """Identify a device for the pacing cache, by serial number when it has one"""
+    try:
+        serial = device.get_serial_number_string() or ""
+    except Exception:
+        serial = ""
+    return f"{vendor_id:04x}:{product_id:04x}:{serial}"
+
+
+class PacingStore:
+    """Learned gaps per device, kept in a small JSON file"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, interval, floor):
+        self.entries[key] = {"interval": interval, "floor": floor}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Could not save pacing cache: {e}")
+
+
+class AdaptivePacer:
+    """Learn the minimum gap between reports the device accepts
+
+    interval is the idle time left between the end of one write and the
+    start of the next. Every few clean writes it is shrunk a little, but
+    never below the floor. A write that fails, or that takes much longer
+    than writes usually take because the device is still busy, shows the
+    gap was too short: the gap backs off and the floor is raised to the gap
+    that would have been needed. A rejected write does so at once; a
+    slow write only if the next writes at the same gap are slow too. After a long run of
+    clean writes the floor decays and is probed again, so it follows the
+    device's real limit instead of only ever rising.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, floor=MIN_INTERVAL, store=None, key=None):
+        self.store = store
+        self.key = key
+        saved = store.get(key) if store and key else None
+        if saved:
+            interval, floor = saved["interval"], saved["floor"]
+        self.interval = interval
+        self.floor = floor
+        # Floor that enough pushbacks agreed with to be saved
+        self.saved_floor = floor
+        self.streak = 0
+        self.clean = 0
+        self.failures = 0
+        self.last_end = None
+        self.errors = 0
+        self.blocked = 0
+        # Usual duration of a clean write, the baseline for slow writes
+        self.write_time = None
+        # Gaps needed according to the slow writes in a row so far
+        self.slow = []
+        # Gaps needed according to recent pushbacks
+        self.pushbacks = []
+
+    def block_threshold(self):
+        """Write duration above which the device is taken to have pushed back"""
+        if self.write_time is None:
+            return BLOCK_MIN
+        return max(self.write_time * BLOCK_FACTOR, BLOCK_MIN)
+
+    def record(self, start, duration, error=None):
+        """Record one write; returns True if a failed write should be retried"""
+        idle = start - self.last_end if self.last_end is not None else None
+        self.last_end = start + duration
+        # Only writes started as soon as the gap allowed say anything about
+        # the device's limit
+        paced = idle is not None and idle < self.interval * 1.5
+        if error is not None:
+            self.errors += 1
+            self.failures += 1
+            if paced:
+                self._too_short(idle * MARGIN, confirmed=True)
+            self.interval = min(self.interval * 2, MAX_INTERVAL)
+            return self.failures <= MAX_RETRIES
+        self.failures = 0
+        if paced and duration > self.block_threshold():
+            self.blocked += 1
+            # The device held the write for about as long as the gap was short
+            self._too_short((idle + duration - (self.write_time or 0)) * MARGIN)
+            return False
+        self.slow = []
+        # Follow faster writes at once and similar ones slowly; writes held a
+        # little by the device must not creep into the baseline
+        if self.write_time is None or duration < self.write_time:
+            self.write_time = duration
+        elif duration < self.write_time * 2:
+            self.write_time += (duration - self.write_time) * 0.05
+        self.clean += 1
+        if self.clean >= DECAY_AFTER:
+            self.clean = 0
+            self.floor = max(self.floor * DECAY_FACTOR, MIN_INTERVAL)
+        self.streak += 1
+        if self.streak >= PROBE_AFTER:
+            self.streak = 0
+            self.interval = max(self.interval * PROBE_FACTOR, self.floor, MIN_INTERVAL)
+        return False
+
+    def _too_short(self, needed, confirmed=False):
+        self.streak = 0
+        needed = min(needed, MAX_INTERVAL)
+        if not confirmed:
+            # Keep the gap as it is: if the next write is slow again at the
+            # same gap it was the device, otherwise it was jitter
+            self.slow.append(needed)
+            # A busy device holds each write about as long; jitter does not
+            if max(self.slow) > min(self.slow) * MARGIN ** 2:
+                self.slow = [needed]
+            if len(self.slow) < CONFIRM_AFTER:
+                return
+            needed = min(self.slow)
+            self.slow = []
+        self.clean = 0
+        self.interval = max(self.interval, needed)
+        self.pushbacks = (self.pushbacks + [needed])[-8:]
+        if needed > self.floor:
+            self.floor = needed
+        # Saved only once another pushback needed about as much
+        agreeing = sum(1 for gap in self.pushbacks if self.floor / MARGIN <= gap <= self.floor * MARGIN)
+        if agreeing >= CONFIRM_AFTER and self.floor != self.saved_floor:
+            self.saved_floor = self.floor
+            self.save()
+
+    def save(self):
+        """Persist the learned gap for this device"""
+        if self.store and self.key:
+            self.store.put(self.key, max(self.interval, self.saved_floor), self.saved_floor)
+
+    def summary(self):
+        return (f"gap {self.interval * 1000:.1f} ms (floor {self.floor * 1000:.1f} ms), "
+                f"{self.errors} errors, {self.blocked} blocked writes")
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Power-aware lighting rules for the ROG Flow Z13 keyboard
+Watches AC/battery state and the platform profile, picks the first matching
+rule, and lowers the effect frame rate, dims it, or hands the keyboard a
+static color so the host stops waking up for frames
+
+Changes arrive as power_supply uevents and platform_profile sysfs
+notifications; nothing is polled. Rules are JSON, first match wins:
+
+    [{"when": {"ac": false, "battery_below": 15}, "mode": "off"},
+     {"when": {"ac": false}, "fps": 15, "brightness": 0.7},
+     {"when": {}, "mode": "host"}]
+
+    python3 power_rules.py status [--rules rules.json]
+    sudo python3 effects.py gradient --power-aware [--rules rules.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import resource
+import select
+import sys
+import threading
+import time
+
+from hotplug import UeventMonitor
+
+# sysfs attributes, relative to the sysfs root
+POWER_SUPPLY_GLOB = "class/power_supply/*"
+PLATFORM_PROFILE = "firmware/acpi/platform_profile"
+
+# platform_profile spells these differently than asusctl
+PROFILES = {"low-power": "quiet", "quiet": "quiet",
+            "balanced": "balanced", "performance": "performance"}
+
+MODE_HOST = "host"
+MODE_STATIC = "static"
+MODE_OFF = "off"
+
+DEFAULT_RULES = [
+    {"when": {"ac": False, "battery_below": 15}, "mode": MODE_OFF},
+    {"when": {"ac": False, "profile": "quiet"}, "mode": MODE_STATIC, "brightness": 0.5},
+    {"when": {"ac": False, "battery_below": 40}, "mode": MODE_STATIC, "brightness": 0.6},
+    {"when": {"ac": False}, "fps": 15, "brightness": 0.7},
+    {"when": {"profile": "quiet"}, "fps": 15},
+    {"when": {}, "mode": MODE_HOST},
+]
+
+
+class PowerState:
+    """AC online, battery percentage and platform profile; None if unknown"""
+
+    def __init__(self, ac=None, battery=None, profile=None):
+        self.ac = ac
+        self.battery = battery
+        self.profile = profile
+
+    def __eq__(self, other):
+        return (isinstance(other, PowerState)
+                and (self.ac, self.battery, self.profile) == (other.ac, other.battery, other.profile))
+
+    def __repr__(self):
+        ac = "unknown" if self.ac is None else ("AC" if self.ac else "battery")
+        battery = "?" if self.battery is None else self.battery
+        return f"{ac}, {battery}%, {self.profile or 'unknown'} profile"
+
+
+def read_attribute(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def read_power_state(sysfs_root="/sys"):
+    """Read the current PowerState from sysfs"""
+    state = PowerState()
+    for supply in sorted(glob.glob(os.path.join(sysfs_root, POWER_SUPPLY_GLOB))):
+        kind = read_attribute(os.path.join(supply, "type"))
+        if kind == "Mains":
+            online = read_attribute(os.path.join(supply, "online"))
+            if online is not None:
+                state.ac = bool(state.ac) or online == "1"
+        elif kind == "Battery" and state.battery is None:
+            capacity = read_attribute(os.path.join(supply, "capacity"))
+            if capacity and capacity.isdigit():
+                state.battery = int(capacity)
+    state.profile = PROFILES.get(read_attribute(os.path.join(sysfs_root, PLATFORM_PROFILE)))
+    return state
+
+
+class Policy:
+    """What the lighting should do: host effects at fps and brightness, a static color, or off"""
+
+    def __init__(self, mode=MODE_HOST, fps=None, brightness=1.0, rule=None):
+        self.mode = mode
+        self.fps = fps
+        self.brightness = brightness
+        self.rule = rule
+
+    def __eq__(self, other):
+        return (isinstance(other, Policy)
+                and (self.mode, self.fps, self.brightness) == (other.mode, other.fps, other.brightness))
+
+    def __repr__(self):
+        if self.mode != MODE_HOST:
+            return f"{self.mode} at {self.brightness:.0%}" if self.mode == MODE_STATIC else self.mode
+        fps = f"max {self.fps:g} fps" if self.fps else "full fps"
+        return f"host effects, {fps}, {self.brightness:.0%} brightness"
+
+
+def rule_matches(when, state):
+    """True if every condition in when holds; unknown values never match"""
+    if "ac" in when and state.ac != when["ac"]:
+        return False
+    if "battery_below" in when and (state.battery is None or state.battery >= when["battery_below"]):
+        return False
+    if "profile" in when and state.profile != when["profile"]:
+        return False
+    return True
+
+
+def evaluate(rules, state):
+    """Return the Policy of the first rule matching state"""
+    for n, rule in enumerate(rules):
+        if rule_matches(rule.get("when", {}), state):
+            return Policy(rule.get("mode", MODE_HOST), rule.get("fps"),
+                          float(rule.get("brightness", 1.0)), n)
+    return Policy()
+
+
+def load_rules(path):
+    with open(path) as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError("rules must be a JSON list")
+    for n, rule in enumerate(rules):
+        if rule.get("mode", MODE_HOST) not in (MODE_HOST, MODE_STATIC, MODE_OFF):
+            raise ValueError(f"rule {n}: unknown mode {rule['mode']!r}")
+    return rules
+
+
+def process_wakeups():
+    """Context switches of this process so far, including exited threads"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_nvcsw + usage.ru_nivcsw
+
+
+class WakeupMeter:
+    """Wakeups per second of this process between calls to rate()"""
+
+    def __init__(self):
+        self.last = (time.monotonic(), process_wakeups())
+
+    def rate(self):
+        now = (time.monotonic(), process_wakeups())
+        elapsed = now[0] - self.last[0]
+        rate = (now[1] - self.last[1]) / elapsed if elapsed > 0 else 0.0
+        self.last = now
+        return rate
+
+
+class PowerMonitor:
+    """Call on_change(state) from a background thread when the power state changes
+
+    The thread blocks in poll() on the uevent socket, the platform_profile
+    attribute (for the kernel's sysfs_notify) and a wake pipe, with no
+    timeout, so it costs no wakeups while nothing happens.
+    """
+
+    def __init__(self, on_change, sysfs_root="/sys", monitor=None):
+        self.on_change = on_change
+        self.sysfs_root = sysfs_root
+        self.monitor = monitor or UeventMonitor()
+        self.state = read_power_state(sysfs_root)
+        self.wake_r, self.wake_w = os.pipe()
+        self.poller = select.poll()
+        self.poller.register(self.monitor.sock, select.POLLIN)
+        self.poller.register(self.wake_r, select.POLLIN)
+        self.profile_fd = None
+        try:
+            self.profile_fd = os.open(os.path.join(sysfs_root, PLATFORM_PROFILE), os.O_RDONLY)
+            # sysfs only signals a change after the attribute has been read
+            os.read(self.profile_fd, 64)
+            self.poller.register(self.profile_fd, select.POLLPRI | select.POLLERR)
+        except OSError:
+            pass
+        self.events = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="power", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.running:
+            for fd, _ in self.poller.poll():
+                if fd == self.wake_r:
+                    return
+                if fd == self.profile_fd:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.read(fd, 64)
+                else:
+                    event = self.monitor.receive(timeout=0)
+                    if event is None or event.subsystem != "power_supply":
+                        continue
+                self.events += 1
+                self.refresh()
+
+    def refresh(self):
+        """Re-read the power state and report it if it changed"""
+        state = read_power_state(self.sysfs_root)
+        if state != self.state:
+            self.state = state
+            self.on_change(state)
+
+    def stop(self):
+        self.running = False
+        os.write(self.wake_w, b"x")
+        self.thread.join()
+        for fd in (self.wake_r, self.wake_w, self.profile_fd):
+            if fd is not None:
+                os.close(fd)
+        self.monitor.close()
+
+
+class PowerAwareEffects:
+    """Run an EffectsEngine under the policy chosen by rules
+
+    fps is the rate the effect asks for; a rule's fps only lowers it. In
+    static mode the engine stops and the keyboard holds the current color,
+    dimmed, so no frames are generated at all. Wakeups per second are
+    measured for each policy and kept in history.
+    """
+
+    def __init__(self, engine, rules=DEFAULT_RULES, fps=30.0):
+        self.engine = engine
+        self.rules = rules
+        self.fps = fps
+        self.policy = None
+        self.meter = WakeupMeter()
+        self.history = []
+        self.lock = threading.Lock()
+
+    def apply_state(self, state):
+        policy = evaluate(self.rules, state)
+        with self.lock:
+            if policy == self.policy:
+                return
+            if self.policy is not None:
+                rate = self.meter.rate()
+                self.history.append((self.policy, rate))
+                print(f"{state}: {self.policy} -> {policy} ({rate:.1f} wakeups/s before)")
+            else:
+                self.meter.rate()
+                print(f"{state}: {policy}")
+            self.policy = policy
+            self._apply(policy)
+
+    def _apply(self, policy):
+        engine = self.engine
+        if policy.mode == MODE_HOST:
+            engine.brightness = policy.brightness
+            fps = min(self.fps, policy.fps) if policy.fps else self.fps
+            if engine.thread is None or abs(engine.scheduler.period - 1.0 / fps) > 1e-9:
+                engine.set_fps(fps)
+                if engine.thread is None:
+                    engine.start()
+            return
+        engine.stop()
+        engine.last_color = None
+        if policy.mode == MODE_OFF:
+            color = (0, 0, 0)
+        else:
+            engine.brightness = policy.brightness
+            color = engine.color(engine.offset)
+        engine.writer.submit(engine.zone, engine.encoder.static, *color, engine.zone)
+
+    def stop(self):
+        """Stop the engine and record the wakeup rate of the last policy"""
+        self.engine.stop()
+        with self.lock:
+            if self.policy is not None:
+                self.history.append((self.policy, self.meter.rate()))
+        return self.history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the power state and the lighting policy it selects")
+    parser.add_argument("command", choices=["status", "watch"])
+    parser.add_argument("--rules", help="JSON rules file (default: built-in rules)")
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules(args.rules) if args.rules else DEFAULT_RULES
+    except (OSError, ValueError) as e:
+        print(f"Could not load rules: {e}")
+        sys.exit(1)
+    state = read_power_state()
+    print(f"{state}: {evaluate(rules, state)}")
+    if args.command == "status":
+        return
+
+    monitor = PowerMonitor(lambda state: print(f"{state}: {evaluate(rules, state)}"))
+    try:
+        monitor.thread.join()
+    except KeyboardInterrupt:
+        pass
+    monitor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+ROG Flow Z13 keyboard RGB daemon
+Holds the HID device open and serves lighting commands on a Unix socket,
+so the GUIs and scripts can run unprivileged and at the same time
+
+Protocol: one JSON object per line, answered in order on the same socket.
+    {"id": 1, "cmd": "static", "args": [255, 128, 0]}
+    {"id": 2, "batch": [{"cmd": "static", "args": [0, 0, 0]}, {"cmd": "ping"}]}
+    {"id": 3, "cmd": "idle", "args": [1]}   # fade to dim (2: off); "resume" restores
+Clients may pipeline: send many requests before reading any response.
+
+    sudo python3 rgbd.py [--socket PATH] [--group GROUP] [--fake] [--adaptive]
+"""
+
+import argparse
+import grp
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+
+from idle_lighting import DIM, OFF, IdleLighting
+from keyboard_controller import KeyboardController
+from rgbd_client import SOCKET_PATH
+
+COMMANDS = {
+    "static": ("set_static_color", 3),
+    "breathe": ("set_breathe_mode", 4),
+    "pulse": ("set_pulse_mode", 4),
+    "rainbow": ("set_rainbow_mode", 1),
+}
+
+SOCKET_GROUP = "rog-rgb"
+SOCKET_MODE = 0o660
+
+# Longest request line a client may send before it is disconnected
+MAX_LINE = 1 << 20
+# Disconnect a client that lets this much of its responses pile up unread
+MAX_PENDING = 4 << 20
+
+
+class RgbDaemon:
+    """Serve lighting commands for one KeyboardController
+
+    A single selector loop serves every client. Commands only queue reports
+    on the controller's writer thread, so handling them never blocks; all
+    requests that arrive in one read are handled together and their
+    responses are queued on the client and written when its socket is
+    writable, so a client that stops reading never holds up the others.
+    """
+
+    def __init__(self, controller, path=SOCKET_PATH, mode=SOCKET_MODE, group=None):
+        self.controller = controller
+        self.idle = IdleLighting(controller)
+        self.path = path
+        self.selector = selectors.DefaultSelector()
+        self.buffers = {}
+        self.outgoing = {}
+        self.commands_handled = 0
+        self.running = False
+
+        if os.path.exists(path):
+            os.unlink(path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        os.chmod(path, mode)
+        if group:
+            try:
+                os.chown(path, -1, grp.getgrnam(group).gr_gid)
+            except KeyError:
+                print(f"Group {group} does not exist; only root can connect to {path}")
+        self.listener.listen(64)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+
+    def serve_forever(self):
+        self.running = True
+        while self.running:
+            for key, events in self.selector.select(timeout=0.5):
+                sock = key.fileobj
+                if sock is self.listener:
+                    self._accept()
+                    continue
+                if events & selectors.EVENT_WRITE:
+                    self._write(sock)
+                if events & selectors.EVENT_READ and sock in self.buffers:
+                    self._read(sock)
+
+    def shutdown(self):
+        self.running = False
+
+    def close(self):
+        for sock in list(self.buffers):
+            self._drop(sock)
+        self.selector.close()
+        self.listener.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        self.buffers[sock] = bytearray()
+        self.outgoing[sock] = bytearray()
+        self.selector.register(sock, selectors.EVENT_READ)
+
+    def _drop(self, sock):
+        self.selector.unregister(sock)
+        del self.buffers[sock]
+        del self.outgoing[sock]
+        sock.close()
+
+    def _read(self, sock):
+        try:
+            data = sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(sock)
+            return
+        buffer = self.buffers[sock]
+        buffer += data
+        end = buffer.rfind(b"\n")
+        if len(buffer) - end - 1 > MAX_LINE:
+            error = {"id": None, "ok": False, "error": f"request longer than {MAX_LINE} bytes"}
+            try:
+                sock.send(json.dumps(error).encode() + b"\n")
+            except OSError:
+                pass
+            self._drop(sock)
+            return
+        if end < 0:
+            return
+        lines = bytes(buffer[:end]).split(b"\n")
+        del buffer[:end + 1]
+        replies = [self.handle_line(line) for line in lines if line.strip()]
+        self._queue(sock, b"".join(replies))
+
+    def _queue(self, sock, data):
+        outgoing = self.outgoing[sock]
+        was_empty = not outgoing
+        outgoing += data
+        if len(outgoing) > MAX_PENDING:
+            self._drop(sock)
+            return
+        if was_empty:
+            # Try right away; most replies fit the socket buffer
+            self._write(sock)
+            if sock in self.outgoing and self.outgoing[sock]:
+                self.selector.modify(sock, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+    def _write(self, sock):
+        outgoing = self.outgoing[sock]
+        try:
+            sent = sock.send(outgoing)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._drop(sock)
+            return
+        del outgoing[:sent]
+        if not outgoing:
+            self.selector.modify(sock, selectors.EVENT_READ)
+
+    def handle_line(self, line):
+        """Handle one request line and return the encoded response line"""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            return json.dumps({"id": None, "ok": False, "error": f"bad request: {e}"}).encode() + b"\n"
+        response = {"id": request.get("id")}
+        if "batch" in request:
+            results = [self.handle_command(item) for item in request["batch"]]
+            response["ok"] = all(result["ok"] for result in results)
+            response["results"] = results
+        else:
+            response.update(self.handle_command(request))
+        return json.dumps(response).encode() + b"\n"
+
+    def handle_command(self, request):
+        """Run one command and return its result"""
+        cmd = request.get("cmd") if isinstance(request, dict) else None
+        args = request.get("args", []) if isinstance(request, dict) else []
+        self.commands_handled += 1
+        if cmd == "ping":
+            return {"ok": True}
+        if cmd == "stats":
+            writer = self.controller.writer
+            stats = {
+                "ok": True,
+                "commands": self.commands_handled,
+                "written": writer.packets_written if writer else 0,
+            }
+            stats.update(self.controller.metrics())
+            stats.update(self.idle.metrics())
+            return stats
+        if cmd == "idle":
+            if not isinstance(args, list) or len(args) != 1 or args[0] not in (DIM, OFF):
+                return {"ok": False, "error": f"idle takes a level, {DIM} (dim) or {OFF} (off)"}
+            return {"ok": self.idle.idle(args[0])}
+        if cmd == "resume":
+            return {"ok": self.idle.resume()}
+        if cmd not in COMMANDS:
+            return {"ok": False, "error": f"unknown command: {cmd}"}
+        method, max_args = COMMANDS[cmd]
+        if (not isinstance(args, list) or len(args) > max_args
+                or not all(isinstance(a, int) and 0 <= a <= 255 for a in args)):
+            return {"ok": False, "error": f"{cmd} takes up to {max_args} values 0-255"}
+        # New lighting while idle replaces what resume would have restored
+        self.idle.activity()
+        try:
+            ok = getattr(self.controller, method)(*args)
+        except TypeError as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": bool(ok)} if ok else {"ok": False, "error": "keyboard not connected"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ROG Flow Z13 keyboard RGB daemon")
+    parser.add_argument("--socket", default=SOCKET_PATH, help=f"socket path (default {SOCKET_PATH})")
+    parser.add_argument("--group", default=SOCKET_GROUP,
+                        help=f"group allowed to use the socket (default {SOCKET_GROUP})")
+    parser.add_argument("--fake", action="store_true", help="use a fake HID device")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="learn the fastest safe report rate instead of a fixed 20/s")
+    args = parser.parse_args()
+
+    controller = KeyboardController(fake=args.fake, adaptive=args.adaptive)
+    if not controller.writer:
+        print("Could not open the keyboard. Try running with sudo.")
+        sys.exit(1)
+
+    daemon = RgbDaemon(controller, args.socket, group=args.group)
+    signal.signal(signal.SIGTERM, lambda *a: daemon.shutdown())
+    print(f"rgbd listening on {args.socket}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+        controller.close()
+
+
+if __name__ == "__main__":
+    main()
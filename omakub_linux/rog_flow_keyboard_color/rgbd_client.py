@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Client for the keyboard RGB daemon (rgbd.py)
+DaemonController has the same methods as KeyboardController, so the GUIs
+can use either one
+"""
+
+import json
+import os
+import socket
+
+SOCKET_PATH = os.environ.get("ROG_RGBD_SOCKET", "/run/rog-rgbd.sock")
+
+
+class DaemonController:
+    """Send lighting commands to rgbd instead of opening the HID device"""
+
+    def __init__(self, path=SOCKET_PATH):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.reader = self.sock.makefile("rb")
+        self.next_id = 0
+
+    def _encode(self, request):
+        self.next_id += 1
+        request["id"] = self.next_id
+        return json.dumps(request).encode() + b"\n"
+
+    def _receive(self, count):
+        responses = []
+        for _ in range(count):
+            line = self.reader.readline()
+            if not line:
+                raise ConnectionError("rgbd closed the connection")
+            responses.append(json.loads(line))
+        return responses
+
+    def request(self, cmd, *args):
+        """Send one command and wait for its response"""
+        self.sock.sendall(self._encode({"cmd": cmd, "args": list(args)}))
+        return self._receive(1)[0]
+
+    def pipeline(self, commands):
+        """Send (cmd, args) commands back to back, then read all responses"""
+        data = b"".join(self._encode({"cmd": cmd, "args": list(args)}) for cmd, args in commands)
+        self.sock.sendall(data)
+        return self._receive(len(commands))
+
+    def batch(self, commands):
+        """Send (cmd, args) commands as one batched request"""
+        batch = [{"cmd": cmd, "args": list(args)} for cmd, args in commands]
+        self.sock.sendall(self._encode({"batch": batch}))
+        return self._receive(1)[0]
+
+    def _call(self, cmd, *args, trace=None):
+        try:
+            response = self.request(cmd, *args)
+        except (OSError, ValueError) as e:
+            print(f"Error talking to rgbd: {e}")
+            return False
+        if trace:
+            # rgbd answers once the report is queued on its writer
+            trace.finish("rgbd")
+        if not response["ok"]:
+            print(f"rgbd error: {response.get('error')}")
+        return response["ok"]
+
+    def set_static_color(self, r, g, b, trace=None):
+        """Set static color mode"""
+        return self._call("static", r, g, b, trace=trace)
+
+    def set_breathe_mode(self, r, g, b, speed=0xeb, trace=None):
+        """Set breathing effect"""
+        return self._call("breathe", r, g, b, speed, trace=trace)
+
+    def set_pulse_mode(self, r, g, b, speed=0xeb, trace=None):
+        """Set pulse effect"""
+        return self._call("pulse", r, g, b, speed, trace=trace)
+
+    def set_rainbow_mode(self, speed=0xeb, trace=None):
+        """Set rainbow cycle mode"""
+        return self._call("rainbow", speed, trace=trace)
+
+    def close(self):
+        """Close the daemon connection"""
+        self.reader.close()
+        self.sock.close()
+
+
+def connect_daemon(path=SOCKET_PATH):
+    """Return a DaemonController if rgbd is running, else None"""
+    try:
+        return DaemonController(path)
+    except OSError:
+        return None
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test harness for the vectorized color pipeline
+Checks the color math against colorsys, the gamma table, and that the
+precomputed reports are byte-for-byte what AuraEncoder writes
+"""
+
+import colorsys
+import sys
+
+import numpy as np
+
+from aura_protocol import AuraEncoder
+from color_pipeline import PrecomputedCycle, breathe, gamma_lut, hsv_to_rgb, rainbow, rgb_to_hsv
+
+
+def test_hsv_matches_colorsys():
+    """hsv_to_rgb and rgb_to_hsv agree with colorsys over a grid"""
+    print("\nHSV conversion against colorsys...")
+    h, s, v = np.meshgrid(np.linspace(0, 1, 49), np.linspace(0, 1, 9), np.linspace(0, 1, 9))
+    h, s, v = h.ravel(), s.ravel(), v.ravel()
+    rgb = hsv_to_rgb(h, s, v)
+    expected = np.array([colorsys.hsv_to_rgb(*hsv) for hsv in zip(h, s, v)])
+    error = np.abs(rgb - expected).max()
+
+    back = np.stack(rgb_to_hsv(expected), axis=-1)
+    expected_hsv = np.array([colorsys.rgb_to_hsv(*color) for color in expected])
+    # Hue 0 and 1 are the same color
+    hue_error = np.abs(back[:, 0] - expected_hsv[:, 0])
+    back_error = max(np.minimum(hue_error, 1 - hue_error).max(),
+                     np.abs(back[:, 1:] - expected_hsv[:, 1:]).max())
+    print(f"  {len(h)} colors, max error {error:.2e} to RGB, {back_error:.2e} back to HSV")
+    ok = error < 1e-9 and back_error < 1e-9
+    print("  PASS" if ok else "  FAIL")
+    return ok
+
+
+def test_gamma_lut():
+    """The gamma table keeps black and full level and never goes down"""
+    print("\nGamma table...")
+    lut = gamma_lut()
+    steps = np.diff(lut.astype(np.int64))
+    print(f"  lut[0]={lut[0]} lut[128]={lut[128]} lut[255]={lut[255]}")
+    ok = (lut.dtype == np.uint8 and len(lut) == 256 and lut[0] == 0 and lut[255] == 255
+          and (steps >= 0).all() and lut[128] < 128 and (gamma_lut(1.0) == np.arange(256)).all())
+    print("  PASS" if ok else "  FAIL")
+    return ok
+
+
+def test_reports_match_encoder():
+    """Every precomputed report equals AuraEncoder.static for its color"""
+    print("\nPrecomputed reports against AuraEncoder...")
+    encoder = AuraEncoder()
+    mismatched = 0
+    frames = 0
+    for cycle in (rainbow(period=2.0, fps=30.0), breathe((255, 128, 0), period=1.0, fps=30.0),
+                  PrecomputedCycle([(0, 0, 0), (255, 255, 255), (1, 2, 3)], 3.0)):
+        for i in range(cycle.count):
+            t = (i + 0.5) * cycle.period / cycle.count
+            r, g, b = cycle.frame(t)
+            frames += 1
+            if bytes(cycle.report(t)) != bytes(encoder.static(r, g, b)):
+                mismatched += 1
+    wrapped = rainbow(period=2.0, fps=30.0)
+    print(f"  {frames} frames, {mismatched} mismatched")
+    ok = mismatched == 0 and frames > 0 and wrapped.index(2.0 + 0.01) == wrapped.index(0.01)
+    print("  PASS" if ok else "  FAIL")
+    return ok
+
+
+def main():
+    print("Color Pipeline Test")
+    print("=" * 50)
+    results = [test_hsv_matches_colorsys(), test_gamma_lut(), test_reports_match_encoder()]
+    print()
+    if all(results):
+        print("All color pipeline tests passed")
+    else:
+        print("Some color pipeline tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
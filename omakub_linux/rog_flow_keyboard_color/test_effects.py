@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Headless test for the effects engine and frame scheduler
+Runs effects against a fake HID device and checks timing statistics
+"""
+
+import sys
+import time
+
+from effects import EffectsEngine, FrameScheduler, Gradient, NotificationFlash
+from fake_hid import FakeDevice
+from hid_writer import CoalescingWriter
+
+
+def test_holds_target_fps(fps=60, duration=2.0):
+    """A cheap render must hit the target rate without drift"""
+    print(f"\nScheduler at {fps} fps for {duration}s...")
+    stats = FrameScheduler(fps).run(lambda t, frame: None, duration)
+    print(f"  {stats.summary()}")
+
+    expected = fps * duration
+    if abs(stats.frames - expected) > 2:
+        print(f"  FAIL: expected about {expected:.0f} frames")
+        return False
+    if stats.dropped:
+        print("  FAIL: frames dropped without load")
+        return False
+    return True
+
+
+def test_drops_under_load(fps=50, duration=1.0):
+    """A render slower than the frame period must drop frames, not lag"""
+    print(f"\nScheduler at {fps} fps with a 50 ms render...")
+    finished = []
+    stats = FrameScheduler(fps).run(lambda t, frame: (time.sleep(0.05), finished.append(t)), duration)
+    print(f"  {stats.summary()}")
+
+    overrun = stats.elapsed - duration
+    if not stats.dropped:
+        print("  FAIL: no frames dropped under load")
+        return False
+    if overrun > 0.06:
+        print(f"  FAIL: ran {overrun * 1000:.0f} ms past its duration (backlog)")
+        return False
+    if stats.frames + stats.dropped < fps * duration - 2:
+        print("  FAIL: dropped frame count does not add up")
+        return False
+    return True
+
+
+def test_engine_streams_static_reports(fps=30, duration=2.0):
+    """The engine writes one static-color report per changed frame"""
+    print(f"\nGradient engine at {fps} fps on a fake device...")
+    device = FakeDevice()
+    device.open(0x0B05, 0x1A30)
+    writer = CoalescingWriter(device, max_rate=fps * 2)
+    effect = NotificationFlash(Gradient([(255, 0, 0), (0, 0, 255)], period=1.0))
+    engine = EffectsEngine(writer, effect, fps)
+    engine.start(duration)
+    effect.trigger()
+    engine.thread.join()
+    stats = engine.stop()
+    writer.close()
+    print(f"  {stats.summary()}")
+    print(f"  Reports written: {len(device.writes)}")
+
+    modes = {data[2] for _, data in device.writes}
+    if modes != {0xb3}:
+        print(f"  FAIL: unexpected report modes {modes}")
+        return False
+    if len(device.writes) > stats.frames:
+        print("  FAIL: more reports than frames")
+        return False
+    gradient = [data for _, data in device.writes if data[5:8] not in (b"\xff\xff\xff", b"\x00\x00\x00")]
+    if len(gradient) < fps * 0.2:
+        print("  FAIL: gradient frames missing after the flash")
+        return False
+    white = [data for _, data in device.writes if data[5:8] == b"\xff\xff\xff"]
+    if not white:
+        print("  FAIL: notification flash never shown")
+        return False
+    return True
+
+
+def main():
+    print("Effects Engine Test")
+    print("=" * 50)
+
+    results = [
+        test_holds_target_fps(),
+        test_drops_under_load(),
+        test_engine_streams_static_reports(),
+    ]
+
+    print("\n" + "=" * 50)
+    if all(results):
+        print("All effects tests passed")
+    else:
+        print("Some effects tests FAILED")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Fake sysfs test for the device discovery index
+Builds USB devices, HID interfaces and /sys/class/hidraw links in a
+temporary directory and checks resolution, caching and invalidation
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+from hid_discovery import DeviceIndex, HIDRAW_CLASS, MISS_RESCAN_INTERVAL, USB_DEVICES, parse_hid_id
+
+KEYBOARD = (0x0B05, 0x1A30)
+# Report descriptor starting with Usage Page (0xFF31)
+AURA_DESCRIPTOR = b"\x06\x31\xff\x09\x76\xa1\x01"
+KEYS_DESCRIPTOR = b"\x05\x01\x09\x06\xa1\x01"
+
+
+def write(path, value=b""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(value)
+
+
+def add_usb_device(root, port, vendor, product, interfaces=(), hidraw_start=0, bus=1):
+    """A USB device with one HID device and hidraw node per interface
+
+    interfaces is a list of report descriptors; returns the next free hidraw number.
+    """
+    device = os.path.join(root, "devices/pci0000:00/0000:00:14.0", f"usb{bus}", port)
+    write(os.path.join(device, "idVendor"), f"{vendor:04x}\n".encode())
+    write(os.path.join(device, "idProduct"), f"{product:04x}\n".encode())
+    link = os.path.join(root, USB_DEVICES, port)
+    os.makedirs(os.path.dirname(link), exist_ok=True)
+    os.symlink(device, link)
+    hidraw = hidraw_start
+    for number, descriptor in enumerate(interfaces):
+        interface = os.path.join(device, f"{port}:1.{number}")
+        write(os.path.join(interface, "bInterfaceNumber"), f"{number:02x}\n".encode())
+        hid = os.path.join(interface, f"0003:{vendor:04X}:{product:04X}.{hidraw + 1:04X}")
+        write(os.path.join(hid, "report_descriptor"), descriptor)
+        add_hidraw(root, hid, hidraw)
+        hidraw += 1
+    return hidraw
+
+
+def add_hidraw(root, hid, number):
+    node = os.path.join(hid, "hidraw", f"hidraw{number}")
+    os.makedirs(node)
+    os.symlink(hid, os.path.join(node, "device"))
+    link = os.path.join(root, HIDRAW_CLASS, f"hidraw{number}")
+    os.makedirs(os.path.dirname(link), exist_ok=True)
+    os.symlink(node, link)
+
+
+def fake_sysfs(other_devices=20, keyboard_port="1-5"):
+    """other_devices unrelated USB devices, each with one HID interface, plus the keyboard"""
+    root = tempfile.mkdtemp(prefix="fake-sysfs-")
+    hidraw = 0
+    for n in range(other_devices):
+        hidraw = add_usb_device(root, f"3-{n}", 0x1d6b, n, [KEYS_DESCRIPTOR], hidraw, bus=3)
+    if keyboard_port:
+        add_usb_device(root, keyboard_port, *KEYBOARD,
+                       [KEYS_DESCRIPTOR, KEYS_DESCRIPTOR, AURA_DESCRIPTOR, KEYS_DESCRIPTOR], hidraw)
+    return root
+
+
+def remove_usb_device(root, port):
+    link = os.path.join(root, USB_DEVICES, port)
+    device = os.path.realpath(link)
+    os.remove(link)
+    for entry in os.listdir(os.path.join(root, HIDRAW_CLASS)):
+        path = os.path.join(root, HIDRAW_CLASS, entry)
+        if os.path.realpath(path).startswith(device + "/"):
+            os.remove(path)
+    shutil.rmtree(device)
+
+
+def test_resolve():
+    """The keyboard's interfaces, Aura interface and port are found"""
+    print("\nResolving the keyboard...")
+    index = DeviceIndex(fake_sysfs())
+    interfaces = index.hid_interfaces(*KEYBOARD)
+    aura = index.aura_interface(*KEYBOARD)
+    ok = [i.interface for i in interfaces] == [0, 1, 2, 3]
+    ok = ok and aura.interface == 2 and aura.node == "/dev/hidraw22" and aura.port == "1-5"
+    ok = ok and index.usb_port(*KEYBOARD) == "1-5" and index.usb_port(0x1234, 0x5678) is None
+    ok = ok and parse_hid_id("0003:0B05:1A30.0001") == KEYBOARD and parse_hid_id("hidraw0") is None
+    print(f"  {interfaces}")
+    print("  PASS" if ok else f"  FAIL: aura={aura}")
+    return ok
+
+
+def test_cached():
+    """Repeated lookups do not rescan sysfs"""
+    print("\nRepeated lookups...")
+    index = DeviceIndex(fake_sysfs(other_devices=100))
+    for _ in range(50):
+        index.aura_interface(*KEYBOARD)
+        index.usb_port(*KEYBOARD)
+    ok = index.scans == 2
+    print(f"  {index.scans} scans for 100 lookups")
+    print("  PASS" if ok else "  FAIL: expected one hidraw and one USB scan")
+    return ok
+
+
+def test_stale_entry():
+    """A replugged keyboard is found on its new port without a uevent"""
+    print("\nKeyboard moves to another port...")
+    root = fake_sysfs()
+    index = DeviceIndex(root)
+    before = index.aura_interface(*KEYBOARD)
+    index.usb_port(*KEYBOARD)
+    remove_usb_device(root, "1-5")
+    add_usb_device(root, "1-6", *KEYBOARD, [KEYS_DESCRIPTOR, KEYS_DESCRIPTOR, AURA_DESCRIPTOR], 40)
+    after = index.aura_interface(*KEYBOARD)
+    ok = before.port == "1-5" and after.port == "1-6" and after.node == "/dev/hidraw42"
+    ok = ok and index.usb_port(*KEYBOARD) == "1-6"
+    print("  PASS" if ok else f"  FAIL: {before} -> {after}")
+    return ok
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_appears_after_scan():
+    """A keyboard missing from the first scan is found by a later lookup"""
+    print("\nKeyboard attached after the first scan, no uevent...")
+    root = fake_sysfs(keyboard_port=None)
+    clock = FakeClock()
+    index = DeviceIndex(root, clock=clock)
+    for _ in range(50):
+        index.aura_interface(*KEYBOARD)
+        index.usb_port(*KEYBOARD)
+    misses = index.scans
+    add_usb_device(root, "1-5", *KEYBOARD, [AURA_DESCRIPTOR], 20)
+    clock.now += MISS_RESCAN_INTERVAL
+    found = index.aura_interface(*KEYBOARD)
+    port = index.usb_port(*KEYBOARD)
+    print(f"  {misses} scans for 100 missed lookups, then found {found} on {port}")
+    ok = misses == 2 and found is not None and found.node == "/dev/hidraw20" and port == "1-5"
+    print("  PASS" if ok else "  FAIL: the keyboard stayed missing, or misses rescanned every time")
+    return ok
+
+
+def test_uevent_invalidates():
+    """An add uevent makes a newly attached keyboard visible at once"""
+    print("\nKeyboard attached after the first lookup...")
+    root = fake_sysfs(keyboard_port=None)
+    index = DeviceIndex(root, clock=FakeClock())
+    missing = index.aura_interface(*KEYBOARD) is None and index.usb_port(*KEYBOARD) is None
+    add_usb_device(root, "1-5", *KEYBOARD, [AURA_DESCRIPTOR], 20)
+    # Until the next rescan of a miss is due, only an event shows it
+    still_missing = index.aura_interface(*KEYBOARD) is None
+    index.on_uevent("change", "hidraw")
+    unchanged = index.aura_interface(*KEYBOARD) is None
+    index.on_uevent("add", "hidraw")
+    found = index.aura_interface(*KEYBOARD)
+    ok = missing and still_missing and unchanged and found is not None and found.node == "/dev/hidraw20"
+    ok = ok and index.usb_port(*KEYBOARD) == "1-5"
+    print("  PASS" if ok else f"  FAIL: {found}")
+    return ok
+
+
+def main():
+    print("Device Discovery Test")
+    print("=" * 50)
+    results = [
+        test_resolve(),
+        test_cached(),
+        test_stale_entry(),
+        test_appears_after_scan(),
+        test_uevent_invalidates(),
+    ]
+    print()
+    if all(results):
+        print("All tests passed")
+    else:
+        print("Some tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
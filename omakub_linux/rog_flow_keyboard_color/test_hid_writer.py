@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Fake-device test for the coalescing HID writer
+Simulates a slider drag and reports enqueue latency and packets written
+"""
+
+import sys
+import time
+
+from aura_protocol import AuraEncoder
+from fake_hid import FakeDevice
+from hid_writer import CoalescingWriter
+
+static_report = AuraEncoder().static
+
+
+def test_slider_drag(steps=1000, max_rate=20.0):
+    """Queue one report per slider step, as valueChanged would"""
+    print(f"\nSlider drag: {steps} steps at max {max_rate:.0f} reports/s...")
+
+    device = FakeDevice(write_delay=0.002)
+    device.open(0x0B05, 0x1A30)
+    writer = CoalescingWriter(device, max_rate)
+
+    latencies = []
+    start = time.perf_counter()
+    for step in range(steps):
+        t0 = time.perf_counter()
+        writer.submit(0x00, static_report, step % 256, 0x80, 0xff - step % 256)
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(0.0005)
+    drag_time = time.perf_counter() - start
+    writer.flush(timeout=5)
+    writer.close()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)]
+    written = len(device.writes)
+    print(f"  Drag took {drag_time * 1000:.0f} ms")
+    print(f"  Enqueue latency: mean {sum(latencies) / steps * 1e6:.1f} us, "
+          f"p99 {p99 * 1e6:.1f} us, max {latencies[-1] * 1e6:.1f} us")
+    print(f"  Packets submitted: {steps}, written: {written}")
+
+    last = device.writes[-1][1]
+    expected = bytes(AuraEncoder().static((steps - 1) % 256, 0x80, 0xff - (steps - 1) % 256))
+    gaps = [b[0] - a[0] for a, b in zip(device.writes, device.writes[1:])]
+
+    ok = True
+    if latencies[-1] > 0.01:
+        print("  FAIL: enqueue blocked for more than 10 ms")
+        ok = False
+    if written > drag_time * max_rate + 2:
+        print("  FAIL: more packets written than the rate limit allows")
+        ok = False
+    if last != expected:
+        print("  FAIL: last written packet is not the final slider value")
+        ok = False
+    if gaps and min(gaps) < 1.0 / max_rate * 0.9:
+        print(f"  FAIL: writes closer than the rate limit ({min(gaps) * 1000:.1f} ms)")
+        ok = False
+    return ok
+
+
+def test_zones_kept_separate():
+    """Reports for different zones must not replace each other"""
+    print("\nSeparate zones...")
+
+    device = FakeDevice()
+    device.open(0x0B05, 0x1A30)
+    writer = CoalescingWriter(device, max_rate=1000)
+    writer.submit("init", AuraEncoder().init)
+    for value in range(50):
+        writer.submit(0x00, static_report, value, 0, 0)
+    writer.close()
+
+    kinds = [data[2] for _, data in device.writes]
+    print(f"  Written: {len(device.writes)} packets")
+    if 0x01 not in kinds or device.writes[-1][1][5] != 49:
+        print("  FAIL: init packet lost or final color not written")
+        return False
+    return True
+
+
+def main():
+    print("Coalescing HID Writer Test")
+    print("=" * 50)
+
+    results = [test_slider_drag(), test_zones_kept_separate()]
+
+    print("\n" + "=" * 50)
+    if all(results):
+        print("All writer tests passed")
+    else:
+        print("Some writer tests FAILED")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
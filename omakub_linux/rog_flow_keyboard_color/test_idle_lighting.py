@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Fake-device test for idle-aware lighting
+Fades a fake keyboard down and back through the controller, an effects
+engine and rgbd's socket, and measures how long each hook takes
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from effects import EffectsEngine, Gradient
+from fake_hid import FakeDevice
+from hid_writer import CoalescingWriter
+from idle_lighting import DIM, FADE_TIME, OFF, RAMPS, IdleLighting, send_hook
+from keyboard_controller import KeyboardController
+from rgbd import RgbDaemon
+
+# Hooks only queue work, so they should be far below a frame
+HOOK_LIMIT_MS = 5.0
+
+
+def color(report):
+    return tuple(report[5:8])
+
+
+def last_color(device):
+    return color(device.writes[-1][1])
+
+
+def fake_controller():
+    FakeDevice.plug()
+    return KeyboardController(max_rate=0, fake=True)
+
+
+def test_ramps():
+    """Every ramp moves one way and ends exactly at its level"""
+    print("\nPrecomputed ramps...")
+    ok = True
+    for (start, end), ramp in RAMPS.items():
+        steps = list(ramp)
+        ok = ok and steps == sorted(steps, reverse=True) and steps[-1] == [1.0, 0.3, 0.0][end]
+    print("  PASS" if ok else f"  FAIL: {RAMPS}")
+    return ok
+
+
+def test_fade_and_restore():
+    """Dim fades the color down; resume restores it with one report"""
+    print("\nStatic color: dim, dim again, resume...")
+    controller = fake_controller()
+    device = controller.device
+    idle = IdleLighting(controller)
+    controller.set_static_color(200, 100, 50)
+    controller.writer.flush(1.0)
+
+    idle.idle(DIM)
+    time.sleep(FADE_TIME + 0.1)
+    controller.writer.flush(1.0)
+    dimmed = last_color(device)
+    writes = len(device.writes)
+    idle.idle(DIM)
+    time.sleep(0.1)
+    repeated = len(device.writes) - writes
+
+    idle.resume()
+    controller.writer.flush(1.0)
+    restored = last_color(device)
+    metrics = idle.metrics()
+    controller.close()
+
+    print(f"  dimmed to {dimmed}, restored to {restored}, hooks: idle {metrics['idle_hook_max_ms']} ms, "
+          f"resume {metrics['resume_hook_max_ms']} ms")
+    ok = dimmed == (60, 30, 15) and repeated == 0 and restored == (200, 100, 50)
+    ok = ok and len(device.writes) == writes + 1 and metrics["idle_level"] == 0
+    ok = ok and max(metrics["idle_hook_max_ms"], metrics["resume_hook_max_ms"]) < HOOK_LIMIT_MS
+    print("  PASS" if ok else "  FAIL")
+    return ok
+
+
+def test_resume_cancels_fade():
+    """A resume in the middle of a fade wins over the remaining fade steps"""
+    print("\nResume halfway through fading off...")
+    controller = fake_controller()
+    device = controller.device
+    idle = IdleLighting(controller)
+    controller.set_static_color(0, 255, 0)
+    idle.idle(OFF)
+    time.sleep(FADE_TIME / 2)
+    idle.resume()
+    time.sleep(FADE_TIME)
+    controller.writer.flush(1.0)
+    final = last_color(device)
+    controller.close()
+    ok = final == (0, 255, 0)
+    print("  PASS" if ok else f"  FAIL: ended at {final}")
+    return ok
+
+
+def test_engine_paused():
+    """A host effect stops rendering while off and restarts on resume"""
+    print("\nEffects engine: off, then resume...")
+    device = FakeDevice()
+    device.open(0x0B05, 0x1A30)
+    writer = CoalescingWriter(device, max_rate=0)
+    engine = EffectsEngine(writer, Gradient([(255, 0, 0), (0, 0, 255)], period=1.0), fps=30)
+    idle = IdleLighting(engine=engine)
+    engine.start()
+    time.sleep(0.2)
+
+    idle.idle(OFF)
+    time.sleep(FADE_TIME + 0.1)
+    writer.flush(1.0)
+    paused = engine.thread is None
+    off = last_color(device)
+    writes = len(device.writes)
+    time.sleep(0.3)
+    idle_writes = len(device.writes) - writes
+
+    idle.resume()
+    time.sleep(0.2)
+    running = engine.thread is not None and len(device.writes) > writes
+    engine.stop()
+    writer.close()
+
+    print(f"  {idle_writes} reports while off")
+    ok = paused and off == (0, 0, 0) and idle_writes == 0 and running
+    print("  PASS" if ok else f"  FAIL: paused={paused} off={off} running={running}")
+    return ok
+
+
+def test_rgbd_hooks():
+    """The hook command reaches rgbd, and rgbd reports the hook times"""
+    print("\nHooks through rgbd...")
+    controller = fake_controller()
+    path = os.path.join(tempfile.mkdtemp(prefix="rgbd-"), "rgbd.sock")
+    daemon = RgbDaemon(controller, path)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    controller.set_static_color(255, 255, 255)
+
+    missing = os.path.join(os.path.dirname(path), "no-effects.sock")
+    times = []
+    delivered = []
+    for hook in ("dim", "dim", "off", "resume", "resume"):
+        start = time.perf_counter()
+        delivered.append(send_hook(hook, path, missing))
+        times.append((time.perf_counter() - start) * 1000)
+    stats = daemon.handle_command({"cmd": "stats"})
+    bad = daemon.handle_command({"cmd": "idle", "args": [7]})
+
+    daemon.shutdown()
+    thread.join()
+    daemon.close()
+    controller.close()
+    print(f"  round trips: {', '.join(f'{ms:.2f}' for ms in times)} ms")
+    ok = delivered == [1] * 5 and stats["idle_level"] == 0 and "resume_hook_ms" in stats and not bad["ok"]
+    print("  PASS" if ok else f"  FAIL: {delivered} {stats}")
+    return ok
+
+
+def main():
+    print("Idle Lighting Test")
+    print("=" * 50)
+    results = [
+        test_ramps(),
+        test_fade_and_restore(),
+        test_resume_cancels_fade(),
+        test_engine_paused(),
+        test_rgbd_hooks(),
+    ]
+    print()
+    if all(results):
+        print("All tests passed")
+    else:
+        print("Some tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
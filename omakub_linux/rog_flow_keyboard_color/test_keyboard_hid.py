@@ -8,17 +8,20 @@ import hid
 import time
 import sys
 
+from aura_protocol import AuraEncoder
+
 # Your keyboard device
 VENDOR_ID = 0x0B05
 PRODUCT_ID = 0x1A30
 
-def send_packet(device, packet):
-    """Send a packet and print result"""
+# Reports already start with report ID 0x00
+encoder = AuraEncoder()
+
+def send_packet(device, report):
+    """Send a report and print result"""
     try:
-        # Add report ID 0x00 at the beginning
-        full_packet = [0x00] + packet
-        bytes_written = device.write(full_packet)
-        print(f"  Sent {bytes_written} bytes: {' '.join(f'{b:02x}' for b in packet[:16])}")
+        bytes_written = device.write(report)
+        print(f"  Sent {bytes_written} bytes: {report[1:17].hex(' ')}")
         time.sleep(0.1)
         return True
     except Exception as e:
@@ -31,74 +34,32 @@ def test_static_color(device, r, g, b):
     
     # Standard ROG static mode packet format
     # Based on asusctl source: 0x5d, 0xb3, zone, 0x00, R, G, B, speed, ...
-    packet = [
-        0x5d,  # Command byte
-        0xb3,  # Mode: static
-        0x00,  # Zone
-        0x00,  # Reserved
-        r, g, b,  # RGB color
-        0xeb,  # Speed (medium)
-        0x00,  # Direction
-        0x00,  # ??
-        0x00, 0x00, 0x00, 0x00, 0x00, 0x00  # Padding
-    ]
-    # Pad to 64 bytes
-    packet += [0x00] * (64 - len(packet))
-    
-    return send_packet(device, packet)
+    return send_packet(device, encoder.static(r, g, b))
 
 def test_breathe_mode(device, r, g, b):
     """Test breathe mode"""
     print(f"\nTesting BREATHE mode - RGB({r},{g},{b})...")
     
-    packet = [
-        0x5d,  # Command byte
-        0xb4,  # Mode: breathe
-        0x00,  # Zone
-        0x00,  # Reserved
-        r, g, b,  # RGB color
-        0xeb,  # Speed (medium)
-        0x00,  # Direction
-        0x00,  # ??
-        0x00, 0x00, 0x00, 0x00, 0x00, 0x00  # Padding
-    ]
-    packet += [0x00] * (64 - len(packet))
-    
-    return send_packet(device, packet)
+    return send_packet(device, encoder.breathe(r, g, b))
 
 def test_pulse_mode(device, r, g, b):
     """Test pulse mode"""
     print(f"\nTesting PULSE mode - RGB({r},{g},{b})...")
     
-    packet = [
-        0x5d,  # Command byte
-        0xbc,  # Mode: pulse
-        0x00,  # Zone
-        0x00,  # Reserved
-        r, g, b,  # RGB color
-        0xeb,  # Speed (medium)
-        0x00,  # Direction
-        0x00,  # ??
-        0x00, 0x00, 0x00, 0x00, 0x00, 0x00  # Padding
-    ]
-    packet += [0x00] * (64 - len(packet))
-    
-    return send_packet(device, packet)
+    return send_packet(device, encoder.pulse(r, g, b))
 
 def test_init_packet(device):
     """Try initialization packet"""
     print("\nTesting INIT packet...")
     
     # Some keyboards need initialization
-    packet = [0x5d, 0x01] + [0x00] * 62
-    return send_packet(device, packet)
+    return send_packet(device, encoder.init())
 
 def test_apply_packet(device):
     """Try apply/commit packet"""
     print("\nTesting APPLY packet...")
     
-    packet = [0x5d, 0xb5] + [0x00] * 62
-    return send_packet(device, packet)
+    return send_packet(device, encoder.apply())
 
 def main():
     print("ROG Flow Z13 Keyboard HID Tester")
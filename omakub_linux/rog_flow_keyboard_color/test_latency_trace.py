@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Fake-device test for latency tracing
+Drives traced color changes through KeyboardController and checks the
+per-stage percentiles and the Prometheus textfile export
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+from fake_hid import FakeDevice
+from hid_writer import CoalescingWriter
+from keyboard_controller import KeyboardController
+from latency_trace import LatencyTracer, shared_tracer
+from pacing import AdaptivePacer
+
+
+def test_stages(steps=200):
+    """Every written change has signal, enqueue, encode and write stages"""
+    print(f"\nTracing {steps} color changes...")
+    path = os.path.join(tempfile.mkdtemp(prefix="trace-"), "rog_rgb.prom")
+    tracer = LatencyTracer("rog_rgb", path)
+    controller = KeyboardController(max_rate=0, fake=True)
+    for step in range(steps):
+        controller.set_static_color(step % 256, 0x40, 0x80, trace=tracer.begin("slider"))
+        controller.writer.flush(timeout=1)
+    # Superseded changes are counted, not timed
+    for step in range(10):
+        controller.set_static_color(0x00, step, 0x00, trace=tracer.begin("slider"))
+    controller.close()
+    tracer.export()
+
+    summary = tracer.summary()
+    for stage, stats in summary.items():
+        print(f"  {stage:<8} n={stats['count']:<4} p50 {stats['p50'] * 1e6:7.1f} us  "
+              f"p95 {stats['p95'] * 1e6:7.1f} us  p99 {stats['p99'] * 1e6:7.1f} us")
+    with open(path) as f:
+        text = f.read()
+
+    ok = True
+    if set(summary) != {"enqueue", "encode", "write", "total"}:
+        print(f"  FAIL: unexpected stages {sorted(summary)}")
+        ok = False
+    elif summary["total"]["count"] < steps or summary["total"]["p50"] > summary["total"]["p99"]:
+        print("  FAIL: wrong sample count or percentiles")
+        ok = False
+    if 'rog_rgb_latency_seconds{stage="write",quantile="0.99"}' not in text or tracer.dropped < 1:
+        print("  FAIL: Prometheus export is missing samples")
+        ok = False
+    if ok:
+        print(f"  Superseded: {tracer.dropped}")
+        print("  PASS")
+    return ok
+
+
+def accounted(tracer):
+    """Traces that finished plus traces that were dropped"""
+    finished = tracer.summary().get("total", {}).get("count", 0)
+    return finished + tracer.dropped
+
+
+def test_untracked_paths():
+    """Skipped, dropped, failed and retried reports still end their trace"""
+    print("\nTraces off the write path...")
+    tracer = LatencyTracer("rog_rgb", os.devnull)
+    results = {}
+
+    # A color the keyboard already shows is skipped, and finishes at once
+    FakeDevice.plug()
+    controller = KeyboardController(max_rate=0, fake=True)
+    controller.set_static_color(1, 2, 3)
+    controller.writer.flush(timeout=1)
+    controller.set_static_color(1, 2, 3, trace=tracer.begin("slider"))
+    controller.close()
+    results["skipped"] = "skipped" in tracer.summary() and accounted(tracer) == 1
+
+    # Pending reports forgotten by drop() are dropped
+    writer = CoalescingWriter(None, max_rate=0)
+    writer.submit("zone", bytes, [0], trace=tracer.begin("slider"))
+    writer.drop(["zone"])
+    results["drop"] = tracer.dropped == 1 and not writer.traces
+
+    # A failed write keeps its trace until the report reaches the next device
+    device = FakeDevice()
+    device.open(None, None)
+    FakeDevice.unplug()
+    writer.set_device(device)
+    writer.submit("zone", bytes, [1], trace=tracer.begin("slider"))
+    while device.opened:
+        threading.Event().wait(0.01)
+    kept = "zone" in writer.traces
+    FakeDevice.plug()
+    device = FakeDevice()
+    device.open(None, None)
+    writer.set_device(device)
+    writer.flush(timeout=1)
+    results["failed"] = kept and accounted(tracer) == 3 and not writer.traces
+
+    # Rejected writes are retried with the same trace
+    device = FakeDevice(min_gap=0.03)
+    device.open(None, None)
+    writer = CoalescingWriter(device, pacer=AdaptivePacer(interval=0.01, floor=0.01))
+    for zone in range(5):
+        writer.submit(zone, bytes, [zone], trace=tracer.begin("slider"))
+    writer.flush(timeout=2)
+    writer.close()
+    results["retried"] = device.rejected > 0 and accounted(tracer) == 8 and tracer.dropped == 1
+
+    # Reports still pending at close are dropped
+    writer = CoalescingWriter(None, max_rate=0)
+    writer.submit("zone", bytes, [0], trace=tracer.begin("slider"))
+    writer.close()
+    results["closed"] = tracer.dropped == 2 and not writer.traces
+
+    print(f"  {results}, {device.rejected} rejected writes")
+    ok = all(results.values())
+    print("  PASS" if ok else "  FAIL: a trace was lost")
+    return ok
+
+
+def test_disabled():
+    """Without a path nothing is traced"""
+    print("\nTracing disabled...")
+    ok = LatencyTracer("rog_rgb").begin("slider") is None
+    print("  PASS" if ok else "  FAIL: begin() returned a trace")
+    return ok
+
+
+def test_concurrent_drops(threads=8, drops=20000):
+    """Drops from several threads are all counted"""
+    print(f"\n{threads} threads dropping {drops} traces each...")
+    tracer = LatencyTracer("rog_rgb", os.devnull)
+
+    def drop_many():
+        for _ in range(drops):
+            tracer.begin("slider").drop()
+
+    workers = [threading.Thread(target=drop_many) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    ok = tracer.dropped == threads * drops
+    print(f"  Counted {tracer.dropped}")
+    print("  PASS" if ok else "  FAIL: drops were lost")
+    return ok
+
+
+def test_shared():
+    """Each metric has one process-wide tracer, configured from its variable"""
+    print("\nShared tracers...")
+    os.environ["TEST_TRACE"] = "/tmp/test-trace.json"
+    first = shared_tracer("test", "TEST_TRACE")
+    ok = shared_tracer("test", "TEST_TRACE") is first and first.path == "/tmp/test-trace.json"
+    ok = ok and shared_tracer("other", "TEST_TRACE_UNSET") is not first
+    print("  PASS" if ok else "  FAIL")
+    return ok
+
+
+def main():
+    print("Latency Trace Test")
+    print("=" * 50)
+    results = [test_stages(), test_untracked_paths(), test_disabled(), test_concurrent_drops(), test_shared()]
+    print()
+    if all(results):
+        print("All latency trace tests passed")
+    else:
+        print("Some latency trace tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Fake-device test for multi-device fan-out
+Drives several fake devices with different write latencies and checks that
+one update costs the slowest device's latency, not the sum, and that Aura
+devices found in a fake sysfs tree are grouped into targets
+"""
+
+import sys
+import tempfile
+import time
+
+from fake_hid import FakeDevice
+from hid_discovery import DeviceIndex
+from keyboard_controller import KeyboardController
+from multi_controller import MultiController, discover_targets
+from test_hid_discovery import AURA_DESCRIPTOR, KEYS_DESCRIPTOR, add_usb_device
+
+LATENCIES = {"keyboard": 0.05, "lightbar": 0.1, "external-19b6": 0.15}
+
+
+def fake_opener(delay):
+    def opener():
+        device = FakeDevice(write_delay=delay)
+        device.open(0x0B05, 0x1A30)
+        return device
+    return opener
+
+
+def fake_multi(latencies=LATENCIES):
+    FakeDevice.plug()
+    return MultiController({name: [KeyboardController(max_rate=0, fake=True, opener=fake_opener(delay))]
+                            for name, delay in latencies.items()})
+
+
+def test_fan_out_latency():
+    """An update is written to all devices concurrently"""
+    print("\nOne update to three devices (50, 100 and 150 ms per write)...")
+    multi = fake_multi()
+    start = time.monotonic()
+    ok = multi.set_static_color(0xff, 0x80, 0x00)
+    ok = multi.flush(2.0) and ok
+    elapsed = time.monotonic() - start
+    slowest, total = max(LATENCIES.values()), sum(LATENCIES.values())
+    print(f"  {elapsed * 1000:.0f} ms (slowest device {slowest * 1000:.0f} ms, "
+          f"sum {total * 1000:.0f} ms)")
+    reports = {bytes(c.device.writes[0][1]) for c in multi.controllers()}
+    multi.close()
+    passed = ok and len(reports) == 1 and slowest <= elapsed < (slowest + total) / 2
+    print("  PASS" if passed else "  FAIL: expected the slowest device's latency and identical reports")
+    return passed
+
+
+def test_targets():
+    """Only the named targets are updated"""
+    print("\nUpdating only the lightbar...")
+    multi = fake_multi({"keyboard": 0.0, "lightbar": 0.0})
+    ok = multi.set_rainbow_mode(targets=["lightbar"])
+    missing = multi.set_rainbow_mode(targets=["nothing"])
+    multi.flush(1.0)
+    written = {name: len(controllers[0].device.writes) for name, controllers in multi.targets.items()}
+    multi.close()
+    passed = ok and not missing and written == {"keyboard": 0, "lightbar": 1}
+    print("  PASS" if passed else f"  FAIL: {written}")
+    return passed
+
+
+def test_discover_targets():
+    """Aura interfaces are grouped by product; identical devices share a target"""
+    print("\nGrouping Aura devices from fake sysfs...")
+    root = tempfile.mkdtemp(prefix="fake-sysfs-")
+    hidraw = add_usb_device(root, "1-5", 0x0B05, 0x1A30, [KEYS_DESCRIPTOR, AURA_DESCRIPTOR])
+    hidraw = add_usb_device(root, "1-3", 0x0B05, 0x18C6, [AURA_DESCRIPTOR], hidraw)
+    hidraw = add_usb_device(root, "3-1", 0x0B05, 0x19B6, [KEYS_DESCRIPTOR, AURA_DESCRIPTOR], hidraw)
+    hidraw = add_usb_device(root, "3-2", 0x0B05, 0x19B6, [KEYS_DESCRIPTOR, AURA_DESCRIPTOR], hidraw)
+    # An ASUS device without Aura (e.g. a mouse) and another vendor's keyboard
+    hidraw = add_usb_device(root, "3-3", 0x0B05, 0x1958, [KEYS_DESCRIPTOR], hidraw)
+    add_usb_device(root, "3-4", 0x046d, 0xc33f, [AURA_DESCRIPTOR], hidraw)
+
+    targets = {t.name: (t.product_id, t.ports) for t in discover_targets(DeviceIndex(root))}
+    expected = {
+        "keyboard": (0x1A30, ["1-5"]),
+        "lightbar": (0x18C6, ["1-3"]),
+        "external-19b6": (0x19B6, ["3-1", "3-2"]),
+    }
+    passed = targets == expected
+    print(f"  {discover_targets(DeviceIndex(root))}")
+    print("  PASS" if passed else "  FAIL")
+    return passed
+
+
+def main():
+    print("Multi-Device Controller Test")
+    print("=" * 50)
+    results = [
+        test_fan_out_latency(),
+        test_targets(),
+        test_discover_targets(),
+    ]
+    print()
+    if all(results):
+        print("All tests passed")
+    else:
+        print("Some tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
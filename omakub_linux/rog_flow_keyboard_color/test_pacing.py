@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Fake-clock test for adaptive report pacing
+Feeds the pacer the writes a rate-limited device would produce, with
+scheduler jitter from a seeded generator, and checks that the learned gap
+converges just above the limit, that jitter alone never raises it, that a
+stale floor decays, and that only confirmed floors are remembered per device
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+from pacing import AdaptivePacer, PacingStore
+
+WRITE_TIME = 0.0002
+
+
+def simulate(pacer, min_gap=0.008, limit="block", writes=2000, jitter=0.02, seed=1):
+    """Stream writes through pacer on a fake clock, like CoalescingWriter with
+    a report always pending; returns (accepted write times, rejected count)
+
+    A device in "error" mode rejects writes closer than min_gap, in "block"
+    mode it holds them until min_gap has passed. jitter is the share of
+    writes delayed 2-15 ms by something other than the device.
+    """
+    rnd = random.Random(seed)
+    clock = 0.0
+    last_accepted = None
+    accepted = []
+    rejected = 0
+    for _ in range(writes):
+        start = clock + pacer.interval
+        duration = WRITE_TIME * rnd.uniform(0.8, 1.5)
+        if rnd.random() < jitter:
+            duration += rnd.uniform(0.002, 0.015)
+        error = None
+        ready = last_accepted + min_gap if last_accepted is not None else 0.0
+        if start < ready:
+            if limit == "error":
+                error = IOError("write error: Broken pipe")
+                rejected += 1
+            else:
+                duration += ready - start
+        clock = start + duration
+        if error is None:
+            last_accepted = clock
+            accepted.append(clock)
+        pacer.record(start, duration, error)
+    return accepted, rejected
+
+
+def median_gap(times):
+    """Median gap between accepted writes over the second half of the run"""
+    tail = times[len(times) // 2:]
+    gaps = sorted(b - a for a, b in zip(tail, tail[1:]))
+    return gaps[len(gaps) // 2]
+
+
+def test_converges(limit, min_gap=0.008):
+    """The learned gap ends up just above the device's limit, for every seed"""
+    print(f"\nConverging on a {min_gap * 1000:.0f} ms limit ({limit} mode, 2% jitter)...")
+    ok = True
+    for seed in range(5):
+        pacer = AdaptivePacer()
+        accepted, rejected = simulate(pacer, min_gap, limit, seed=seed)
+        gap = median_gap(accepted)
+        print(f"  seed {seed}: {pacer.summary()}, {rejected} rejected, median gap {gap * 1000:.1f} ms")
+        if not (min_gap <= gap <= min_gap * 1.2 and pacer.floor <= min_gap * 1.2):
+            print("  FAIL: learned gap did not converge to the device limit")
+            ok = False
+        if rejected > 20:
+            print("  FAIL: too many rejected reports while learning")
+            ok = False
+    if ok:
+        print("  PASS")
+    return ok
+
+
+def test_jitter_only():
+    """Slow writes from jitter on a device without a limit do not raise the floor"""
+    print("\nJitter on a device without a rate limit...")
+    pacer = AdaptivePacer()
+    simulate(pacer, min_gap=0.0, writes=3000, jitter=0.05)
+    print(f"  Pacer: {pacer.summary()}")
+    ok = pacer.floor < 0.002 and pacer.interval < 0.002
+    print("  PASS" if ok else "  FAIL: jitter raised the floor")
+    return ok
+
+
+def test_stale_floor_decays():
+    """A floor saved too high is probed down again"""
+    print("\nStarting from a 23 ms floor on an 8 ms device...")
+    pacer = AdaptivePacer(interval=0.025, floor=0.023)
+    accepted, _ = simulate(pacer, writes=5000)
+    gap = median_gap(accepted)
+    print(f"  Pacer: {pacer.summary()}, median gap {gap * 1000:.1f} ms")
+    ok = gap <= 0.008 * 1.2
+    print("  PASS" if ok else "  FAIL: the floor stayed high")
+    return ok
+
+
+def test_remembered_per_device():
+    """Confirmed floors are stored per device; a single slow write is not"""
+    print("\nRemembering the learned gap...")
+    path = os.path.join(tempfile.mkdtemp(prefix="pacing-"), "pacing.json")
+    key = "0b05:1a30:FAKE0001"
+    pacer = AdaptivePacer(store=PacingStore(path), key=key)
+    simulate(pacer, min_gap=0.005, writes=1500)
+    pacer.save()
+
+    again = AdaptivePacer(store=PacingStore(path), key=key)
+    other = AdaptivePacer(store=PacingStore(path), key="0b05:1a30:OTHER")
+    print(f"  Learned {pacer.summary()}, reloaded {again.summary()}, other device {other.interval * 1000:.1f} ms")
+    ok = 0.005 <= again.floor <= 0.005 * 1.3 and again.interval >= again.floor and other.interval == 0.05
+
+    # One write held 20 ms on a device at a steady 5 ms gap
+    single = AdaptivePacer(interval=0.005, floor=0.005, store=PacingStore(path), key="0b05:1a30:SINGLE")
+    clock = 0.0
+    for duration in [WRITE_TIME] * 10 + [0.02] + [WRITE_TIME] * 10:
+        single.record(clock + single.interval, duration)
+        clock += single.interval + duration
+    stored = PacingStore(path).get("0b05:1a30:SINGLE")
+    print(f"  After one slow write: floor {single.floor * 1000:.1f} ms, stored {stored}")
+    ok = ok and single.floor == 0.005 and stored is None
+    print("  PASS" if ok else "  FAIL: learned gap was not stored per device, or a single sample was")
+    return ok
+
+
+def main():
+    print("Adaptive Pacing Test")
+    print("=" * 50)
+    results = [
+        test_converges("error"),
+        test_converges("block"),
+        test_jitter_only(),
+        test_stale_floor_decays(),
+        test_remembered_per_device(),
+    ]
+    print()
+    if all(results):
+        print("All pacing tests passed")
+    else:
+        print("Some pacing tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
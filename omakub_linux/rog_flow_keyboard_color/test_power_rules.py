@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Fake sysfs test for the power-aware lighting rules
+Builds a power_supply tree in a temporary directory, injects power_supply
+uevents through a socketpair, and checks the effect follows the rules and
+wakes up less on battery
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from aura_protocol import AuraEncoder
+from effects import EffectsEngine, Gradient
+from fake_hid import FakeDevice
+from hid_writer import CoalescingWriter
+from hotplug import UeventMonitor
+from power_rules import (DEFAULT_RULES, MODE_HOST, MODE_OFF, MODE_STATIC, PowerAwareEffects,
+                         PowerMonitor, PowerState, evaluate, read_power_state)
+
+PHASE = 1.0
+
+
+def write(root, attribute, value):
+    path = os.path.join(root, attribute)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f"{value}\n")
+
+
+def fake_sysfs(ac=True, capacity=80, profile="balanced"):
+    root = tempfile.mkdtemp(prefix="fake-sysfs-")
+    write(root, "class/power_supply/AC0/type", "Mains")
+    write(root, "class/power_supply/AC0/online", int(ac))
+    write(root, "class/power_supply/BAT0/type", "Battery")
+    write(root, "class/power_supply/BAT0/capacity", capacity)
+    write(root, "firmware/acpi/platform_profile", profile)
+    return root
+
+
+def uevent(supply):
+    devpath = f"/devices/LNXSYSTM:00/LNXSYBUS:00/{supply}/power_supply/{supply}"
+    fields = [f"change@{devpath}", "ACTION=change", f"DEVPATH={devpath}",
+              "SUBSYSTEM=power_supply", f"POWER_SUPPLY_NAME={supply}", "SEQNUM=4242"]
+    return "\0".join(fields).encode() + b"\0"
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_rules():
+    """The default rules pick the expected policy for each state"""
+    print("\nEvaluating default rules...")
+    cases = [
+        (PowerState(True, 100, "performance"), MODE_HOST, None),
+        (PowerState(True, 100, "quiet"), MODE_HOST, 15),
+        (PowerState(False, 80, "balanced"), MODE_HOST, 15),
+        (PowerState(False, 80, "quiet"), MODE_STATIC, None),
+        (PowerState(False, 30, "balanced"), MODE_STATIC, None),
+        (PowerState(False, 10, "quiet"), MODE_OFF, None),
+        (PowerState(), MODE_HOST, None),
+    ]
+    ok = True
+    for state, mode, fps in cases:
+        policy = evaluate(DEFAULT_RULES, state)
+        if (policy.mode, policy.fps) != (mode, fps):
+            print(f"  FAIL: {state} -> {policy}")
+            ok = False
+    if ok:
+        print("  PASS")
+    return ok
+
+
+def test_read_state():
+    """sysfs power_supply and platform_profile are read into a PowerState"""
+    print("\nReading a fake sysfs tree...")
+    state = read_power_state(fake_sysfs(ac=False, capacity=55, profile="low-power"))
+    ok = state == PowerState(False, 55, "quiet")
+    print("  PASS" if ok else f"  FAIL: {state}")
+    return ok
+
+
+def test_transitions():
+    """Unplugging AC and draining the battery step down the lighting"""
+    print("\nAC -> battery -> low battery through uevents...")
+    root = fake_sysfs()
+    device = FakeDevice()
+    device.open(0x0B05, 0x1A30)
+    writer = CoalescingWriter(device, max_rate=0)
+    engine = EffectsEngine(writer, Gradient([(255, 0, 0), (0, 0, 255)], period=0.5), fps=60)
+    power = PowerAwareEffects(engine, DEFAULT_RULES, fps=60)
+    kernel, ours = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    monitor = PowerMonitor(power.apply_state, root, UeventMonitor(ours))
+    power.apply_state(monitor.state)
+
+    phases = []
+    time.sleep(PHASE)
+    phases.append(("AC", len(device.writes)))
+
+    write(root, "class/power_supply/AC0/online", 0)
+    kernel.send(uevent("AC0"))
+    on_battery = wait_for(lambda: power.policy.fps == 15)
+    start = len(device.writes)
+    time.sleep(PHASE)
+    phases.append(("battery", len(device.writes) - start))
+
+    write(root, "class/power_supply/BAT0/capacity", 35)
+    kernel.send(uevent("BAT0"))
+    static = wait_for(lambda: power.policy.mode == MODE_STATIC)
+    writer.flush(timeout=1)
+    start = len(device.writes)
+    time.sleep(PHASE)
+    phases.append(("low battery", len(device.writes) - start))
+
+    write(root, "class/power_supply/BAT0/capacity", 9)
+    kernel.send(uevent("BAT0"))
+    off = wait_for(lambda: power.policy.mode == MODE_OFF)
+    writer.flush(timeout=1)
+    time.sleep(PHASE)
+
+    monitor.stop()
+    history = power.stop()
+    writer.close()
+    kernel.close()
+
+    for name, writes in phases:
+        print(f"  {name:<12} {writes:4d} reports/s")
+    for policy, rate in history:
+        print(f"  {policy}: {rate:.1f} wakeups/s")
+
+    ok = True
+    if not (on_battery and static and off):
+        print("  FAIL: a uevent did not change the policy")
+        ok = False
+    elif not phases[0][1] > phases[1][1] > phases[2][1] == 0:
+        print("  FAIL: report rate did not drop with each step")
+        ok = False
+    elif device.writes[-1][1] != bytes(AuraEncoder().static(0, 0, 0)):
+        print("  FAIL: lighting was not switched off")
+        ok = False
+    elif not history[0][1] > max(history[2][1], history[3][1]):
+        print("  FAIL: static lighting did not wake up less than host effects")
+        ok = False
+    if monitor.events != 3:
+        print(f"  FAIL: expected 3 power_supply events, saw {monitor.events}")
+        ok = False
+    if ok:
+        print("  PASS")
+    return ok
+
+
+def main():
+    print("Power-Aware Lighting Rules Test")
+    print("=" * 50)
+    results = [test_rules(), test_read_state(), test_transitions()]
+    print()
+    if all(results):
+        print("All tests passed")
+    else:
+        print("Some tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Fake-device test for reconnecting after the keyboard goes away
+Injects kernel remove/add uevents through a socketpair and checks that only
+the last state per zone is replayed onto the reopened device
+"""
+
+import socket
+import sys
+import time
+
+from aura_protocol import AuraEncoder
+from fake_hid import FakeDevice
+from hotplug import UeventMonitor, parse_uevent
+from hid_discovery import DeviceIndex
+from keyboard_controller import AURA_USAGE_PAGE, KeyboardController, open_interface
+from test_hid_discovery import KEYBOARD, fake_sysfs
+
+HIDRAW_DEVPATH = ("/devices/pci0000:00/0000:00:14.0/usb1/1-5/1-5:1.0/"
+                  "0003:0B05:1A30.0001/hidraw/hidraw0")
+
+encoder = AuraEncoder()
+
+
+def uevent(action, devpath=HIDRAW_DEVPATH, subsystem="hidraw"):
+    """Build a kernel uevent datagram like the ones on NETLINK_KOBJECT_UEVENT"""
+    fields = [f"{action}@{devpath}", f"ACTION={action}", f"DEVPATH={devpath}",
+              f"SUBSYSTEM={subsystem}", "SEQNUM=4242"]
+    return "\0".join(fields).encode() + b"\0"
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_parse_uevent():
+    """Kernel uevents parse; udev re-broadcasts are ignored"""
+    print("\nParsing uevents...")
+    event = parse_uevent(uevent("add"))
+    ok = event.action == "add" and event.subsystem == "hidraw" and event.devpath == HIDRAW_DEVPATH
+    ok = ok and parse_uevent(b"libudev\0\xfe\xed") is None
+    print("  PASS" if ok else f"  FAIL: {event}")
+    return ok
+
+
+def test_hotplug_replay():
+    """Unplug, change colors while away, plug back: replay the last state per zone"""
+    print("\nHotplug reconnect with state replay...")
+    FakeDevice.plug()
+    kernel, ours = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    controller = KeyboardController(max_rate=0, fake=True, monitor=UeventMonitor(ours))
+
+    controller.set_static_color(0xff, 0x00, 0x00, zone=1)
+    controller.set_breathe_mode(0x00, 0x00, 0xff, zone=2)
+    controller.writer.flush(timeout=2)
+    first_device = controller.device
+
+    FakeDevice.unplug()
+    kernel.send(uevent("remove"))
+    wait_for(lambda: controller.device is None)
+    for level in range(0, 256, 32):
+        controller.set_static_color(0x00, level, 0x00, zone=1)
+    # Other devices' events must not trigger anything
+    kernel.send(uevent("add", "/devices/virtual/input/input99", "input"))
+
+    FakeDevice.plug()
+    kernel.send(uevent("add"))
+    reconnected = wait_for(lambda: controller.metrics()["reconnects"] == 1)
+    device = controller.device
+    metrics = controller.metrics()
+    controller.close()
+    kernel.close()
+
+    expected = {
+        bytes(encoder.static(0x00, 0xe0, 0x00, zone=1)),
+        bytes(encoder.breathe(0x00, 0x00, 0xff, zone=2)),
+    }
+    replayed = [data for _, data in device.writes] if device else []
+    print(f"  Reports written before unplug: {len(first_device.writes)}, replayed: {len(replayed)}")
+    print(f"  Metrics: {metrics}")
+
+    ok = True
+    if not reconnected or device is first_device:
+        print("  FAIL: did not reconnect")
+        ok = False
+    elif len(replayed) != 2 or set(replayed) != expected:
+        print("  FAIL: replay was not the last state of each zone")
+        ok = False
+    if metrics["last_restore_ms"] is None:
+        print("  FAIL: time-to-restored-lighting was not recorded")
+        ok = False
+    if ok:
+        print("  PASS")
+    return ok
+
+
+def test_write_error_reconnect():
+    """Without hotplug events a failed write backs off until the device returns"""
+    print("\nWrite error reconnect without hotplug events...")
+    FakeDevice.plug()
+    controller = KeyboardController(max_rate=0, fake=True)
+    controller.set_static_color(0x10, 0x20, 0x30)
+    controller.writer.flush(timeout=2)
+
+    FakeDevice.unplug()
+    controller.set_static_color(0x40, 0x50, 0x60)
+    time.sleep(0.2)
+    FakeDevice.plug()
+    reconnected = wait_for(lambda: controller.metrics()["reconnects"] == 1)
+    device = controller.device
+    metrics = controller.metrics()
+    controller.close()
+
+    ok = reconnected and device.writes[-1][1] == bytes(encoder.static(0x40, 0x50, 0x60))
+    print(f"  Metrics: {metrics}")
+    print("  PASS" if ok else "  FAIL: newest color was not written after reconnecting")
+    return ok
+
+
+class LibusbDevice(FakeDevice):
+    """A device from a hidapi build whose paths are bus:addr:iface, not hidraw nodes"""
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+        self.tried = []
+
+    def open_path(self, path):
+        self.tried.append(path)
+        if path not in self.paths:
+            raise IOError("open failed")
+        super().open_path(path)
+
+
+def test_open_without_hidraw_paths():
+    """A hidapi that rejects /dev/hidrawN opens the Aura interface from enumerate()"""
+    print("\nOpening through a libusb hidapi...")
+    FakeDevice.plug()
+    interface = DeviceIndex(fake_sysfs()).aura_interface(*KEYBOARD)
+    enumerated = [
+        {"path": b"0001:0005:00", "usage_page": 0x0001, "interface_number": 0},
+        {"path": b"0001:0005:03", "usage_page": AURA_USAGE_PAGE, "interface_number": 3},
+        {"path": b"0001:0005:02", "usage_page": AURA_USAGE_PAGE, "interface_number": 2},
+    ]
+    device = LibusbDevice([info["path"] for info in enumerated])
+    open_interface(device, interface, *KEYBOARD, lambda vendor, product: enumerated)
+    print(f"  Tried {device.tried}")
+    ok = device.opened and device.path == b"0001:0005:02" and device.tried[0] == interface.node.encode()
+
+    # Nothing on the Aura usage page: the first vendor:product device
+    fallback = LibusbDevice([])
+    open_interface(fallback, interface, *KEYBOARD, lambda vendor, product: enumerated[:1])
+    ok = ok and fallback.opened and fallback.path is None
+    print("  PASS" if ok else "  FAIL: did not fall back from the hidraw path")
+    return ok
+
+
+def main():
+    print("Keyboard Reconnect Test")
+    print("=" * 50)
+    results = [test_parse_uevent(), test_hotplug_replay(), test_write_error_reconnect(),
+               test_open_without_hidraw_paths()]
+    print()
+    if all(results):
+        print("All tests passed")
+    else:
+        print("Some tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Protocol test for rgbd
+Talks JSON lines to a daemon on a temporary socket backed by a fake
+keyboard: pipelining, batches, bad requests and several clients at once
+"""
+
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import time
+
+from fake_hid import FakeDevice
+from keyboard_controller import KeyboardController
+from rgbd import MAX_LINE, SOCKET_MODE, RgbDaemon
+
+
+class Daemon:
+    """rgbd on its own thread for the length of one test"""
+
+    def __enter__(self):
+        FakeDevice.plug()
+        self.controller = KeyboardController(max_rate=0, fake=True)
+        self.path = os.path.join(tempfile.mkdtemp(prefix="rgbd-"), "rgbd.sock")
+        self.daemon = RgbDaemon(self.controller, self.path)
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(2.0)
+        sock.connect(self.path)
+        return sock
+
+    def __exit__(self, *exc):
+        self.daemon.shutdown()
+        self.thread.join()
+        self.daemon.close()
+        self.controller.close()
+
+
+def read_lines(sock, count):
+    data = b""
+    while data.count(b"\n") < count:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return [json.loads(line) for line in data.split(b"\n") if line]
+
+
+def send(sock, *requests):
+    sock.sendall(b"".join(json.dumps(r).encode() + b"\n" for r in requests))
+
+
+def test_socket_mode():
+    """The socket is not world-writable"""
+    print("\nSocket permissions...")
+    with Daemon() as d:
+        mode = stat.S_IMODE(os.stat(d.path).st_mode)
+    ok = mode == SOCKET_MODE and not mode & stat.S_IWOTH
+    print("  PASS" if ok else f"  FAIL: mode {oct(mode)}")
+    return ok
+
+
+def test_pipeline():
+    """Pipelined requests are answered in order"""
+    print("\nPipelined requests...")
+    with Daemon() as d:
+        sock = d.connect()
+        send(sock, *({"id": i, "cmd": "static", "args": [i, 0, 0]} for i in range(50)))
+        replies = read_lines(sock, 50)
+        sock.close()
+    ids = [r["id"] for r in replies]
+    ok = ids == list(range(50)) and all(r["ok"] for r in replies)
+    print("  PASS" if ok else f"  FAIL: {replies[:3]}")
+    return ok
+
+
+def test_batch():
+    """A batch gets one reply with a result per command"""
+    print("\nBatch...")
+    with Daemon() as d:
+        sock = d.connect()
+        send(sock, {"id": 7, "batch": [
+            {"cmd": "static", "args": [0, 0, 255]},
+            {"cmd": "ping"},
+            {"cmd": "static", "args": [300, 0, 0]},
+        ]})
+        reply = read_lines(sock, 1)[0]
+        sock.close()
+    results = [r["ok"] for r in reply["results"]]
+    ok = reply["id"] == 7 and results == [True, True, False] and not reply["ok"]
+    print("  PASS" if ok else f"  FAIL: {reply}")
+    return ok
+
+
+def test_bad_requests():
+    """Malformed JSON and unknown commands get an error and keep the connection"""
+    print("\nBad requests...")
+    with Daemon() as d:
+        sock = d.connect()
+        sock.sendall(b"{not json\n[1, 2]\n")
+        send(sock, {"id": 1, "cmd": "sparkle"}, {"id": 2, "cmd": "ping"})
+        replies = read_lines(sock, 4)
+        sock.close()
+    ok = (len(replies) == 4
+          and [r["ok"] for r in replies] == [False, False, False, True]
+          and replies[0]["error"].startswith("bad request")
+          and "unknown command" in replies[2]["error"])
+    print("  PASS" if ok else f"  FAIL: {replies}")
+    return ok
+
+
+def test_multiple_clients():
+    """Clients sending at the same time each get their own replies"""
+    print("\nMultiple clients...")
+    results = {}
+
+    def client(d, n):
+        sock = d.connect()
+        send(sock, *({"id": n * 100 + i, "cmd": "ping"} for i in range(20)))
+        results[n] = [r["id"] for r in read_lines(sock, 20)]
+        sock.close()
+
+    with Daemon() as d:
+        threads = [threading.Thread(target=client, args=(d, n)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    ok = all(results.get(n) == [n * 100 + i for i in range(20)] for n in range(8))
+    print("  PASS" if ok else f"  FAIL: {results}")
+    return ok
+
+
+def test_stuck_client():
+    """A client that never reads its replies does not hold up the others"""
+    print("\nStuck client...")
+    with Daemon() as d:
+        stuck = d.connect()
+        stuck.setblocking(False)
+        request = json.dumps({"cmd": "stats"}).encode() + b"\n"
+        # Keep writing until the daemon's replies fill the stuck client's socket
+        sent = 0
+        deadline = time.monotonic() + 2.0
+        while time.monotonic() < deadline:
+            try:
+                sent += stuck.send(request * 256)
+            except BlockingIOError:
+                break
+        time.sleep(0.1)
+
+        other = d.connect()
+        start = time.perf_counter()
+        send(other, {"id": 1, "cmd": "ping"})
+        reply = read_lines(other, 1)
+        elapsed = (time.perf_counter() - start) * 1000
+        other.close()
+        stuck.close()
+    print(f"  {sent} bytes from the stuck client, ping took {elapsed:.2f} ms")
+    ok = reply == [{"id": 1, "ok": True}] and elapsed < 200
+    print("  PASS" if ok else f"  FAIL: {reply}")
+    return ok
+
+
+def test_long_line():
+    """A request line over MAX_LINE drops that client only"""
+    print("\nOverlong line...")
+    with Daemon() as d:
+        sock = d.connect()
+        try:
+            sock.sendall(b"x" * (MAX_LINE + 65536))
+        except OSError:
+            pass
+        replies = read_lines(sock, 1)
+        try:
+            closed = sock.recv(1) == b""
+        except ConnectionResetError:
+            # The daemon closed with the rest of the line still unread
+            closed = True
+        sock.close()
+        other = d.connect()
+        send(other, {"id": 1, "cmd": "ping"})
+        alive = read_lines(other, 1)
+        other.close()
+        buffered = sum(len(b) for b in d.daemon.buffers.values())
+    ok = (replies and "longer than" in replies[0]["error"] and closed
+          and alive == [{"id": 1, "ok": True}] and buffered == 0)
+    print("  PASS" if ok else f"  FAIL: {replies} closed={closed} buffered={buffered}")
+    return ok
+
+
+def main():
+    print("rgbd Protocol Test")
+    print("=" * 50)
+    results = [
+        test_socket_mode(),
+        test_pipeline(),
+        test_batch(),
+        test_bad_requests(),
+        test_multiple_clients(),
+        test_stuck_client(),
+        test_long_line(),
+    ]
+    print()
+    if all(results):
+        print("All rgbd tests passed")
+    else:
+        print("Some rgbd tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Fake-device test for compiled lighting timelines
+Checks compilation, the content-hash cache, and the player's timing,
+seeking, looping and time scaling
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from aura_protocol import AuraEncoder
+from fake_hid import FakeDevice
+from hid_writer import CoalescingWriter
+from timeline import TimelinePlayer, compile_timeline, load_timeline
+
+encoder = AuraEncoder()
+
+SPEC = {
+    "duration": 0.8,
+    "steps": [
+        {"at": 0, "mode": "static", "color": "ff0000"},
+        {"after": 0.2, "mode": "fade", "color": "0000ff", "duration": 0.3, "fps": 20},
+        {"after": 0.4, "mode": "breathe", "color": "00ff00", "zone": 1},
+    ],
+}
+
+
+def new_writer():
+    device = FakeDevice()
+    device.open(0x0B05, 0x1A30)
+    return device, CoalescingWriter(device, max_rate=0)
+
+
+def test_compile():
+    """Fades expand into frames and reports come out in time order"""
+    print("\nCompiling...")
+    timeline = compile_timeline(SPEC)
+    times = list(timeline.times)
+    ok = (len(timeline) == 1 + 6 + 1 and times == sorted(times)
+          and bytes(timeline.report(6)) == bytes(encoder.static(0, 0, 255))
+          and timeline.zone(7) == 1)
+    print(f"  {len(timeline)} reports at {[round(t, 2) for t in times]}")
+    print("  PASS" if ok else "  FAIL: unexpected compiled timeline")
+    return ok
+
+
+def test_cache():
+    """A second load comes from the cache and matches the fresh compile"""
+    print("\nContent-hash cache...")
+    tmp = tempfile.mkdtemp(prefix="timeline-")
+    path = os.path.join(tmp, "big.json")
+    steps = [{"after": 0.1, "mode": "fade", "color": f"{i % 256:02x}8040", "duration": 2, "fps": 60}
+             for i in range(200)]
+    with open(path, "w") as f:
+        json.dump({"steps": steps}, f)
+
+    start = time.perf_counter()
+    compiled = load_timeline(path, os.path.join(tmp, "cache"))
+    compile_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    cached = load_timeline(path, os.path.join(tmp, "cache"))
+    cached_ms = (time.perf_counter() - start) * 1000
+    print(f"  {len(compiled)} reports: compiled in {compile_ms:.1f} ms, loaded from cache in {cached_ms:.1f} ms")
+
+    ok = (list(cached.times) == list(compiled.times) and cached.reports == compiled.reports
+          and cached_ms < compile_ms)
+    print("  PASS" if ok else "  FAIL: cached timeline differs or was not faster")
+    return ok
+
+
+def test_play_timing(speed):
+    """Reports are written when they are due, scaled by speed"""
+    print(f"\nPlaying at {speed}x...")
+    timeline = compile_timeline(SPEC)
+    device, writer = new_writer()
+    player = TimelinePlayer(timeline, writer, speed=speed)
+    start = time.monotonic()
+    player.play()
+    writer.flush(timeout=2)
+    writer.close()
+
+    offsets = [(t - start) - due / speed for (t, _), due in zip(device.writes, timeline.times)]
+    worst = max(abs(o) for o in offsets)
+    print(f"  {len(device.writes)} reports, worst timing error {worst * 1000:.2f} ms")
+    ok = len(device.writes) == len(timeline) and worst < 0.01
+    print("  PASS" if ok else "  FAIL: reports were not written on time")
+    return ok
+
+
+def test_seek_and_loop():
+    """Seeking restores each zone's state; looping wraps at the duration"""
+    print("\nSeeking and looping...")
+    timeline = compile_timeline(SPEC)
+    device, writer = new_writer()
+    player = TimelinePlayer(timeline, writer, loop=True)
+    player.play(start=0.65, duration=0.9)
+    writer.flush(timeout=2)
+    writer.close()
+
+    written = [data for _, data in device.writes]
+    blue = bytes(encoder.static(0, 0, 255))
+    red = bytes(encoder.static(255, 0, 0))
+    # Seek state (blue), breathe at 0.7, then the loop starts over with red
+    ok = written[0] == blue and red in written and len(written) > len(timeline)
+    print(f"  {len(written)} reports written across the loop")
+    print("  PASS" if ok else "  FAIL: seek or loop did not play as expected")
+    return ok
+
+
+def test_seek_past_apply():
+    """Seeking past an apply restores the color and re-sends one apply after it"""
+    print("\nSeeking 9 s into hid_test.json...")
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "timelines", "hid_test.json")
+    timeline = load_timeline(path, cache_dir=None)
+    device, writer = new_writer()
+    TimelinePlayer(timeline, writer).seek(9.0)
+    writer.flush(timeout=2)
+    writer.close()
+
+    written = [bytes(data) for _, data in device.writes]
+    expected = [bytes(encoder.init()), bytes(encoder.static(255, 255, 255)), bytes(encoder.apply())]
+    print(f"  {len(written)} reports: {' '.join(f'{data[2]:02x}' for data in written)} (mode bytes)")
+    ok = written == expected
+    print("  PASS" if ok else "  FAIL: expected init, white, apply")
+    return ok
+
+
+def main():
+    print("Timeline Test")
+    print("=" * 50)
+    results = [test_compile(), test_cache(), test_play_timing(1.0), test_play_timing(4.0),
+               test_seek_and_loop(), test_seek_past_apply()]
+    print()
+    if all(results):
+        print("All timeline tests passed")
+    else:
+        print("Some timeline tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
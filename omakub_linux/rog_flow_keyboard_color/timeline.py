@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Scripted lighting sequences for the ROG Flow Z13 keyboard
+A JSON (or YAML) timeline is compiled ahead of time into a flat array of
+(timestamp, report) pairs, cached on disk, and streamed by a player
+
+    {"duration": 8, "steps": [
+        {"at": 0, "mode": "static", "color": "ff0000"},
+        {"after": 2, "mode": "fade", "color": "0000ff", "duration": 1.5},
+        {"after": 2, "mode": "breathe", "color": "00ff00", "speed": 235}
+    ]}
+
+    python3 timeline.py play timelines/hid_test.json [--loop] [--speed 2] [--seek 3] [--fake]
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+
+from aura_protocol import AuraEncoder, MODE_INIT, OFFSET_MODE, OFFSET_ZONE, REPORT_SIZE, SPEED_MEDIUM, ZONE_ALL
+from effects import lerp_color, passthrough
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                         "rog-flow-keyboard", "timelines")
+
+# Bump when compiled output changes, so stale cache entries are not used
+COMPILER_VERSION = 1
+CACHE_MAGIC = b"RGTL"
+CACHE_HEADER = struct.Struct("<4sIId")
+
+FADE_FPS = 30.0
+# init and apply carry zone 0 but set no zone's color; they are queued
+# under these keys instead, so they never replace a pending zone 0 color
+INIT = "init"
+APPLY = "apply"
+APPLY_REPORT = bytes(AuraEncoder().apply())
+
+
+def parse_color(value):
+    """Accept "ff8000", "#ff8000" or [255, 128, 0]"""
+    if isinstance(value, str):
+        value = value.lstrip("#")
+        if len(value) != 6:
+            raise ValueError(f"bad color {value!r}")
+        n = int(value, 16)
+        return (n >> 16) & 0xff, (n >> 8) & 0xff, n & 0xff
+    r, g, b = value
+    return int(r), int(g), int(b)
+
+
+class Timeline:
+    """Compiled timeline: sorted timestamps and one report per timestamp"""
+
+    def __init__(self, times, reports, duration):
+        self.times = times
+        self.reports = reports
+        self.duration = duration
+        self.rows = memoryview(reports)
+
+    def __len__(self):
+        return len(self.times)
+
+    def report(self, i):
+        return self.rows[i * REPORT_SIZE:(i + 1) * REPORT_SIZE]
+
+    def zone(self, i):
+        return self.reports[i * REPORT_SIZE + OFFSET_ZONE]
+
+    def key(self, i):
+        """Writer key for report i: its zone, or INIT/APPLY for those reports"""
+        if self.reports[i * REPORT_SIZE + OFFSET_MODE] == MODE_INIT:
+            return INIT
+        if self.report(i) == APPLY_REPORT:
+            return APPLY
+        return self.zone(i)
+
+    def index(self, t):
+        """Index of the first report at or after t"""
+        return bisect.bisect_left(self.times, t)
+
+    def to_bytes(self):
+        header = CACHE_HEADER.pack(CACHE_MAGIC, COMPILER_VERSION, len(self.times), self.duration)
+        return header + self.times.tobytes() + bytes(self.reports)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, count, duration = CACHE_HEADER.unpack_from(data)
+        if magic != CACHE_MAGIC or version != COMPILER_VERSION:
+            raise ValueError("not a compiled timeline")
+        times = array("d")
+        offset = CACHE_HEADER.size
+        times.frombytes(data[offset:offset + count * 8])
+        reports = bytearray(data[offset + count * 8:])
+        if len(reports) != count * REPORT_SIZE:
+            raise ValueError("truncated compiled timeline")
+        return cls(times, reports, duration)
+
+
+def compile_timeline(spec):
+    """Compile a timeline spec (parsed JSON/YAML) into a Timeline"""
+    encoder = AuraEncoder()
+    events = []
+    t = 0.0
+    color = (0, 0, 0)
+    for n, step in enumerate(spec["steps"]):
+        try:
+            if "at" in step:
+                t = float(step["at"])
+            else:
+                t += float(step.get("after", 0))
+            mode = step.get("mode", "static")
+            zone = int(step.get("zone", ZONE_ALL))
+            speed = int(step.get("speed", SPEED_MEDIUM))
+            target = parse_color(step["color"]) if "color" in step else color
+            if mode == "fade":
+                start = parse_color(step["from"]) if "from" in step else color
+                frames = max(1, round(float(step.get("duration", 1.0)) * float(step.get("fps", FADE_FPS))))
+                step_time = float(step.get("duration", 1.0)) / frames
+                for i in range(1, frames + 1):
+                    rgb = lerp_color(start, target, i / frames)
+                    events.append((t + i * step_time, bytes(encoder.static(*rgb, zone=zone))))
+            elif mode == "static":
+                events.append((t, bytes(encoder.static(*target, zone=zone))))
+            elif mode in ("breathe", "pulse"):
+                events.append((t, bytes(getattr(encoder, mode)(*target, speed, zone=zone))))
+            elif mode == "rainbow":
+                events.append((t, bytes(encoder.rainbow(speed, int(step.get("direction", 0)), zone))))
+            elif mode in ("init", "apply"):
+                events.append((t, bytes(getattr(encoder, mode)())))
+            else:
+                raise ValueError(f"unknown mode {mode!r}")
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"step {n}: {e}") from None
+        color = target
+
+    # Stable sort keeps same-time steps in file order
+    events.sort(key=lambda event: event[0])
+    times = array("d", (event[0] for event in events))
+    reports = bytearray(b"".join(event[1] for event in events))
+    duration = float(spec.get("duration", times[-1] if times else 0.0))
+    return Timeline(times, reports, duration)
+
+
+def parse_spec(data, path):
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML timelines need PyYAML (pip install pyyaml)") from None
+        return yaml.safe_load(data)
+    return json.loads(data)
+
+
+def load_timeline(path, cache_dir=CACHE_DIR):
+    """Load a timeline file, compiling it only if its content is not cached
+
+    The cache key is a hash of the raw file, so a hit skips parsing too.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data + f":{COMPILER_VERSION}".encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{digest}.bin") if cache_dir else None
+    if cache_path:
+        try:
+            with open(cache_path, "rb") as f:
+                return Timeline.from_bytes(f.read())
+        except (OSError, ValueError, struct.error):
+            pass
+
+    timeline = compile_timeline(parse_spec(data, path))
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(timeline.to_bytes())
+            os.replace(tmp, cache_path)
+        except OSError as e:
+            print(f"Could not cache compiled timeline: {e}")
+    return timeline
+
+
+class TimelinePlayer:
+    """Stream a compiled timeline to a CoalescingWriter on the monotonic clock
+
+    The player sleeps until the next report is due instead of ticking at a
+    frame rate, so sparse timelines cost next to no CPU. speed scales time
+    (2.0 plays twice as fast); with loop the timeline restarts after its
+    duration.
+    """
+
+    def __init__(self, timeline, writer, speed=1.0, loop=False):
+        self.timeline = timeline
+        self.writer = writer
+        self.speed = speed
+        self.loop = loop
+        self.stopped = threading.Event()
+        self.reports_sent = 0
+        # Recent lateness samples, bounded so looping forever stays flat
+        self.late = deque(maxlen=10000)
+
+    def seek(self, t):
+        """Queue the state every zone should be in at time t
+
+        An init before t is sent first, then the last report of each zone in
+        timeline order, then one apply if the timeline applied before t.
+        """
+        latest = {}
+        for i in range(self.timeline.index(t)):
+            latest[self.timeline.key(i)] = i
+        init, apply = latest.pop(INIT, None), latest.pop(APPLY, None)
+        if init is not None:
+            self.writer.submit(INIT, passthrough, self.timeline.report(init))
+        for zone, i in sorted(latest.items(), key=lambda item: item[1]):
+            self.writer.submit(zone, passthrough, self.timeline.report(i))
+        if apply is not None:
+            self.writer.submit(APPLY, passthrough, self.timeline.report(apply))
+
+    def play(self, start=0.0, duration=None):
+        """Play from timeline time start; blocks until done, stopped or duration passes"""
+        timeline = self.timeline
+        if not len(timeline):
+            return
+        if start:
+            self.seek(start)
+        period = timeline.duration / self.speed
+        i = timeline.index(start)
+        origin = time.monotonic() - start / self.speed
+        deadline = time.monotonic() + duration if duration else None
+        while not self.stopped.is_set():
+            if i >= len(timeline):
+                if not self.loop or period <= 0:
+                    return
+                i = 0
+                origin += period
+                continue
+            due = origin + timeline.times[i] / self.speed
+            if deadline and due > deadline:
+                return
+            wait = due - time.monotonic()
+            if wait > 0 and self.stopped.wait(wait):
+                return
+            self.late.append(max(0.0, time.monotonic() - due))
+            self.writer.submit(timeline.key(i), passthrough, timeline.report(i))
+            self.reports_sent += 1
+            i += 1
+
+    def stop(self):
+        self.stopped.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play scripted keyboard lighting timelines")
+    parser.add_argument("command", choices=["play", "compile"])
+    parser.add_argument("file", help="timeline .json or .yaml")
+    parser.add_argument("--loop", action="store_true", help="repeat until interrupted")
+    parser.add_argument("--speed", type=float, default=1.0, help="time scale (2 = twice as fast)")
+    parser.add_argument("--seek", type=float, default=0.0, help="start at this many seconds")
+    parser.add_argument("--fake", action="store_true", help="use a fake HID device")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        timeline = load_timeline(args.file)
+    except (OSError, ValueError) as e:
+        print(f"Could not load {args.file}: {e}")
+        sys.exit(1)
+    print(f"Loaded {len(timeline)} reports, {timeline.duration:.1f} s, "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    if args.command == "compile":
+        return
+
+    from hid_writer import CoalescingWriter
+    from keyboard_controller import MAX_WRITE_RATE, open_device
+    try:
+        device = open_device(args.fake)
+    except Exception as e:
+        print(f"Error opening device: {e}")
+        print("Try running with sudo.")
+        sys.exit(1)
+    writer = CoalescingWriter(device, MAX_WRITE_RATE)
+    player = TimelinePlayer(timeline, writer, args.speed, args.loop)
+    try:
+        player.play(args.seek)
+    except KeyboardInterrupt:
+        pass
+    writer.flush(timeout=2)
+    writer.close()
+    late = sorted(player.late) or [0.0]
+    print(f"Sent {player.reports_sent} reports, wrote {writer.packets_written}, "
+          f"lateness p99 {late[int(len(late) * 0.99)] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
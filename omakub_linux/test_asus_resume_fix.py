@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Fake sysfs test for the ASUS HID resume fix daemon
+Builds a USB device tree in a temporary directory and drives the resume
+state machine with fake uevents, a fake clock and fake logind signals
+"""
+
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from asus_resume_fix import (IDLE, RESET_TIMEOUT, SETTLE_TIMEOUT, USB_BIND, USB_DEVICES,
+                             USB_UNBIND, ResumeFixer, parse_sleep_signal, serve)
+
+NAME = "1-5"
+INTERFACE = f"{NAME}:1.0"
+HID = "0003:0B05:1A30.0001"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRun:
+    """Records commands instead of running them"""
+
+    def __init__(self):
+        self.commands = []
+
+    def __call__(self, args, check=False):
+        self.commands.append(" ".join(args))
+
+
+def write(root, attribute, value=""):
+    path = os.path.join(root, attribute)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f"{value}\n" if value else "")
+
+
+def fake_sysfs(other_devices=20):
+    root = tempfile.mkdtemp(prefix="fake-sysfs-")
+    for n in range(other_devices):
+        write(root, f"{USB_DEVICES}/3-{n}/idVendor", "1d6b")
+        write(root, f"{USB_DEVICES}/3-{n}/idProduct", f"{n:04x}")
+    write(root, f"{USB_DEVICES}/{NAME}/idVendor", "0b05")
+    write(root, f"{USB_DEVICES}/{NAME}/idProduct", "1a30")
+    write(root, USB_UNBIND)
+    write(root, USB_BIND)
+    bring_up(root)
+    return root
+
+
+def device_dir(root, name=NAME):
+    return os.path.join(root, USB_DEVICES, name)
+
+
+def bring_up(root, name=NAME):
+    """What the kernel leaves behind once the keyboard is fully probed"""
+    interface = os.path.join(device_dir(root, name), f"{name}:1.0")
+    write(interface, "driver/uevent")
+    write(interface, f"{HID}/driver/uevent")
+    write(interface, f"{HID}/hidraw/hidraw0/dev", "241:0")
+
+
+def break_device(root):
+    """hid_asus failed to probe: the HID device has no driver and no hidraw"""
+    hid = os.path.join(device_dir(root), INTERFACE, HID)
+    shutil.rmtree(os.path.join(hid, "driver"))
+    shutil.rmtree(os.path.join(hid, "hidraw"))
+
+
+def bind_event(name=NAME):
+    devpath = f"/devices/pci0000:00/0000:00:14.0/usb1/{name}/{name}:1.0/{HID}"
+    return "bind", devpath, {"SUBSYSTEM": "hid", "DEVPATH": devpath}
+
+
+def read(root, attribute):
+    with open(os.path.join(root, attribute)) as f:
+        return f.read()
+
+
+def make_fixer(root):
+    clock = FakeClock()
+    run = FakeRun()
+    return ResumeFixer(root, clock=clock, run=run), clock, run
+
+
+def test_healthy_resume():
+    """A keyboard that comes back on its own is never reset"""
+    print("\nHealthy resume...")
+    root = fake_sysfs()
+    fixer, clock, run = make_fixer(root)
+    fixer.on_sleep(True)
+    clock.now += 60
+    fixer.on_sleep(False)
+
+    ok = fixer.state == IDLE and fixer.results == [(0.0, False)]
+    ok = ok and read(root, USB_UNBIND) == "" and not run.commands
+    print("  PASS" if ok else f"  FAIL: {fixer.results} {run.commands}")
+    return ok
+
+
+def test_late_bind():
+    """A device that binds late is waited for, not reset"""
+    print("\nDevice binds 800 ms after resume...")
+    root = fake_sysfs()
+    break_device(root)
+    fixer, clock, run = make_fixer(root)
+    fixer.on_sleep(False)
+    waiting = fixer.state != IDLE and fixer.timeout() == SETTLE_TIMEOUT
+
+    clock.now += 0.8
+    bring_up(root)
+    fixer.on_uevent(*bind_event())
+
+    ok = waiting and fixer.state == IDLE and [(round(ms), reset) for ms, reset in fixer.results] == [(800, False)]
+    ok = ok and read(root, USB_UNBIND) == ""
+    print(f"  Results: {fixer.results}")
+    print("  PASS" if ok else "  FAIL: expected usable after 800 ms without a reset")
+    return ok
+
+
+def test_reset_when_broken():
+    """A device still broken after the settle time is rebound once"""
+    print("\nDevice still broken after settling...")
+    root = fake_sysfs()
+    break_device(root)
+    fixer, clock, run = make_fixer(root)
+    fixer.on_sleep(False)
+    # Unrelated events do not trigger a reset
+    fixer.on_uevent("change", "/devices/virtual/input/input7", {"SUBSYSTEM": "input"})
+    clock.now += SETTLE_TIMEOUT
+    fixer.on_timeout()
+    rebound = read(root, USB_UNBIND) == NAME and read(root, USB_BIND) == NAME
+
+    clock.now += 0.25
+    bring_up(root)
+    fixer.on_uevent(*bind_event())
+
+    ok = rebound and fixer.state == IDLE
+    ok = ok and [(round(ms), reset) for ms, reset in fixer.results] == [(round((SETTLE_TIMEOUT + 0.25) * 1000), True)]
+    ok = ok and run.commands == ["udevadm trigger --subsystem-match=leds"]
+    print(f"  Results: {fixer.results}, commands: {run.commands}")
+    print("  PASS" if ok else "  FAIL: expected one rebind and a leds trigger")
+    return ok
+
+
+def test_reload_then_give_up():
+    """If rebinding does not help, hid_multitouch is reloaded, then it gives up"""
+    print("\nDevice stays broken...")
+    root = fake_sysfs()
+    break_device(root)
+    fixer, clock, run = make_fixer(root)
+    fixer.on_sleep(False)
+    for timeout in (SETTLE_TIMEOUT, RESET_TIMEOUT, RESET_TIMEOUT):
+        clock.now += timeout
+        fixer.on_timeout()
+
+    ok = fixer.state == IDLE and fixer.timeout() is None and not fixer.results
+    ok = ok and run.commands == ["modprobe -r hid_multitouch", "modprobe hid_multitouch"]
+    print(f"  Commands: {run.commands}")
+    print("  PASS" if ok else "  FAIL: expected one reload and then idle")
+    return ok
+
+
+def test_index():
+    """The device path comes from the index; sysfs is only rescanned when it moves"""
+    print("\nResolving the device path...")
+    root = fake_sysfs(other_devices=200)
+    fixer, clock, run = make_fixer(root)
+    for _ in range(5):
+        fixer.on_sleep(True)
+        fixer.on_sleep(False)
+    scans = fixer.index.scans
+
+    # Replugged on another port
+    os.rename(device_dir(root), device_dir(root, "1-6"))
+    os.rename(os.path.join(device_dir(root, "1-6"), INTERFACE), os.path.join(device_dir(root, "1-6"), "1-6:1.0"))
+    fixer.on_sleep(False)
+
+    ok = scans == 1 and fixer.name == "1-6" and fixer.index.scans == 2 and len(fixer.results) == 6
+    print(f"  Scans: {scans} for 5 resumes, {fixer.index.scans} after the device moved")
+    print("  PASS" if ok else "  FAIL")
+    return ok
+
+
+def test_serve():
+    """logind signals and uevents drive the daemon loop"""
+    print("\nDaemon loop with fake logind and uevents...")
+    root = fake_sysfs()
+    break_device(root)
+    fixer = ResumeFixer(root, run=FakeRun())
+    kernel, ours = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    read_fd, write_fd = os.pipe()
+    signals = os.fdopen(read_fd, "rb")
+    logind = os.fdopen(write_fd, "w", buffering=1)
+    thread = threading.Thread(target=serve, args=(fixer, ours, signals), daemon=True)
+    thread.start()
+
+    logind.write("/org/freedesktop/login1: org.freedesktop.login1.Manager.PrepareForSleep (true,)\n")
+    logind.write("/org/freedesktop/login1: org.freedesktop.login1.Manager.PrepareForSleep (false,)\n")
+    deadline = time.monotonic() + 2
+    while fixer.state == IDLE and time.monotonic() < deadline:
+        time.sleep(0.005)
+    bring_up(root)
+    action, devpath, props = bind_event()
+    kernel.send(f"{action}@{devpath}\0ACTION={action}\0SUBSYSTEM=hid\0".encode())
+    logind.close()
+    thread.join(timeout=2)
+
+    ok = not thread.is_alive() and len(fixer.results) == 1 and not fixer.results[0][1]
+    ok = ok and fixer.results[0][0] > 0
+    print(f"  Results: {fixer.results}")
+    ok = ok and parse_sleep_signal("PrepareForSleep (true,)") is True
+    print("  PASS" if ok else f"  FAIL: {fixer.results}")
+    return ok
+
+
+def main():
+    print("ASUS Resume Fix Test")
+    print("=" * 50)
+    results = [
+        test_healthy_resume(),
+        test_late_bind(),
+        test_reset_when_broken(),
+        test_reload_then_give_up(),
+        test_index(),
+        test_serve(),
+    ]
+    print()
+    if all(results):
+        print("All tests passed")
+    else:
+        print("Some tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,60 @@ AsusCtrl GUI - A graphical control interface for asusctl
 """
 
 import gi
-import subprocess
 import os
 
 gi.require_version('Gtk', '4.0')
+gi.require_version('Gdk', '4.0')
 gi.require_version('Adw', '1')
-from gi.repository import Gtk, Adw, GLib
+from gi.repository import Gtk, Gdk, Adw, GLib
+
+from asusd_backend import AURA_MODE_STATIC, BRIGHTNESS_LEVELS, create_backend_async
+from command_runner import CommandRunner
+from device_state import AURA_MODE_NAMES, DeviceState, StateSync
+from input_coalescer import StepCoalescer
+from latency_trace import shared_tracer
+from snapshots import LAST_SESSION, SnapshotStore, apply_snapshot, capture
+
+tracer = shared_tracer("asusctrl", "ASUSCTRL_TRACE")
 
 class AsusCtrlWindow(Gtk.ApplicationWindow):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, backend, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
         self.set_title("AsusCtrl Control Panel")
         self.set_default_size(600, 700)
         
+        # Actions run asynchronously, serialized per category, through
+        # asusd over D-Bus when available and asusctl otherwise
+        self.backend = backend
+        self.runner = backend.runner
+        
+        # Cached device state; widgets follow it
+        self.state = DeviceState()
+        
+        # Saved snapshots; applied values are remembered as the last session
+        self.snapshots = None
+        self.snapshot_write = None
+        
+        # Latency of the action that just finished, when tracing is on
+        self.last_latency = None
+        self.status_timeout = None
+        
+        # Next/Previous bursts become one absolute set; widgets follow each click
+        self.brightness_steps = StepCoalescer(
+            self.state, "brightness", lambda: BRIGHTNESS_LEVELS,
+            lambda level, callback: self.run_action("brightness", self.backend.set_kbd_brightness, level, callback),
+            lambda step, callback: self.run_action("brightness", self.backend.step_kbd_brightness, step, callback),
+            self.on_action_finished
+        )
+        self.aura_mode_steps = StepCoalescer(
+            self.state, "aura_mode", self.backend.aura_modes,
+            lambda mode, callback: self.run_action("aura_mode", self.backend.set_aura_mode, mode, callback),
+            lambda step, callback: self.run_action("aura_mode", self.backend.step_aura_mode, step, callback),
+            self.on_action_finished
+        )
+        self.connect("close-request", self.on_close_request)
+        
         # Main box
         main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
         self.set_child(main_box)
@@ -55,6 +95,10 @@ class AsusCtrlWindow(Gtk.ApplicationWindow):
         content_box.append(self.create_aura_section())
         content_box.append(Gtk.Separator())
         
+        # Snapshots Section
+        content_box.append(self.create_snapshot_section())
+        content_box.append(Gtk.Separator())
+        
         # Status bar
         self.status_label = Gtk.Label(label="Ready")
         self.status_label.set_margin_top(10)
@@ -62,6 +106,19 @@ class AsusCtrlWindow(Gtk.ApplicationWindow):
         self.status_label.add_css_class("dim-label")
         main_box.append(self.status_label)
         
+        # Load current state once, then follow change notifications
+        self.state.connect(self.on_state_changed)
+        self.state_sync = StateSync(self.state, self.backend)
+        load_time = self.state_sync.start()
+        self.status_label.set_text(f"Ready (state loaded in {load_time * 1000:.1f} ms)")
+        
+        # Restore the last session in one go, skipping what is already set
+        self.snapshots = SnapshotStore()
+        self.refresh_snapshot_list()
+        last = self.snapshots.get(LAST_SESSION)
+        if last:
+            self.apply_snapshot(LAST_SESSION, last)
+        
     def create_profile_section(self):
         """Create the performance profile section"""
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
@@ -75,10 +132,12 @@ class AsusCtrlWindow(Gtk.ApplicationWindow):
         profile_box.set_homogeneous(True)
         
         profiles = ["Quiet", "Balanced", "Performance"]
+        self.profile_buttons = {}
         for profile in profiles:
             btn = Gtk.Button(label=profile)
             btn.connect("clicked", self.on_profile_clicked, profile.lower())
             profile_box.append(btn)
+            self.profile_buttons[profile.lower()] = btn
         
         box.append(profile_box)
         return box
@@ -96,10 +155,12 @@ class AsusCtrlWindow(Gtk.ApplicationWindow):
         brightness_box.set_homogeneous(True)
         
         levels = ["Off", "Low", "Med", "High"]
+        self.brightness_buttons = {}
         for level in levels:
             btn = Gtk.Button(label=level)
             btn.connect("clicked", self.on_kbd_brightness_clicked, level.lower())
             brightness_box.append(btn)
+            self.brightness_buttons[level.lower()] = btn
         
         box.append(brightness_box)
         
@@ -164,6 +225,11 @@ class AsusCtrlWindow(Gtk.ApplicationWindow):
         label.add_css_class("title-3")
         box.append(label)
         
+        # Current mode
+        self.aura_mode_label = Gtk.Label(label="Mode: unknown")
+        self.aura_mode_label.add_css_class("dim-label")
+        box.append(self.aura_mode_label)
+        
         # Mode toggle buttons
         mode_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
         mode_box.set_halign(Gtk.Align.CENTER)
@@ -196,59 +262,230 @@ class AsusCtrlWindow(Gtk.ApplicationWindow):
         box.append(static_box)
         return box
     
+    def create_snapshot_section(self):
+        """Create the saved snapshots section"""
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        
+        label = Gtk.Label(label="Snapshots")
+        label.set_halign(Gtk.Align.START)
+        label.add_css_class("title-3")
+        box.append(label)
+        
+        # Saved snapshots
+        saved_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        saved_box.set_halign(Gtk.Align.CENTER)
+        
+        self.snapshot_names = Gtk.StringList()
+        self.snapshot_dropdown = Gtk.DropDown(model=self.snapshot_names)
+        saved_box.append(self.snapshot_dropdown)
+        
+        apply_btn = Gtk.Button(label="Apply")
+        apply_btn.connect("clicked", self.on_apply_snapshot)
+        saved_box.append(apply_btn)
+        
+        delete_btn = Gtk.Button(label="Delete")
+        delete_btn.connect("clicked", self.on_delete_snapshot)
+        saved_box.append(delete_btn)
+        
+        box.append(saved_box)
+        
+        # Save the current settings under a name
+        save_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        save_box.set_halign(Gtk.Align.CENTER)
+        
+        self.snapshot_entry = Gtk.Entry(placeholder_text="Snapshot name")
+        save_box.append(self.snapshot_entry)
+        
+        save_btn = Gtk.Button(label="Save Current")
+        save_btn.connect("clicked", self.on_save_snapshot)
+        save_box.append(save_btn)
+        
+        box.append(save_box)
+        return box
+    
+    def on_state_changed(self, field, value):
+        """Update widgets to match the cached device state"""
+        if field == "profile":
+            self.highlight(self.profile_buttons, value)
+        elif field == "brightness":
+            self.highlight(self.brightness_buttons, value)
+        elif field == "charge_limit":
+            self.charge_limit_spin.set_value(value)
+        elif field == "aura_mode":
+            self.aura_mode_label.set_text(f"Mode: {AURA_MODE_NAMES.get(value, value)}")
+        elif field == "rgb":
+            rgba = Gdk.RGBA()
+            rgba.parse("#%02x%02x%02x" % value)
+            self.color_button.set_rgba(rgba)
+        # Once the startup snapshot is out, every change is the last session
+        if self.snapshots and self.snapshots.remember(field, value):
+            self.schedule_snapshot_write()
+    
+    def highlight(self, buttons, active):
+        """Mark the button for the active value"""
+        for name, btn in buttons.items():
+            if name == active:
+                btn.add_css_class("suggested-action")
+            else:
+                btn.remove_css_class("suggested-action")
+    
     # Callback functions
     def on_profile_clicked(self, button, profile):
-        self.run_command(["asusctl", "profile", "-P", profile])
+        if self.skip_if_current("profile", profile):
+            return
+        self.run_action("profile", self.backend.set_profile, profile, self.on_value_applied("profile", profile))
     
     def on_kbd_brightness_clicked(self, button, level):
-        self.run_command(["asusctl", "-k", level])
+        if self.skip_if_current("brightness", level):
+            return
+        self.run_action("brightness", self.backend.set_kbd_brightness, level,
+                        self.on_value_applied("brightness", level))
     
     def on_prev_kbd_brightness(self, button):
-        self.run_command(["asusctl", "-p"])
+        self.brightness_steps.step(-1)
     
     def on_next_kbd_brightness(self, button):
-        self.run_command(["asusctl", "-n"])
+        self.brightness_steps.step(1)
     
     def on_set_charge_limit(self, button):
         limit = int(self.charge_limit_spin.get_value())
-        self.run_command(["asusctl", "-c", str(limit)])
+        if self.skip_if_current("charge_limit", limit):
+            return
+        self.run_action("charge_limit", self.backend.set_charge_limit, limit,
+                        self.on_value_applied("charge_limit", limit))
     
     def on_oneshot_charge(self, button):
-        self.run_command(["asusctl", "-o"])
+        self.run_action("oneshot_charge", self.backend.oneshot_charge, self.on_action_finished)
     
     def on_prev_aura_mode(self, button):
-        self.run_command(["asusctl", "aura", "-p"])
+        self.aura_mode_steps.step(-1)
     
     def on_next_aura_mode(self, button):
-        self.run_command(["asusctl", "aura", "-n"])
+        self.aura_mode_steps.step(1)
     
     def on_set_static_color(self, button):
         color = self.color_button.get_rgba()
         r = int(color.red * 255)
         g = int(color.green * 255)
         b = int(color.blue * 255)
-        self.run_command(["asusctl", "aura", "static", "-c", f"{r:02x}{g:02x}{b:02x}"])
-    
-    def run_command(self, cmd):
-        """Execute asusctl command and update status"""
-        try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            self.update_status(f"✓ Command executed: {' '.join(cmd[1:])}")
-        except subprocess.CalledProcessError as e:
-            self.update_status(f"✗ Error: {e.stderr.strip()}")
-        except Exception as e:
-            self.update_status(f"✗ Error: {str(e)}")
+        if self.state.matches("aura_mode", AURA_MODE_STATIC) and self.skip_if_current("rgb", (r, g, b)):
+            return
+        self.run_action("aura_static", self.backend.set_aura_static, r, g, b,
+                        self.on_value_applied("rgb", (r, g, b)))
+    
+    def refresh_snapshot_list(self):
+        names = self.snapshots.names()
+        self.snapshot_names.splice(0, self.snapshot_names.get_n_items(), names)
+    
+    def selected_snapshot(self):
+        item = self.snapshot_dropdown.get_selected_item()
+        return item.get_string() if item else None
+    
+    def on_apply_snapshot(self, button):
+        name = self.selected_snapshot()
+        if name:
+            self.apply_snapshot(name, self.snapshots.get(name))
+    
+    def on_save_snapshot(self, button):
+        name = self.snapshot_entry.get_text().strip()
+        if not name:
+            self.update_status("✗ Enter a name for the snapshot")
+            return
+        self.snapshots.save(name, capture(self.state))
+        self.refresh_snapshot_list()
+        self.update_status(f"✓ Saved snapshot: {name}")
+    
+    def on_delete_snapshot(self, button):
+        name = self.selected_snapshot()
+        if name and self.snapshots.delete(name):
+            self.refresh_snapshot_list()
+            self.update_status(f"✓ Deleted snapshot: {name}")
+    
+    def apply_snapshot(self, name, snapshot):
+        """Send the settings of a snapshot that differ from the device, all at once"""
+        def finished(results):
+            failed = [output for action, success, output in results if not success]
+            if failed:
+                self.update_status(f"✗ {name}: {failed[0]}")
+            else:
+                self.update_status(f"✓ {name}: {len(results)} setting(s) applied")
+        
+        if apply_snapshot(self.backend, snapshot, self.state, finished, self.run_action) == 0:
+            self.update_status(f"✓ {name}: already applied")
+    
+    def schedule_snapshot_write(self):
+        """Write the last session once changes settle, not on every click"""
+        if self.snapshot_write is None:
+            self.snapshot_write = GLib.timeout_add_seconds(1, self.write_snapshots)
+    
+    def write_snapshots(self):
+        self.snapshot_write = None
+        self.snapshots.write()
+        return GLib.SOURCE_REMOVE
+    
+    def run_action(self, source, method, *args):
+        """Call a backend method whose last argument is its callback, tracing it if enabled"""
+        *args, callback = args
+        trace = tracer.begin(source)
+        if trace:
+            finished = callback
+            
+            def callback(action, success, output):
+                trace.finish("complete")
+                self.last_latency = trace.total()
+                finished(action, success, output)
+                self.last_latency = None
+        method(*args, callback)
+        if trace:
+            trace.mark("enqueue")
+    
+    def skip_if_current(self, field, value):
+        """Skip a command whose value is already applied"""
+        if self.state.matches(field, value):
+            self.update_status(f"✓ Already set: {value}")
+            return True
+        return False
+    
+    def on_value_applied(self, field, value):
+        """Callback that records value in the state cache once it is applied"""
+        def finished(action, success, output):
+            if success:
+                if field == "rgb":
+                    self.state.update("aura_mode", AURA_MODE_STATIC)
+                self.state.update(field, value)
+            self.on_action_finished(action, success, output)
+        return finished
+    
+    def on_action_finished(self, action, success, output):
+        """Report the result of a finished action"""
+        if success:
+            latency = f" ({self.last_latency * 1000:.0f} ms)" if self.last_latency is not None else ""
+            self.update_status(f"✓ Command executed: {action}{latency}")
+        else:
+            self.update_status(f"✗ Error: {output}")
+    
+    def on_close_request(self, window):
+        self.brightness_steps.cancel()
+        self.aura_mode_steps.cancel()
+        if self.snapshot_write is not None:
+            GLib.source_remove(self.snapshot_write)
+            self.write_snapshots()
+        tracer.export()
+        return False
     
     def update_status(self, message):
         """Update the status bar message"""
         self.status_label.set_text(message)
-        # Clear status after 3 seconds
-        GLib.timeout_add_seconds(3, lambda: self.status_label.set_text("Ready"))
+        # Clear status 3 seconds after the latest message; restart rather
+        # than stack the timer so an older one cannot clear a newer message
+        if self.status_timeout is not None:
+            GLib.source_remove(self.status_timeout)
+        self.status_timeout = GLib.timeout_add_seconds(3, self.clear_status)
+    
+    def clear_status(self):
+        self.status_timeout = None
+        self.status_label.set_text("Ready")
+        return GLib.SOURCE_REMOVE
 
 
 class AsusCtrlApp(Adw.Application):
@@ -257,7 +494,13 @@ class AsusCtrlApp(Adw.Application):
         self.connect('activate', self.on_activate)
     
     def on_activate(self, app):
-        self.win = AsusCtrlWindow(application=app)
+        # asusd is looked up asynchronously; keep the app alive until then
+        self.hold()
+        create_backend_async(CommandRunner(), self.on_backend_ready)
+    
+    def on_backend_ready(self, backend):
+        self.release()
+        self.win = AsusCtrlWindow(backend, application=self)
         self.win.present()
 
 
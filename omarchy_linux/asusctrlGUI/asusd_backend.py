@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Backends that carry out AsusCtrl GUI actions
+AsusdBackend talks to asusd over one persistent D-Bus connection;
+AsusctlBackend forks the asusctl CLI and is used as the fallback
+"""
+
+import os
+
+import gi
+gi.require_version('Gio', '2.0')
+from gi.repository import Gio, GLib
+
+# asusd D-Bus names (asusctl 6.x)
+ASUSD_BUS_NAME = "xyz.ljones.Asusd"
+PLATFORM_INTERFACE = "xyz.ljones.Platform"
+AURA_INTERFACE = "xyz.ljones.Aura"
+OBJECT_MANAGER_PATHS = ("/", "/xyz/ljones")
+CALL_TIMEOUT_MS = 5000
+
+# asusd enum values
+PROFILES = {"balanced": 0, "performance": 1, "quiet": 2}
+BRIGHTNESS_LEVELS = ["off", "low", "med", "high"]
+AURA_MODE_STATIC = 0
+# asusctl aura subcommand that sets each mode; asusctl offers all of them
+# whether or not the keyboard supports the mode
+ASUSCTL_AURA_MODES = {
+    0: "static", 1: "breathe", 2: "rainbow-cycle", 3: "rainbow-wave",
+    4: "stars", 5: "rain", 6: "highlight", 7: "laser", 8: "ripple",
+    10: "pulse", 11: "comet", 12: "flash",
+}
+LED_MODE_DATA_SIGNATURE = "(uu(yyy)(yyy)ss)"
+
+
+def interface_paths(reply):
+    """Map each interface in a GetManagedObjects reply to the first path exporting it"""
+    paths = {}
+    for path, interfaces in sorted(reply.unpack()[0].items()):
+        for interface in interfaces:
+            paths.setdefault(interface, path)
+    return paths
+
+
+class AsusctlBackend:
+    """Carry out actions by running the asusctl CLI"""
+
+    name = "asusctl"
+
+    def __init__(self, runner):
+        self.runner = runner
+
+    def _run(self, category, args, callback):
+        self.runner.run(
+            category,
+            ["asusctl"] + args,
+            lambda cmd, success, output: callback(" ".join(args), success, output)
+        )
+
+    def set_profile(self, profile, callback):
+        self._run("profile", ["profile", "-P", profile], callback)
+
+    def set_kbd_brightness(self, level, callback):
+        self._run("brightness", ["-k", level], callback)
+
+    def step_kbd_brightness(self, step, callback):
+        self._run("brightness", ["-n" if step > 0 else "-p"], callback)
+
+    def set_charge_limit(self, limit, callback):
+        self._run("battery", ["-c", str(limit)], callback)
+
+    def oneshot_charge(self, callback):
+        self._run("battery", ["-o"], callback)
+
+    def step_aura_mode(self, step, callback):
+        self._run("aura", ["aura", "-n" if step > 0 else "-p"], callback)
+
+    def aura_modes(self):
+        """None: asusctl has a subcommand for every mode, including ones the
+        keyboard does not support, so only -n/-p know which modes to cycle"""
+        return None
+
+    def set_aura_mode(self, mode, callback):
+        # Only for a mode asusd listed as supported; the subcommand sets it
+        # with asusctl's default colors and speed
+        self._run("aura", ["aura", ASUSCTL_AURA_MODES[mode]], callback)
+
+    def set_aura_static(self, r, g, b, callback):
+        self._run("aura", ["aura", "static", "-c", f"{r:02x}{g:02x}{b:02x}"], callback)
+
+
+class AsusdBackend:
+    """Carry out actions by calling asusd directly over D-Bus
+
+    The connection and proxies are created once; property proxies keep
+    their cached values current from PropertiesChanged signals, so
+    Next/Previous are computed locally without a round trip. Any call that
+    asusd rejects is retried through the fallback backend.
+    """
+
+    name = "asusd D-Bus"
+
+    def __init__(self, runner, connection=None, bus_name=ASUSD_BUS_NAME, fallback=None, proxies=None):
+        self.runner = runner
+        self.fallback = fallback
+        self.bus_name = bus_name
+        self.connection = connection or Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+        if proxies:
+            # Already created by create_backend_async
+            self.platform, self.aura = proxies
+            return
+        paths = self._find_objects()
+        if PLATFORM_INTERFACE not in paths:
+            raise LookupError(f"{bus_name} does not export {PLATFORM_INTERFACE}")
+        self.platform = self._proxy(paths[PLATFORM_INTERFACE], PLATFORM_INTERFACE)
+        self.aura = None
+        if AURA_INTERFACE in paths:
+            self.aura = self._proxy(paths[AURA_INTERFACE], AURA_INTERFACE)
+
+    def _find_objects(self):
+        """Map each asusd interface to the first object path exporting it"""
+        for root in OBJECT_MANAGER_PATHS:
+            try:
+                reply = self.connection.call_sync(
+                    self.bus_name, root, "org.freedesktop.DBus.ObjectManager",
+                    "GetManagedObjects", None, GLib.VariantType("(a{oa{sa{sv}}})"),
+                    Gio.DBusCallFlags.NONE, CALL_TIMEOUT_MS, None
+                )
+            except GLib.Error:
+                continue
+            paths = interface_paths(reply)
+            if paths:
+                return paths
+        return {}
+
+    def _proxy(self, path, interface):
+        return Gio.DBusProxy.new_sync(
+            self.connection, Gio.DBusProxyFlags.NONE, None,
+            self.bus_name, path, interface, None
+        )
+
+    def get_property(self, proxy, name, default=None):
+        """Return a cached property value, or default if asusd has not sent it"""
+        if proxy is None:
+            return default
+        value = proxy.get_cached_property(name)
+        return default if value is None else value.unpack()
+
+    def _set_property(self, category, action, proxy, name, value, callback, fallback):
+        if proxy is None:
+            fallback()
+            return
+
+        def start(done):
+            proxy.call(
+                "org.freedesktop.DBus.Properties.Set",
+                GLib.Variant("(ssv)", (proxy.get_interface_name(), name, value)),
+                Gio.DBusCallFlags.NONE, CALL_TIMEOUT_MS, None, self._on_reply, done
+            )
+
+        self.runner.submit(category, start, self._completion(action, callback, fallback))
+
+    def _call_method(self, category, action, proxy, method, callback, fallback):
+        def start(done):
+            proxy.call(method, None, Gio.DBusCallFlags.NONE, CALL_TIMEOUT_MS,
+                       None, self._on_reply, done)
+
+        self.runner.submit(category, start, self._completion(action, callback, fallback))
+
+    def _completion(self, action, callback, fallback):
+        def finished(success, output):
+            if not success and self.fallback:
+                print(f"asusd call failed ({output}), falling back to asusctl")
+                fallback()
+            else:
+                callback(action, success, output)
+        return finished
+
+    @staticmethod
+    def _on_reply(proxy, result, done):
+        try:
+            proxy.call_finish(result)
+            done(True, "")
+        except GLib.Error as e:
+            done(False, e.message)
+
+    def _fallback(self, method, *args):
+        if self.fallback:
+            return lambda: getattr(self.fallback, method)(*args)
+        return lambda: args[-1](method, False, "asusd does not support this action")
+
+    def set_profile(self, profile, callback):
+        self._set_property(
+            "profile", f"profile -P {profile}", self.platform, "PlatformProfile",
+            GLib.Variant("u", PROFILES[profile]), callback,
+            self._fallback("set_profile", profile, callback)
+        )
+
+    def set_kbd_brightness(self, level, callback):
+        self._set_property(
+            "brightness", f"-k {level}", self.aura, "Brightness",
+            GLib.Variant("u", BRIGHTNESS_LEVELS.index(level)), callback,
+            self._fallback("set_kbd_brightness", level, callback)
+        )
+
+    def step_kbd_brightness(self, step, callback):
+        current = self.get_property(self.aura, "Brightness")
+        if current is None:
+            self._fallback("step_kbd_brightness", step, callback)()
+            return
+        level = BRIGHTNESS_LEVELS[(current + step) % len(BRIGHTNESS_LEVELS)]
+        self.set_kbd_brightness(level, callback)
+
+    def set_charge_limit(self, limit, callback):
+        self._set_property(
+            "battery", f"-c {limit}", self.platform, "ChargeControlEndThreshold",
+            GLib.Variant("y", limit), callback,
+            self._fallback("set_charge_limit", limit, callback)
+        )
+
+    def oneshot_charge(self, callback):
+        self._call_method(
+            "battery", "-o", self.platform, "OneShotFullCharge", callback,
+            self._fallback("oneshot_charge", callback)
+        )
+
+    def aura_modes(self):
+        """Modes the keyboard supports, in asusd's order, or None if unknown"""
+        modes = self.get_property(self.aura, "SupportedBasicModes")
+        return list(modes) if modes else None
+
+    def step_aura_mode(self, step, callback):
+        modes = self.aura_modes()
+        current = self.get_property(self.aura, "LedMode")
+        if not modes or current not in modes:
+            self._fallback("step_aura_mode", step, callback)()
+            return
+        mode = modes[(modes.index(current) + step) % len(modes)]
+        self._set_property(
+            "aura", f"aura {'-n' if step > 0 else '-p'}", self.aura, "LedMode",
+            GLib.Variant("u", mode), callback,
+            self._fallback("step_aura_mode", step, callback)
+        )
+
+    def set_aura_mode(self, mode, callback):
+        self._set_property(
+            "aura", f"aura {ASUSCTL_AURA_MODES.get(mode, mode)}", self.aura, "LedMode",
+            GLib.Variant("u", mode), callback, self._fallback("set_aura_mode", mode, callback)
+        )
+
+    def set_aura_static(self, r, g, b, callback):
+        effect = (AURA_MODE_STATIC, 0, (r, g, b), (0, 0, 0), "Med", "Right")
+        self._set_property(
+            "aura", f"aura static -c {r:02x}{g:02x}{b:02x}", self.aura, "LedModeData",
+            GLib.Variant(LED_MODE_DATA_SIGNATURE, effect), callback,
+            self._fallback("set_aura_static", r, g, b, callback)
+        )
+
+
+def backend_choice(preferred=None):
+    """Return the backend to use, "dbus" or "asusctl", and the bus to find asusd on"""
+    preferred = preferred or os.environ.get("ASUSCTRL_BACKEND", "dbus")
+    bus_type = Gio.BusType.SYSTEM
+    if os.environ.get("ASUSCTRL_BUS") == "session":
+        bus_type = Gio.BusType.SESSION
+    return preferred, bus_type
+
+
+def create_backend(runner, preferred=None):
+    """Return the asusd D-Bus backend if asusd is reachable, else asusctl
+
+    preferred (or $ASUSCTRL_BACKEND) may be "dbus" or "asusctl" to force one.
+    Setting $ASUSCTRL_BUS=session looks for asusd on the session bus, which
+    is where test stand-ins such as fake_asusd.py register.
+    """
+    preferred, bus_type = backend_choice(preferred)
+    fallback = AsusctlBackend(runner)
+    if preferred == "asusctl":
+        return fallback
+    try:
+        connection = Gio.bus_get_sync(bus_type, None)
+        return AsusdBackend(runner, connection, fallback=fallback)
+    except (GLib.Error, LookupError) as e:
+        print(f"asusd D-Bus unavailable ({e}), using asusctl")
+        return fallback
+
+
+def create_backend_async(runner, callback, preferred=None, bus_name=ASUSD_BUS_NAME):
+    """Like create_backend, but without blocking the main loop
+
+    The bus connection, object lookup and proxies are all created with
+    asynchronous calls, so a slow or hung asusd cannot freeze the GUI while
+    it starts. callback(backend) is called once the backend is ready.
+    """
+    preferred, bus_type = backend_choice(preferred)
+    fallback = AsusctlBackend(runner)
+    if preferred == "asusctl":
+        callback(fallback)
+        return
+
+    def unavailable(error):
+        print(f"asusd D-Bus unavailable ({error}), using asusctl")
+        callback(fallback)
+
+    def on_bus(source, result):
+        try:
+            connection = Gio.bus_get_finish(result)
+        except GLib.Error as e:
+            unavailable(e)
+            return
+        find_objects(connection, list(OBJECT_MANAGER_PATHS))
+
+    def find_objects(connection, roots):
+        if not roots:
+            unavailable(f"{bus_name} does not export {PLATFORM_INTERFACE}")
+            return
+
+        def on_reply(conn, result):
+            try:
+                paths = interface_paths(conn.call_finish(result))
+            except GLib.Error:
+                paths = {}
+            if PLATFORM_INTERFACE in paths:
+                make_proxies(connection, paths)
+            elif paths:
+                unavailable(f"{bus_name} does not export {PLATFORM_INTERFACE}")
+            else:
+                find_objects(connection, roots[1:])
+
+        connection.call(
+            bus_name, roots[0], "org.freedesktop.DBus.ObjectManager",
+            "GetManagedObjects", None, GLib.VariantType("(a{oa{sa{sv}}})"),
+            Gio.DBusCallFlags.NONE, CALL_TIMEOUT_MS, None, on_reply
+        )
+
+    def make_proxies(connection, paths):
+        interfaces = [PLATFORM_INTERFACE] + [i for i in (AURA_INTERFACE,) if i in paths]
+        proxies = []
+
+        def next_proxy():
+            if len(proxies) == len(interfaces):
+                platform, aura = (proxies + [None])[:2]
+                callback(AsusdBackend(runner, connection, bus_name, fallback, (platform, aura)))
+                return
+            interface = interfaces[len(proxies)]
+            Gio.DBusProxy.new(
+                connection, Gio.DBusProxyFlags.NONE, None,
+                bus_name, paths[interface], interface, None, on_proxy
+            )
+
+        def on_proxy(source, result):
+            try:
+                proxies.append(Gio.DBusProxy.new_finish(result))
+            except GLib.Error as e:
+                unavailable(e)
+                return
+            next_proxy()
+
+        next_proxy()
+
+    Gio.bus_get(bus_type, None, on_bus)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Latency per action for the asusctl and asusd D-Bus backends
+
+By default both backends run against stand-ins on the session bus:
+fake_asusd.py for D-Bus, and a fake asusctl that makes the same D-Bus
+round trip through gdbus, so the difference is the per-click process
+startup and bus connection. Run it inside its own session bus:
+
+    dbus-run-session -- python bench_backends.py
+
+With --system the real asusd and asusctl are used instead.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from gi.repository import Gio, GLib
+
+from asusd_backend import ASUSD_BUS_NAME, AsusctlBackend, AsusdBackend
+from command_runner import CommandRunner
+from fake_asusd import PLATFORM_PATH
+
+FAKE_ASUSCTL = f"""#!/bin/sh
+exec gdbus call --session --dest {ASUSD_BUS_NAME} --object-path {PLATFORM_PATH} \\
+    --method org.freedesktop.DBus.Properties.Get xyz.ljones.Platform PlatformProfile >/dev/null
+"""
+
+ACTIONS = [
+    ("profile", lambda b, cb: b.set_profile("quiet", cb)),
+    ("profile", lambda b, cb: b.set_profile("balanced", cb)),
+    ("brightness next", lambda b, cb: b.step_kbd_brightness(1, cb)),
+    ("brightness prev", lambda b, cb: b.step_kbd_brightness(-1, cb)),
+    ("charge limit", lambda b, cb: b.set_charge_limit(80, cb)),
+    ("aura next", lambda b, cb: b.step_aura_mode(1, cb)),
+]
+
+
+def start_stand_ins():
+    """Start fake_asusd and put a fake asusctl on PATH"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    daemon = subprocess.Popen(
+        [sys.executable, os.path.join(here, "fake_asusd.py")],
+        stdout=subprocess.PIPE, text=True
+    )
+    daemon.stdout.readline()
+
+    tmpdir = tempfile.mkdtemp(prefix="fake-asusctl-")
+    path = os.path.join(tmpdir, "asusctl")
+    with open(path, "w") as f:
+        f.write(FAKE_ASUSCTL)
+    os.chmod(path, 0o755)
+    os.environ["PATH"] = tmpdir + os.pathsep + os.environ["PATH"]
+    return daemon
+
+
+def measure(backend, rounds):
+    """Run every action rounds times, one at a time; return latencies per action"""
+    loop = GLib.MainLoop()
+    latencies = {name: [] for name, _ in ACTIONS}
+    failures = []
+    queue = [action for _ in range(rounds) for action in ACTIONS]
+
+    def next_action():
+        if not queue:
+            loop.quit()
+            return GLib.SOURCE_REMOVE
+        name, action = queue.pop(0)
+        start = time.perf_counter()
+
+        def finished(description, success, output):
+            latencies[name].append(time.perf_counter() - start)
+            if not success:
+                failures.append(output)
+            GLib.idle_add(next_action)
+
+        action(backend, finished)
+        return GLib.SOURCE_REMOVE
+
+    GLib.idle_add(next_action)
+    loop.run()
+    return latencies, failures
+
+
+def report(backend, latencies, failures):
+    print(f"\n{backend.name}:")
+    for name, values in latencies.items():
+        values.sort()
+        print(f"  {name:<16} p50 {values[len(values) // 2] * 1000:7.2f} ms   "
+              f"p95 {values[int(len(values) * 0.95)] * 1000:7.2f} ms")
+    all_values = sorted(v for values in latencies.values() for v in values)
+    mean = sum(all_values) / len(all_values)
+    print(f"  {'all actions':<16} mean {mean * 1000:6.2f} ms   failures {len(failures)}")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare asusctl and asusd D-Bus latency")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--system", action="store_true",
+                        help="use the real asusd and asusctl (changes real settings)")
+    args = parser.parse_args()
+
+    print("AsusCtrl Backend Latency Benchmark")
+    print("=" * 50)
+
+    daemon = None
+    if not args.system:
+        daemon = start_stand_ins()
+    try:
+        bus = Gio.BusType.SYSTEM if args.system else Gio.BusType.SESSION
+        runner = CommandRunner()
+        backends = [
+            AsusctlBackend(runner),
+            AsusdBackend(runner, Gio.bus_get_sync(bus, None)),
+        ]
+        means = {}
+        for backend in backends:
+            latencies, failures = measure(backend, args.rounds)
+            means[backend.name] = report(backend, latencies, failures)
+        print("\n" + "=" * 50)
+        print(f"D-Bus speedup per action: {means['asusctl'] / means['asusd D-Bus']:.1f}x")
+    finally:
+        if daemon:
+            daemon.terminate()
+
+
+if __name__ == "__main__":
+    main()
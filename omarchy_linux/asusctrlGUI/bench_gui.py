@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Headless responsiveness benchmark for the AsusCtrl window
+Runs AsusCtrlWindow under GTK's broadway backend (or Xvfb when broadwayd is
+not installed) against a fake asusctl on PATH that takes --latency seconds
+and fails --failure-rate of its calls. Clicks buttons programmatically and
+reports main loop stalls, click-to-completion time, memory growth, and the
+GLib timeouts and idles the window leaves behind, which catches leaks such
+as status timeouts that are never cancelled.
+
+    python3 bench_gui.py [--actions 2000] [--interval-ms 5] [--latency 0.02] [--failure-rate 0.05]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from gi.repository import GLib
+
+FRAME = 1.0 / 60
+DISPLAY_NUMBER = 94
+
+FAKE_ASUSCTL = """#!/bin/sh
+echo "$*" >> "$FAKE_ASUSCTL_LOG"
+sleep "$FAKE_ASUSCTL_DELAY"
+n=$(od -An -N2 -tu2 /dev/urandom)
+if [ "$n" -lt "$FAKE_ASUSCTL_FAIL_BELOW" ]; then
+    echo "fake failure" >&2
+    exit 1
+fi
+echo "ok"
+"""
+
+
+def install_scripted_asusctl(tmpdir, latency, failure_rate):
+    """Put a fake asusctl first on PATH that sleeps and fails at random"""
+    path = os.path.join(tmpdir, "asusctl")
+    with open(path, "w") as f:
+        f.write(FAKE_ASUSCTL)
+    os.chmod(path, 0o755)
+    os.environ["PATH"] = tmpdir + os.pathsep + os.environ["PATH"]
+    os.environ["FAKE_ASUSCTL_DELAY"] = str(latency)
+    os.environ["FAKE_ASUSCTL_FAIL_BELOW"] = str(int(failure_rate * 65536))
+    os.environ["FAKE_ASUSCTL_LOG"] = os.path.join(tmpdir, "calls.log")
+    return os.environ["FAKE_ASUSCTL_LOG"]
+
+
+def start_display():
+    """Start a headless display server and point GTK at it; returns the process"""
+    display = f":{DISPLAY_NUMBER}"
+    broadwayd = shutil.which("gtk4-broadwayd")
+    if broadwayd:
+        os.environ["GDK_BACKEND"] = "broadway"
+        os.environ["BROADWAY_DISPLAY"] = display
+        server = subprocess.Popen([broadwayd, display], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elif shutil.which("Xvfb"):
+        os.environ["GDK_BACKEND"] = "x11"
+        os.environ["DISPLAY"] = display
+        server = subprocess.Popen(["Xvfb", display, "-nolisten", "tcp"],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        print("Neither gtk4-broadwayd (gtk4) nor Xvfb is installed")
+        sys.exit(1)
+    time.sleep(0.5)
+    if server.poll() is not None:
+        print(f"The headless display server exited with {server.returncode}")
+        sys.exit(1)
+    return server
+
+
+class SourceTracker:
+    """Remember every GLib timeout and idle the GUI adds, and who added it"""
+
+    WRAPPED = ("timeout_add", "timeout_add_seconds", "idle_add")
+
+    def __init__(self):
+        self.sources = []
+        self.originals = {}
+
+    def install(self):
+        for name in self.WRAPPED:
+            original = self.originals[name] = getattr(GLib, name)
+            setattr(GLib, name, self._wrap(original))
+
+    def uninstall(self):
+        for name, original in self.originals.items():
+            setattr(GLib, name, original)
+
+    def _wrap(self, original):
+        def add(*args, **kwargs):
+            source_id = original(*args, **kwargs)
+            code = sys._getframe(1).f_code
+            # The benchmark's own timeouts are not the window's
+            if code.co_filename != __file__:
+                self.sources.append((source_id, code.co_name))
+            return source_id
+        return add
+
+    def live(self):
+        """{caller: count} of sources that are still attached"""
+        context = GLib.MainContext.default()
+        live = {}
+        for source_id, caller in self.sources:
+            if context.find_source_by_id(source_id) is not None:
+                live[caller] = live.get(caller, 0) + 1
+        return live
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def click_actions(window, rnd):
+    """Clicks a user can make, each a function of no arguments"""
+    from gi.repository import Gdk
+
+    def set_charge_limit():
+        window.charge_limit_spin.set_value(rnd.randint(60, 100))
+        window.on_set_charge_limit(None)
+
+    def set_static_color():
+        rgba = Gdk.RGBA()
+        rgba.parse(rnd.choice(["#ff8000", "#00ff00", "#0000ff"]))
+        window.color_button.set_rgba(rgba)
+        window.on_set_static_color(None)
+
+    return [
+        lambda: window.profile_buttons[rnd.choice(list(window.profile_buttons))].emit("clicked"),
+        lambda: window.brightness_buttons[rnd.choice(list(window.brightness_buttons))].emit("clicked"),
+        lambda: window.on_next_kbd_brightness(None),
+        lambda: window.on_prev_kbd_brightness(None),
+        lambda: window.on_next_aura_mode(None),
+        set_charge_limit,
+        set_static_color,
+    ]
+
+
+def run(args, tracker, log_path):
+    from asusctrl_gui import AsusCtrlWindow, tracer
+    from asusd_backend import create_backend
+    from command_runner import CommandRunner
+    from gi.repository import Adw, Gio
+
+    # Non-unique, so a running AsusCtrl GUI cannot take over the activation
+    app = Adw.Application(application_id="com.github.asusctrl_gui.bench",
+                          flags=Gio.ApplicationFlags.NON_UNIQUE)
+    rnd = random.Random(args.seed)
+    gaps = []
+    memory = []
+    result = {}
+
+    def on_activate(app):
+        window = AsusCtrlWindow(create_backend(CommandRunner()), application=app)
+        window.present()
+        actions = click_actions(window, rnd)
+        last_tick = [time.monotonic()]
+        clicks = [0]
+
+        def tick():
+            now = time.monotonic()
+            gaps.append(now - last_tick[0])
+            last_tick[0] = now
+            return GLib.SOURCE_CONTINUE
+
+        def click():
+            rnd.choice(actions)()
+            clicks[0] += 1
+            if clicks[0] % max(1, args.actions // 20) == 0:
+                gc.collect()
+                memory.append((clicks[0], rss_mb(), len(gc.get_objects())))
+            if clicks[0] < args.actions:
+                return GLib.SOURCE_CONTINUE
+            GLib.timeout_add(50, settle)
+            return GLib.SOURCE_REMOVE
+
+        def settle():
+            # Wait for queued commands and pending Next/Previous bursts
+            if (window.runner.pending() or window.brightness_steps.timer is not None
+                    or window.aura_mode_steps.timer is not None):
+                return GLib.SOURCE_CONTINUE
+            result["elapsed"] = time.monotonic() - start
+            result["live"] = tracker.live()
+            result["clicks"] = clicks[0]
+            window.close()
+            app.quit()
+            return GLib.SOURCE_REMOVE
+
+        start = time.monotonic()
+        GLib.timeout_add(1, tick)
+        tracker.install()
+        GLib.timeout_add(args.interval_ms, click)
+
+    app.connect("activate", on_activate)
+    app.run(None)
+    tracker.uninstall()
+
+    with open(log_path) as f:
+        result["commands"] = sum(1 for _ in f)
+    result["gaps"] = gaps
+    result["memory"] = memory
+    result["latency"] = tracer.summary()
+    return result
+
+
+def report(args, result):
+    gaps = sorted(result["gaps"])
+    stalls = [gap for gap in gaps if gap > FRAME]
+    print(f"\n{result['clicks']} clicks in {result['elapsed']:.1f}s, {result['commands']} asusctl commands")
+    print(f"Main loop: longest stall {gaps[-1] * 1000:.1f} ms, p99 gap {gaps[int(len(gaps) * 0.99)] * 1000:.1f} ms, "
+          f"{len(stalls)} stalls longer than one frame")
+
+    total = result["latency"].get("total")
+    if total:
+        print(f"Click to completion: p50 {total['p50'] * 1000:.1f} ms, p95 {total['p95'] * 1000:.1f} ms, "
+              f"p99 {total['p99'] * 1000:.1f} ms ({total['count']} actions)")
+
+    ok = True
+    memory = result["memory"]
+    if len(memory) >= 2:
+        # The first sample is taken after warm-up
+        (_, rss_start, objects_start), (_, rss_end, objects_end) = memory[0], memory[-1]
+        growth = rss_end - rss_start
+        print(f"Memory: RSS {rss_start:.1f} -> {rss_end:.1f} MiB ({growth:+.1f}), "
+              f"Python objects {objects_start} -> {objects_end} ({objects_end - objects_start:+d})")
+        if growth > args.max_growth_mb:
+            print(f"  FAIL: RSS grew more than {args.max_growth_mb} MiB")
+            ok = False
+
+    live = result["live"]
+    print(f"GLib sources still attached after settling: {sum(live.values())} {json.dumps(live)}")
+    if sum(live.values()) > args.max_live_sources:
+        print(f"  FAIL: more than {args.max_live_sources} timeouts or idles left behind")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AsusCtrl window headless against a fake asusctl")
+    parser.add_argument("--actions", type=int, default=2000, help="number of clicks")
+    parser.add_argument("--interval-ms", type=int, default=5, help="time between clicks")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per fake asusctl call")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="fraction of calls that fail")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-growth-mb", type=float, default=20.0)
+    parser.add_argument("--max-live-sources", type=int, default=5)
+    args = parser.parse_args()
+
+    print("AsusCtrl GUI Headless Benchmark")
+    print("=" * 50)
+    print(f"{args.actions} clicks every {args.interval_ms} ms, asusctl {args.latency * 1000:.0f} ms "
+          f"with {args.failure_rate:.0%} failures")
+
+    tmpdir = tempfile.mkdtemp(prefix="asusctrl-bench-")
+    log_path = install_scripted_asusctl(tmpdir, args.latency, args.failure_rate)
+    open(log_path, "w").close()
+    # Read when the GUI modules are imported: the CLI backend, a throwaway
+    # snapshot file, and latency tracing
+    os.environ["ASUSCTRL_BACKEND"] = "asusctl"
+    os.environ["ASUSCTRL_SNAPSHOTS"] = os.path.join(tmpdir, "snapshots.json")
+    os.environ["ASUSCTRL_TRACE"] = os.path.join(tmpdir, "latency.json")
+    server = start_display()
+    try:
+        result = run(args, SourceTracker(), log_path)
+    finally:
+        server.terminate()
+
+    print()
+    ok = report(args, result)
+    print("=" * 50)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Asynchronous asusctl command execution for the AsusCtrl GUI
+Commands run through Gio.Subprocess so the GTK main loop never waits on them
+"""
+
+from collections import deque
+
+import gi
+gi.require_version('Gio', '2.0')
+from gi.repository import Gio, GLib
+
+
+class CommandRunner:
+    """Run jobs asynchronously, one at a time per category
+
+    Jobs in the same category (profile, brightness, battery, aura) are
+    queued and run in click order so they cannot race each other; jobs in
+    different categories run concurrently. A job is either an asusctl
+    command line (run) or any asynchronous start(done) function (submit).
+    """
+
+    def __init__(self):
+        self.queues = {}
+        self.running = set()
+
+    def run(self, category, cmd, callback):
+        """Queue cmd in category; callback(cmd, success, output) runs when it exits"""
+        self.submit(
+            category,
+            lambda done: self._spawn(cmd, done),
+            lambda success, output: callback(cmd, success, output)
+        )
+
+    def submit(self, category, start, callback):
+        """Queue start(done) in category and start it if the category is idle
+
+        start must begin the work without blocking and arrange for
+        done(success, output) to be called on the main loop when it ends.
+        """
+        self.queues.setdefault(category, deque()).append((start, callback))
+        if category not in self.running:
+            self._start_next(category)
+
+    def pending(self, category=None):
+        """Number of queued or running jobs"""
+        categories = [category] if category else list(self.queues)
+        return sum(len(self.queues.get(c, ())) + (c in self.running) for c in categories)
+
+    def _start_next(self, category):
+        queue = self.queues.get(category)
+        if not queue:
+            self.running.discard(category)
+            return
+        start, callback = queue.popleft()
+        self.running.add(category)
+        finished = []
+
+        def done(success, output):
+            if finished:
+                return
+            finished.append(True)
+            # Start the next job first so pending() is accurate in callback
+            self._start_next(category)
+            callback(success, output)
+
+        start(done)
+
+    def _spawn(self, cmd, done):
+        try:
+            proc = Gio.Subprocess.new(
+                cmd,
+                Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_PIPE
+            )
+        except GLib.Error as e:
+            # Spawn failed (e.g. asusctl not installed); report on the next iteration
+            message = e.message
+            GLib.idle_add(lambda: done(False, message) or GLib.SOURCE_REMOVE)
+            return
+        proc.communicate_utf8_async(None, None, self._on_communicate, done)
+
+    def _on_communicate(self, proc, result, done):
+        try:
+            _, stdout, stderr = proc.communicate_utf8_finish(result)
+            success = proc.get_successful()
+            output = stdout if success else stderr
+        except GLib.Error as e:
+            success, output = False, e.message
+        done(success, (output or "").strip())
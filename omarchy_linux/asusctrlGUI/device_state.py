@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Cached device state for the AsusCtrl GUI
+Filled once at startup, then kept current from asusd PropertiesChanged
+signals and sysfs change notifications; sysfs attributes that never notify
+are re-read at a low rate, and only when asusd is not in use
+"""
+
+import glob
+import os
+import time
+
+import gi
+gi.require_version('Gio', '2.0')
+from gi.repository import GLib
+
+from asusd_backend import AURA_MODE_STATIC, AsusdBackend, PROFILES, BRIGHTNESS_LEVELS
+
+# sysfs attributes, relative to the sysfs root
+PLATFORM_PROFILE = "firmware/acpi/platform_profile"
+KBD_BRIGHTNESS = "class/leds/asus::kbd_backlight/brightness"
+KBD_BRIGHTNESS_HW_CHANGED = "class/leds/asus::kbd_backlight/brightness_hw_changed"
+CHARGE_LIMIT_GLOB = "class/power_supply/BAT*/charge_control_end_threshold"
+# Seconds between re-reads of attributes the kernel does not notify on
+REREAD_SECONDS = 30
+
+AURA_MODE_NAMES = {
+    0: "Static", 1: "Breathe", 2: "Rainbow Cycle", 3: "Rainbow Wave",
+    4: "Star", 5: "Rain", 6: "Highlight", 7: "Laser", 8: "Ripple",
+    10: "Pulse", 11: "Comet", 12: "Flash",
+}
+
+PROFILE_NAMES = {value: name for name, value in PROFILES.items()}
+# platform_profile spells these differently than asusctl
+SYSFS_PROFILES = {"low-power": "quiet", "quiet": "quiet",
+                  "balanced": "balanced", "performance": "performance"}
+
+
+class DeviceState:
+    """Last known profile, brightness, charge limit, aura mode and color
+
+    Values are None until known. Listeners are called as
+    listener(field, value) whenever a field actually changes.
+    """
+
+    FIELDS = ("profile", "brightness", "charge_limit", "aura_mode", "rgb")
+
+    def __init__(self):
+        self.values = dict.fromkeys(self.FIELDS)
+        self.listeners = []
+
+    def get(self, field):
+        return self.values[field]
+
+    def matches(self, field, value):
+        """True if value is known to already be applied"""
+        return value is not None and self.values[field] == value
+
+    def update(self, field, value):
+        """Store value and notify listeners if it changed"""
+        if value is None or self.values[field] == value:
+            return False
+        self.values[field] = value
+        for listener in self.listeners:
+            listener(field, value)
+        return True
+
+    def connect(self, listener):
+        self.listeners.append(listener)
+
+
+class StateSync:
+    """Fill a DeviceState once and keep it current without polling
+
+    With the asusd backend, values come from the proxies' cached properties
+    and their g-properties-changed signal. sysfs attributes are read once as
+    a fallback. platform_profile and brightness_hw_changed are watched with
+    POLLPRI for the kernel's sysfs_notify, which they emit on change. The
+    kbd_backlight brightness and charge_control_end_threshold never notify,
+    so with asusd only its signals keep them current; without asusd they
+    are re-read every REREAD_SECONDS.
+    """
+
+    def __init__(self, state, backend, sysfs_root="/sys"):
+        self.state = state
+        self.backend = backend
+        self.sysfs_root = sysfs_root
+        self.watches = []
+        self.timer = None
+        self.load_time = None
+
+    def start(self):
+        """Read the current state and subscribe to changes; returns seconds taken"""
+        start = time.perf_counter()
+        if isinstance(self.backend, AsusdBackend):
+            self._sync_dbus()
+        self._sync_sysfs()
+        self.load_time = time.perf_counter() - start
+        return self.load_time
+
+    def stop(self):
+        for source_id, fd in self.watches:
+            GLib.source_remove(source_id)
+            os.close(fd)
+        self.watches = []
+        if self.timer is not None:
+            GLib.source_remove(self.timer)
+            self.timer = None
+
+    def _sync_dbus(self):
+        for proxy in (self.backend.platform, self.backend.aura):
+            if proxy is None:
+                continue
+            for name in proxy.get_cached_property_names():
+                self._apply_property(name, proxy.get_cached_property(name).unpack())
+            proxy.connect("g-properties-changed", self._on_properties_changed)
+
+    def _on_properties_changed(self, proxy, changed, invalidated):
+        for name, value in changed.unpack().items():
+            self._apply_property(name, value)
+
+    def _apply_property(self, name, value):
+        if name == "PlatformProfile":
+            self.state.update("profile", PROFILE_NAMES.get(value))
+        elif name == "Brightness" and 0 <= value < len(BRIGHTNESS_LEVELS):
+            self.state.update("brightness", BRIGHTNESS_LEVELS[value])
+        elif name == "ChargeControlEndThreshold":
+            self.state.update("charge_limit", value)
+        elif name == "LedMode":
+            self.state.update("aura_mode", value)
+        elif name == "LedModeData" and value[0] == AURA_MODE_STATIC:
+            self.state.update("rgb", tuple(value[2]))
+
+    def _sync_sysfs(self):
+        self._watch(PLATFORM_PROFILE, "profile", lambda text: SYSFS_PROFILES.get(text))
+        brightness = lambda text: BRIGHTNESS_LEVELS[int(text)] if text.isdigit() and int(text) < 4 else None
+        self._watch(KBD_BRIGHTNESS_HW_CHANGED, "brightness", brightness)
+        quiet = [(KBD_BRIGHTNESS, "brightness", brightness)]
+        for path in sorted(glob.glob(os.path.join(self.sysfs_root, CHARGE_LIMIT_GLOB)))[:1]:
+            quiet.append((os.path.relpath(path, self.sysfs_root), "charge_limit",
+                          lambda text: int(text) if text.isdigit() else None))
+        self._reread(quiet)
+        if not isinstance(self.backend, AsusdBackend):
+            self.timer = GLib.timeout_add_seconds(REREAD_SECONDS, self._reread, quiet)
+
+    def _store(self, field, parse, text):
+        # asusd is the authority when present; sysfs only fills gaps
+        if text is not None and (self.state.get(field) is None or not isinstance(self.backend, AsusdBackend)):
+            self.state.update(field, parse(text))
+
+    def _reread(self, attributes):
+        """Read each (attribute, field, parse) into its field"""
+        for attribute, field, parse in attributes:
+            try:
+                with open(os.path.join(self.sysfs_root, attribute)) as f:
+                    text = f.read(64).strip()
+            except OSError:
+                continue
+            self._store(field, parse, text)
+        return GLib.SOURCE_CONTINUE
+
+    def _watch(self, attribute, field, parse):
+        """Read attribute into field, then re-read it whenever sysfs notifies"""
+        try:
+            fd = os.open(os.path.join(self.sysfs_root, attribute), os.O_RDONLY)
+        except OSError:
+            return
+
+        def read():
+            try:
+                os.lseek(fd, 0, os.SEEK_SET)
+                text = os.read(fd, 64).decode().strip()
+            except OSError:
+                return
+            self._store(field, parse, text)
+
+        def on_notify(fd_, condition):
+            read()
+            return GLib.SOURCE_CONTINUE
+
+        read()
+        source_id = GLib.unix_fd_add_full(
+            GLib.PRIORITY_DEFAULT, fd, GLib.IOCondition.PRI | GLib.IOCondition.ERR, on_notify
+        )
+        self.watches.append((source_id, fd))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Stand-in for asusd on the session bus
+Exports the Platform and Aura properties used by AsusdBackend so the GUI
+and benchmarks can run without ROG hardware:
+
+    dbus-run-session -- python fake_asusd.py
+"""
+
+import argparse
+import time
+
+import gi
+gi.require_version('Gio', '2.0')
+from gi.repository import Gio, GLib
+
+from asusd_backend import ASUSD_BUS_NAME, PLATFORM_INTERFACE, AURA_INTERFACE
+
+PLATFORM_PATH = "/xyz/ljones"
+AURA_PATH = "/xyz/ljones/aura/fake"
+
+INTROSPECTION = f"""
+<node>
+  <interface name="org.freedesktop.DBus.ObjectManager">
+    <method name="GetManagedObjects">
+      <arg type="a{{oa{{sa{{sv}}}}}}" direction="out"/>
+    </method>
+  </interface>
+  <interface name="{PLATFORM_INTERFACE}">
+    <property name="PlatformProfile" type="u" access="readwrite"/>
+    <property name="ChargeControlEndThreshold" type="y" access="readwrite"/>
+    <method name="OneShotFullCharge"/>
+  </interface>
+  <interface name="{AURA_INTERFACE}">
+    <property name="Brightness" type="u" access="readwrite"/>
+    <property name="LedMode" type="u" access="readwrite"/>
+    <property name="LedModeData" type="(uu(yyy)(yyy)ss)" access="readwrite"/>
+    <property name="SupportedBasicModes" type="au" access="read"/>
+  </interface>
+</node>
+"""
+
+
+class FakeAsusd:
+    """Serve asusd-like properties from memory, optionally with a delay
+
+    Setting a property named in reject fails, as asusd does for a value
+    the hardware does not accept.
+    """
+
+    def __init__(self, connection, delay=0.0, reject=()):
+        self.connection = connection
+        self.delay = delay
+        self.reject = set(reject)
+        self.properties = {
+            (PLATFORM_PATH, PLATFORM_INTERFACE): {
+                "PlatformProfile": GLib.Variant("u", 0),
+                "ChargeControlEndThreshold": GLib.Variant("y", 80),
+            },
+            (AURA_PATH, AURA_INTERFACE): {
+                "Brightness": GLib.Variant("u", 2),
+                "LedMode": GLib.Variant("u", 0),
+                "LedModeData": GLib.Variant("(uu(yyy)(yyy)ss)",
+                                            (0, 0, (255, 255, 255), (0, 0, 0), "Med", "Right")),
+                "SupportedBasicModes": GLib.Variant("au", [0, 1, 2, 10]),
+            },
+        }
+        node = Gio.DBusNodeInfo.new_for_xml(INTROSPECTION)
+        interfaces = {info.name: info for info in node.interfaces}
+        connection.register_object(
+            "/", interfaces["org.freedesktop.DBus.ObjectManager"],
+            self.on_method_call, None, None
+        )
+        for path, interface in self.properties:
+            connection.register_object(
+                path, interfaces[interface],
+                self.on_method_call, self.on_get_property, self.on_set_property
+            )
+
+    def on_method_call(self, connection, sender, path, interface, method, params, invocation):
+        if self.delay:
+            time.sleep(self.delay)
+        if method == "GetManagedObjects":
+            objects = {}
+            for (obj_path, obj_interface), props in self.properties.items():
+                objects.setdefault(obj_path, {})[obj_interface] = props
+            invocation.return_value(GLib.Variant("(a{oa{sa{sv}}})", (objects,)))
+        elif method == "OneShotFullCharge":
+            invocation.return_value(None)
+        else:
+            invocation.return_dbus_error("org.freedesktop.DBus.Error.UnknownMethod", method)
+
+    def on_get_property(self, connection, sender, path, interface, name):
+        return self.properties[(path, interface)][name]
+
+    def on_set_property(self, connection, sender, path, interface, name, value):
+        if self.delay:
+            time.sleep(self.delay)
+        if name in self.reject:
+            return False
+        self.properties[(path, interface)][name] = value
+        connection.emit_signal(
+            None, path, "org.freedesktop.DBus.Properties", "PropertiesChanged",
+            GLib.Variant("(sa{sv}as)", (interface, {name: value}, []))
+        )
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="seconds to sleep in every call, to simulate a slow asusd")
+    parser.add_argument("--reject", action="append", default=[], metavar="PROPERTY",
+                        help="fail every Set of this property")
+    parser.add_argument("--name", default=ASUSD_BUS_NAME, help=f"bus name to own (default {ASUSD_BUS_NAME})")
+    args = parser.parse_args()
+
+    loop = GLib.MainLoop()
+    connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    FakeAsusd(connection, args.delay, args.reject)
+    Gio.bus_own_name_on_connection(
+        connection, args.name, Gio.BusNameOwnerFlags.NONE,
+        lambda *a: print(f"fake asusd running as {args.name}", flush=True),
+        lambda *a: loop.quit()
+    )
+    loop.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Coalesce rapid Next/Previous clicks for the AsusCtrl GUI
+A burst of clicks becomes one absolute target that is sent once the clicks
+pause, while the widgets follow every click right away
+"""
+
+from gi.repository import GLib
+
+# Quiet time after the last click before the target is sent
+DEBOUNCE_MS = 250
+
+
+class StepCoalescer:
+    """Turn next/previous steps on one state field into absolute sets
+
+    Each step moves an optimistic target one place through values() from the
+    previous target (or the known state) and writes it to the state, so the
+    UI updates at once. When no step has come for delay_ms, apply(target,
+    callback) is called. Steps that arrive while that call runs are sent as
+    one more call after it finishes, so a burst costs at most two backend
+    calls. A failed call puts the last confirmed value back.
+
+    If values() is None or the current value is unknown there is nothing to
+    compute a target from; steps are then summed, so opposite clicks cancel,
+    and the net count is passed to step(direction, callback) one at a time.
+    """
+
+    def __init__(self, state, field, values, apply, step, on_finished, delay_ms=DEBOUNCE_MS):
+        self.state = state
+        self.field = field
+        self.values = values
+        self.apply = apply
+        self.step_fallback = step
+        self.on_finished = on_finished
+        self.delay_ms = delay_ms
+        self.timer = None
+        self.target = None
+        self.confirmed = None
+        self.net_steps = 0
+        self.in_flight = False
+        self.dirty = False
+        self.calls = 0
+
+    def step(self, step):
+        values = self.values()
+        current = self.target if self.target is not None else self.state.get(self.field)
+        if not values or current not in values:
+            self.net_steps += step
+        else:
+            if self.target is None:
+                self.confirmed = current
+            self.target = values[(values.index(current) + step) % len(values)]
+            self.state.update(self.field, self.target)
+        self._schedule()
+
+    def _schedule(self):
+        if self.timer is not None:
+            GLib.source_remove(self.timer)
+        self.timer = GLib.timeout_add(self.delay_ms, self._on_timeout)
+
+    def _on_timeout(self):
+        self.timer = None
+        if self.net_steps:
+            steps, self.net_steps = self.net_steps, 0
+            direction = 1 if steps > 0 else -1
+            for _ in range(abs(steps)):
+                self.calls += 1
+                self.step_fallback(direction, self.on_finished)
+        if self.target is not None:
+            if self.in_flight:
+                self.dirty = True
+            else:
+                self._send()
+        return GLib.SOURCE_REMOVE
+
+    def _send(self):
+        target = self.target
+        self.in_flight = True
+        self.calls += 1
+
+        def finished(action, success, output):
+            self.in_flight = False
+            if success:
+                self.confirmed = target
+            elif self.target == target:
+                # Nothing newer is pending: show what the device really has
+                self.state.update(self.field, self.confirmed)
+                self.target = None
+                self.dirty = False
+            if self.dirty and self.target is not None and self.target != target:
+                self.dirty = False
+                self._send()
+            elif self.timer is None and self.target == target:
+                self.dirty = False
+                self.target = None
+            self.on_finished(action, success, output)
+
+        self.apply(target, finished)
+
+    def cancel(self):
+        if self.timer is not None:
+            GLib.source_remove(self.timer)
+            self.timer = None
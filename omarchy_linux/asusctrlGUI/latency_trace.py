@@ -0,0 +1 @@
+../../common/latency_trace.py
\ No newline at end of file
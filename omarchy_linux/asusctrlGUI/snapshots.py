@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Named settings snapshots for the AsusCtrl GUI
+A snapshot holds a profile, keyboard brightness, charge limit, aura mode and
+static color. Snapshots are kept in one small JSON file that is replaced
+atomically on every write, so a crash never leaves it half written.
+Applying a snapshot sends only the values the device is not already showing,
+all at once.
+"""
+
+import json
+import os
+import tempfile
+
+from asusd_backend import AURA_MODE_STATIC
+
+SNAPSHOT_PATH = os.environ.get("ASUSCTRL_SNAPSHOTS", os.path.join(
+    os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config")), "asusctrl-gui", "snapshots.json"))
+FORMAT_VERSION = 1
+# Snapshot the GUI keeps current as settings are applied, and restores at startup
+LAST_SESSION = "Last session"
+
+FIELDS = ("profile", "brightness", "charge_limit", "aura_mode", "rgb")
+# Backend setter for each field that maps onto one call
+SETTERS = {"profile": "set_profile", "brightness": "set_kbd_brightness", "charge_limit": "set_charge_limit"}
+
+
+def encode_snapshot(snapshot):
+    """Positional list, with the color as hex, to keep the file small"""
+    rgb = snapshot.get("rgb")
+    values = [snapshot.get(field) for field in FIELDS[:-1]]
+    return values + ["%02x%02x%02x" % tuple(rgb) if rgb else None]
+
+
+def decode_snapshot(values):
+    *values, rgb = values
+    snapshot = dict(zip(FIELDS, values))
+    snapshot["rgb"] = tuple(bytes.fromhex(rgb)) if rgb else None
+    return snapshot
+
+
+def atomic_write(path, data):
+    """Write data to a temporary file next to path, then rename it over path"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".snapshots-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except OSError:
+        os.unlink(tmp)
+        raise
+    # Make the rename itself durable
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class SnapshotStore:
+    """Snapshots by name, loaded once and written back only when they change
+
+    A snapshot is a dict with the keys in FIELDS; None means "leave as is".
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self.snapshots = {}
+        self.writes = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = json.load(f)
+            self.snapshots = {name: decode_snapshot(values) for name, values in data["s"].items()}
+        except FileNotFoundError:
+            self.snapshots = {}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable snapshots in {self.path}: {e}")
+            self.snapshots = {}
+
+    def write(self):
+        data = {"v": FORMAT_VERSION, "s": {name: encode_snapshot(s) for name, s in self.snapshots.items()}}
+        try:
+            atomic_write(self.path, json.dumps(data, separators=(",", ":")).encode())
+        except OSError as e:
+            print(f"Could not save snapshots to {self.path}: {e}")
+            return False
+        self.writes += 1
+        return True
+
+    def names(self):
+        """Saved snapshot names, the last session first"""
+        return sorted(self.snapshots, key=lambda name: (name != LAST_SESSION, name.lower()))
+
+    def get(self, name):
+        return self.snapshots.get(name)
+
+    def save(self, name, snapshot):
+        """Store snapshot under name; the file is only rewritten if it changed"""
+        snapshot = {field: snapshot.get(field) for field in FIELDS}
+        if self.snapshots.get(name) == snapshot:
+            return False
+        self.snapshots[name] = snapshot
+        return self.write()
+
+    def delete(self, name):
+        if self.snapshots.pop(name, None) is None:
+            return False
+        return self.write()
+
+    def remember(self, field, value):
+        """Record an applied value in the last session snapshot, without writing
+
+        Returns True if it changed, i.e. the store needs a write().
+        """
+        snapshot = self.snapshots.setdefault(LAST_SESSION, dict.fromkeys(FIELDS))
+        if snapshot[field] == value:
+            return False
+        snapshot[field] = value
+        return True
+
+
+def capture(state):
+    """Snapshot of a DeviceState's current values"""
+    return {field: state.get(field) for field in FIELDS}
+
+
+def plan(snapshot, state, backend):
+    """The (field, value, setter, args) calls that bring the device to snapshot
+
+    Values the device already shows are left out. A static color also sets
+    the aura mode; other modes need a backend that can set a mode directly.
+    """
+    calls = []
+    for field, setter in SETTERS.items():
+        value = snapshot.get(field)
+        if value is not None and not state.matches(field, value):
+            calls.append((field, value, setter, (value,)))
+    mode, rgb = snapshot.get("aura_mode"), snapshot.get("rgb")
+    if rgb is not None and mode in (None, AURA_MODE_STATIC):
+        if not (state.matches("aura_mode", AURA_MODE_STATIC) and state.matches("rgb", tuple(rgb))):
+            calls.append(("rgb", tuple(rgb), "set_aura_static", tuple(rgb)))
+    elif mode is not None and not state.matches("aura_mode", mode) and backend.aura_modes():
+        calls.append(("aura_mode", mode, "set_aura_mode", (mode,)))
+    return calls
+
+
+def apply_snapshot(backend, snapshot, state, on_done, run=None):
+    """Send every call of plan() at once; on_done(results) runs when all finished
+
+    The calls go to different categories of the backend's CommandRunner, so
+    they run concurrently instead of one after another. run(source, method,
+    *args, callback) may wrap each call, e.g. for tracing. Returns the
+    number of calls sent; with nothing to change, on_done([]) runs at once.
+    """
+    calls = plan(snapshot, state, backend)
+    run = run or (lambda source, method, *args: method(*args))
+    results = []
+    if not calls:
+        on_done(results)
+        return 0
+
+    def finished(field, value):
+        def callback(action, success, output):
+            if success:
+                if field == "rgb":
+                    state.update("aura_mode", AURA_MODE_STATIC)
+                state.update(field, value)
+            results.append((action, success, output))
+            if len(results) == len(calls):
+                on_done(results)
+        return callback
+
+    for field, value, setter, args in calls:
+        run(field, getattr(backend, setter), *args, finished(field, value))
+    return len(calls)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Test harness for the asusd D-Bus backend
+Starts a private session bus with fake_asusd.py on it, then checks that
+property sets reach asusd, that a rejected call falls back to the fake
+asusctl, that create_backend follows ASUSCTRL_BACKEND and ASUSCTRL_BUS,
+and that the asynchronous lookup keeps the main loop running while a slow
+asusd answers
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from gi.repository import Gio, GLib
+
+from asusd_backend import (ASUSD_BUS_NAME, PLATFORM_INTERFACE, AsusctlBackend,
+                           AsusdBackend, create_backend, create_backend_async)
+from command_runner import CommandRunner
+from fake_asusd import PLATFORM_PATH
+from test_command_runner import install_fake_asusctl, read_calls
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SLOW_BUS_NAME = ASUSD_BUS_NAME + ".Slow"
+SLOW_DELAY = 0.3
+
+
+def start_session_bus():
+    """Start a private dbus-daemon and make it the session bus"""
+    bus = subprocess.Popen(
+        ["dbus-daemon", "--session", "--nofork", "--print-address"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    os.environ["DBUS_SESSION_BUS_ADDRESS"] = bus.stdout.readline().strip()
+    return bus
+
+
+def start_fake_asusd(*args):
+    daemon = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fake_asusd.py")] + list(args),
+        stdout=subprocess.PIPE, text=True
+    )
+    daemon.stdout.readline()
+    return daemon
+
+
+def run_actions(backend, actions):
+    """Run (method, args) actions one after another; return (action, success) per action"""
+    loop = GLib.MainLoop()
+    results = []
+    queue = list(actions)
+
+    def next_action():
+        if not queue:
+            loop.quit()
+            return GLib.SOURCE_REMOVE
+        method, args = queue.pop(0)
+
+        def finished(action, success, output):
+            results.append((action, success))
+            GLib.idle_add(next_action)
+
+        getattr(backend, method)(*args, finished)
+        return GLib.SOURCE_REMOVE
+
+    GLib.idle_add(next_action)
+    GLib.timeout_add_seconds(10, loop.quit)
+    loop.run()
+    return results
+
+
+def read_property(name):
+    connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    reply = connection.call_sync(
+        ASUSD_BUS_NAME, PLATFORM_PATH, "org.freedesktop.DBus.Properties", "Get",
+        GLib.Variant("(ss)", (PLATFORM_INTERFACE, name)), None,
+        Gio.DBusCallFlags.NONE, 1000, None
+    )
+    return reply.unpack()[0]
+
+
+def settle(seconds=0.1):
+    """Run the main loop briefly so PropertiesChanged signals arrive"""
+    loop = GLib.MainLoop()
+    GLib.timeout_add(int(seconds * 1000), loop.quit)
+    loop.run()
+
+
+def test_set_reaches_asusd():
+    """Sets go to asusd, and the cached values follow its signals"""
+    print("\nSetting properties through asusd...")
+    os.environ["ASUSCTRL_BUS"] = "session"
+    backend = create_backend(CommandRunner(), "dbus")
+    del os.environ["ASUSCTRL_BUS"]
+    results = run_actions(backend, [
+        ("set_profile", ("quiet",)),
+        ("set_charge_limit", (70,)),
+        ("step_kbd_brightness", (1,)),
+        ("set_aura_mode", (10,)),
+    ])
+    settle()
+    profile = read_property("PlatformProfile")
+    limit = read_property("ChargeControlEndThreshold")
+    brightness = backend.get_property(backend.aura, "Brightness")
+    mode = backend.get_property(backend.aura, "LedMode")
+    print(f"  {results}")
+    ok = (isinstance(backend, AsusdBackend) and all(success for _, success in results)
+          and profile == 2 and limit == 70 and brightness == 3 and mode == 10)
+    print("  PASS" if ok else f"  FAIL: profile={profile} limit={limit} brightness={brightness} mode={mode}")
+    return ok
+
+
+def test_rejected_falls_back(log_path):
+    """A set that asusd rejects is retried with asusctl"""
+    print("\nRejected call falls back to asusctl...")
+    daemon = start_fake_asusd("--name", ASUSD_BUS_NAME + ".Rejecting",
+                              "--reject", "ChargeControlEndThreshold")
+    try:
+        runner = CommandRunner()
+        backend = AsusdBackend(runner, Gio.bus_get_sync(Gio.BusType.SESSION, None),
+                               ASUSD_BUS_NAME + ".Rejecting", AsusctlBackend(runner))
+        results = run_actions(backend, [("set_charge_limit", (60,)), ("set_profile", ("performance",))])
+    finally:
+        daemon.terminate()
+        daemon.wait()
+    calls = [args for _, _, args in read_calls(log_path)]
+    print(f"  {results}, asusctl calls: {calls}")
+    ok = results == [("-c 60", True), ("profile -P performance", True)] and calls == ["-c 60"]
+    print("  PASS" if ok else "  FAIL")
+    return ok
+
+
+def test_backend_choice():
+    """create_backend follows ASUSCTRL_BACKEND and ASUSCTRL_BUS"""
+    print("\nChoosing a backend...")
+    runner = CommandRunner()
+    chosen = {}
+    for backend_env, bus_env in (("asusctl", "session"), ("dbus", "session"), ("dbus", "system")):
+        os.environ["ASUSCTRL_BACKEND"] = backend_env
+        os.environ["ASUSCTRL_BUS"] = bus_env
+        chosen[(backend_env, bus_env)] = type(create_backend(runner)).__name__
+    del os.environ["ASUSCTRL_BACKEND"]
+    del os.environ["ASUSCTRL_BUS"]
+    print(f"  {chosen}")
+    # No asusd on the system bus here, so that falls back to asusctl
+    ok = chosen == {
+        ("asusctl", "session"): "AsusctlBackend",
+        ("dbus", "session"): "AsusdBackend",
+        ("dbus", "system"): "AsusctlBackend",
+    }
+    print("  PASS" if ok else "  FAIL")
+    return ok
+
+
+def test_async_lookup():
+    """The asynchronous lookup keeps the main loop running against a slow asusd"""
+    print("\nAsynchronous lookup of a slow asusd...")
+    daemon = start_fake_asusd("--name", SLOW_BUS_NAME, "--delay", str(SLOW_DELAY))
+    os.environ["ASUSCTRL_BUS"] = "session"
+    try:
+        loop = GLib.MainLoop()
+        backends = []
+        gaps = []
+        last_tick = [time.monotonic()]
+
+        def tick():
+            now = time.monotonic()
+            gaps.append(now - last_tick[0])
+            last_tick[0] = now
+            return GLib.SOURCE_CONTINUE
+
+        def ready(backend):
+            backends.append(backend)
+            loop.quit()
+
+        start = time.monotonic()
+        tick_id = GLib.timeout_add(5, tick)
+        create_backend_async(CommandRunner(), ready, "dbus", SLOW_BUS_NAME)
+        GLib.timeout_add_seconds(10, loop.quit)
+        loop.run()
+        GLib.source_remove(tick_id)
+        elapsed = time.monotonic() - start
+    finally:
+        del os.environ["ASUSCTRL_BUS"]
+        daemon.terminate()
+        daemon.wait()
+    backend = backends[0] if backends else None
+    stall = max(gaps) * 1000 if gaps else float("inf")
+    print(f"  ready in {elapsed * 1000:.0f} ms, longest main loop gap {stall:.1f} ms")
+    ok = (isinstance(backend, AsusdBackend) and backend.aura is not None
+          and backend.get_property(backend.platform, "ChargeControlEndThreshold") == 80
+          and elapsed >= SLOW_DELAY and stall < 100)
+    print("  PASS" if ok else f"  FAIL: {backend}")
+    return ok
+
+
+def main():
+    print("AsusCtrl asusd Backend Test")
+    print("=" * 50)
+
+    tmpdir = tempfile.mkdtemp(prefix="asusd-backend-")
+    log_path = install_fake_asusctl(tmpdir, delay=0.0)
+    bus = start_session_bus()
+    daemon = start_fake_asusd()
+    try:
+        results = [
+            test_set_reaches_asusd(),
+            test_rejected_falls_back(log_path),
+            test_backend_choice(),
+            test_async_lookup(),
+        ]
+    finally:
+        daemon.terminate()
+        bus.terminate()
+
+    print()
+    if all(results):
+        print("All asusd backend tests passed")
+    else:
+        print("Some asusd backend tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test harness for the asynchronous asusctl runner
+Puts a fake asusctl with artificial delays on PATH and checks that the
+GLib main loop never stalls for longer than one frame
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from gi.repository import GLib
+
+from command_runner import CommandRunner
+
+FRAME = 1.0 / 60
+
+FAKE_ASUSCTL = """#!/bin/sh
+start=$(date +%s.%N)
+sleep "${FAKE_ASUSCTL_DELAY:-0.2}"
+echo "$start $(date +%s.%N) $*" >> "$FAKE_ASUSCTL_LOG"
+if [ "$1" = "fail" ]; then
+    echo "fake failure" >&2
+    exit 1
+fi
+echo "ok"
+"""
+
+
+def install_fake_asusctl(tmpdir, delay):
+    """Write the fake asusctl and put it first on PATH"""
+    path = os.path.join(tmpdir, "asusctl")
+    with open(path, "w") as f:
+        f.write(FAKE_ASUSCTL)
+    os.chmod(path, 0o755)
+    os.environ["PATH"] = tmpdir + os.pathsep + os.environ["PATH"]
+    os.environ["FAKE_ASUSCTL_DELAY"] = str(delay)
+    os.environ["FAKE_ASUSCTL_LOG"] = os.path.join(tmpdir, "calls.log")
+    return os.environ["FAKE_ASUSCTL_LOG"]
+
+
+def read_calls(log_path):
+    """Return (start, end, args) for each fake asusctl run"""
+    calls = []
+    with open(log_path) as f:
+        for line in f:
+            start, end, args = line.rstrip("\n").split(" ", 2)
+            calls.append((float(start), float(end), args))
+    return calls
+
+
+def main():
+    print("AsusCtrl Async Runner Test")
+    print("=" * 50)
+
+    tmpdir = tempfile.mkdtemp(prefix="fake-asusctl-")
+    log_path = install_fake_asusctl(tmpdir, delay=0.2)
+
+    loop = GLib.MainLoop()
+    runner = CommandRunner()
+    results = []
+    gaps = []
+    last_tick = [time.monotonic()]
+
+    def tick():
+        now = time.monotonic()
+        gaps.append(now - last_tick[0])
+        last_tick[0] = now
+        return GLib.SOURCE_CONTINUE
+
+    def on_done(cmd, success, output):
+        results.append((cmd, success, output))
+        if runner.pending() == 0:
+            loop.quit()
+
+    def click_everything():
+        # Rapid clicks across categories, as a user hammering buttons would
+        for profile in ("quiet", "balanced", "performance"):
+            runner.run("profile", ["asusctl", "profile", "-P", profile], on_done)
+        for _ in range(3):
+            runner.run("aura", ["asusctl", "aura", "-n"], on_done)
+        runner.run("battery", ["asusctl", "-c", "80"], on_done)
+        runner.run("battery", ["asusctl", "fail"], on_done)
+        runner.run("brightness", ["does-not-exist-asusctl"], on_done)
+        return GLib.SOURCE_REMOVE
+
+    GLib.timeout_add(1, tick)
+    GLib.idle_add(click_everything)
+    GLib.timeout_add_seconds(10, loop.quit)
+    start = time.monotonic()
+    loop.run()
+    elapsed = time.monotonic() - start
+
+    calls = read_calls(log_path)
+    ok = True
+
+    max_gap = max(gaps)
+    print(f"\nCommands finished: {len(results)} in {elapsed:.2f}s")
+    print(f"Main loop ticks: {len(gaps)}, longest stall {max_gap * 1000:.1f} ms")
+    if max_gap > FRAME:
+        print(f"  FAIL: main loop stalled longer than one frame ({FRAME * 1000:.1f} ms)")
+        ok = False
+    if len(results) != 9:
+        print("  FAIL: not every command reported back")
+        ok = False
+
+    # Same category must never overlap; different categories should
+    by_category = {}
+    for start_t, end_t, args in calls:
+        category = "profile" if args.startswith("profile") else \
+            "aura" if args.startswith("aura") else "battery"
+        by_category.setdefault(category, []).append((start_t, end_t, args))
+    for category, runs in by_category.items():
+        runs.sort()
+        overlaps = [a for a, b in zip(runs, runs[1:]) if b[0] < a[1]]
+        print(f"  {category}: {len(runs)} runs, {'serialized' if not overlaps else 'OVERLAPPING'}")
+        if overlaps:
+            ok = False
+    profile_order = [args for _, _, args in sorted(by_category.get("profile", []))]
+    if profile_order != ["profile -P quiet", "profile -P balanced", "profile -P performance"]:
+        print("  FAIL: profile commands ran out of click order")
+        ok = False
+    serial_time = 0.2 * len(calls)
+    if elapsed >= serial_time:
+        print("  FAIL: categories did not run concurrently")
+        ok = False
+
+    failures = [cmd for cmd, success, _ in results if not success]
+    print(f"  Failed commands reported: {len(failures)}")
+    if len(failures) != 2:
+        ok = False
+
+    print("\n" + "=" * 50)
+    if ok:
+        print("All runner tests passed")
+    else:
+        print("Some runner tests FAILED")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Test harness for the cached device state
+Fills a DeviceState from a fake sysfs tree and from fake_asusd.py on a
+private session bus, and checks which attributes are watched, which are
+re-read, and which source wins
+"""
+
+import os
+import sys
+import tempfile
+
+from gi.repository import Gio, GLib
+
+import device_state
+from asusd_backend import AsusctlBackend, AsusdBackend
+from command_runner import CommandRunner
+from device_state import (CHARGE_LIMIT_GLOB, KBD_BRIGHTNESS, KBD_BRIGHTNESS_HW_CHANGED,
+                          PLATFORM_PROFILE, DeviceState, StateSync)
+from test_asusd_backend import run_actions, settle, start_fake_asusd, start_session_bus
+
+# Seconds between re-reads while testing, instead of REREAD_SECONDS
+REREAD_TEST_SECONDS = 1
+CHARGE_LIMIT = CHARGE_LIMIT_GLOB.replace("BAT*", "BAT0")
+
+
+def fake_sysfs(profile="low-power", brightness="1", charge_limit="60"):
+    """Write the attributes StateSync reads into a temporary sysfs root"""
+    root = tempfile.mkdtemp(prefix="sysfs-")
+    for attribute, text in ((PLATFORM_PROFILE, profile), (KBD_BRIGHTNESS, brightness),
+                            (KBD_BRIGHTNESS_HW_CHANGED, brightness), (CHARGE_LIMIT, charge_limit)):
+        write(root, attribute, text)
+    return root
+
+
+def write(root, attribute, text):
+    path = os.path.join(root, attribute)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text + "\n")
+
+
+class WatchRecorder:
+    """Record the fd watches StateSync adds, so a test can deliver the
+    POLLPRI wakeup that sysfs_notify would (regular files never raise it)"""
+
+    def __init__(self):
+        self.watches = {}
+        self.original = GLib.unix_fd_add_full
+
+    def __enter__(self):
+        def add(priority, fd, condition, callback, *args):
+            path = os.readlink(f"/proc/self/fd/{fd}")
+            self.watches[path] = (fd, condition, callback)
+            return self.original(priority, fd, condition, callback, *args)
+        GLib.unix_fd_add_full = add
+        return self
+
+    def __exit__(self, *exc):
+        GLib.unix_fd_add_full = self.original
+
+    def notify(self, root, attribute):
+        fd, condition, callback = self.watches[os.path.join(root, attribute)]
+        callback(fd, GLib.IOCondition.PRI)
+
+
+def test_listeners():
+    """Listeners fire only when a value actually changes"""
+    print("\nListeners...")
+    state = DeviceState()
+    changes = []
+    state.connect(lambda field, value: changes.append((field, value)))
+    updates = [
+        state.update("profile", "quiet"),
+        state.update("profile", "quiet"),
+        state.update("profile", None),
+        state.update("brightness", "low"),
+        state.update("profile", "balanced"),
+    ]
+    ok = (changes == [("profile", "quiet"), ("brightness", "low"), ("profile", "balanced")]
+          and updates == [True, False, False, True, True]
+          and state.matches("profile", "balanced") and not state.matches("rgb", None))
+    print("  PASS" if ok else f"  FAIL: {changes} {updates}")
+    return ok
+
+
+def test_sysfs_watches():
+    """platform_profile and brightness_hw_changed are watched with POLLPRI"""
+    print("\nsysfs watches...")
+    root = fake_sysfs()
+    state = DeviceState()
+    with WatchRecorder() as recorder:
+        sync = StateSync(state, AsusctlBackend(CommandRunner()), root)
+        sync.start()
+    loaded = dict(state.values)
+
+    write(root, PLATFORM_PROFILE, "performance")
+    write(root, KBD_BRIGHTNESS_HW_CHANGED, "3")
+    recorder.notify(root, PLATFORM_PROFILE)
+    recorder.notify(root, KBD_BRIGHTNESS_HW_CHANGED)
+    notified = dict(state.values)
+    sync.stop()
+
+    watched = sorted(os.path.relpath(path, root) for path in recorder.watches)
+    conditions = [condition for _, condition, _ in recorder.watches.values()]
+    print(f"  watched: {watched}")
+    ok = (watched == sorted([PLATFORM_PROFILE, KBD_BRIGHTNESS_HW_CHANGED])
+          and all(condition & GLib.IOCondition.PRI for condition in conditions)
+          and loaded["profile"] == "quiet" and loaded["brightness"] == "low" and loaded["charge_limit"] == 60
+          and notified["profile"] == "performance" and notified["brightness"] == "high"
+          and not sync.watches)
+    print("  PASS" if ok else f"  FAIL: loaded={loaded} notified={notified}")
+    return ok
+
+
+def reread_after(backend, root, state):
+    """Start a StateSync, change the quiet attributes, and wait past one re-read"""
+    device_state.REREAD_SECONDS = REREAD_TEST_SECONDS
+    sync = StateSync(state, backend, root)
+    sync.start()
+    write(root, KBD_BRIGHTNESS, "3")
+    write(root, CHARGE_LIMIT, "90")
+    # timeout_add_seconds may fire up to a second late
+    settle(REREAD_TEST_SECONDS * 2 + 0.2)
+    timer = sync.timer
+    sync.stop()
+    return timer
+
+
+def test_reread_without_asusd():
+    """Without asusd, attributes that never notify are re-read on a timer"""
+    print("\nRe-read without asusd...")
+    root = fake_sysfs()
+    state = DeviceState()
+    timer = reread_after(AsusctlBackend(CommandRunner()), root, state)
+    ok = timer is not None and state.get("brightness") == "high" and state.get("charge_limit") == 90
+    print("  PASS" if ok else f"  FAIL: {state.values}")
+    return ok
+
+
+def test_asusd_wins():
+    """With asusd, its values win over sysfs and nothing is re-read"""
+    print("\nasusd over sysfs...")
+    root = fake_sysfs()
+    state = DeviceState()
+    runner = CommandRunner()
+    backend = AsusdBackend(runner, Gio.bus_get_sync(Gio.BusType.SESSION, None))
+    timer = reread_after(backend, root, state)
+    loaded = dict(state.values)
+
+    # sysfs notifies of a change, but asusd already gave the profile
+    with WatchRecorder() as recorder:
+        sync = StateSync(state, backend, root)
+        sync.start()
+    write(root, PLATFORM_PROFILE, "performance")
+    recorder.notify(root, PLATFORM_PROFILE)
+    after_sysfs = state.get("profile")
+
+    # A change made through asusd arrives as PropertiesChanged
+    run_actions(backend, [("set_profile", ("quiet",))])
+    settle()
+    after_asusd = state.get("profile")
+    sync.stop()
+
+    print(f"  loaded {loaded}")
+    # fake_asusd starts balanced, brightness med (2), charge limit 80
+    ok = (timer is None and loaded["profile"] == "balanced" and loaded["brightness"] == "med"
+          and loaded["charge_limit"] == 80 and loaded["aura_mode"] == 0
+          and after_sysfs == "balanced" and after_asusd == "quiet")
+    print("  PASS" if ok else f"  FAIL: after sysfs={after_sysfs} after asusd={after_asusd}")
+    return ok
+
+
+def main():
+    print("AsusCtrl Device State Test")
+    print("=" * 50)
+
+    bus = start_session_bus()
+    daemon = start_fake_asusd()
+    try:
+        results = [
+            test_listeners(),
+            test_sysfs_watches(),
+            test_reread_without_asusd(),
+            test_asusd_wins(),
+        ]
+    finally:
+        daemon.terminate()
+        bus.terminate()
+
+    print()
+    if all(results):
+        print("All device state tests passed")
+    else:
+        print("Some device state tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test harness for coalescing Next/Previous clicks
+Drives StepCoalescer with bursts of clicks on a GLib main loop against the
+fake asusctl and checks how many backend calls they turn into
+"""
+
+import sys
+import tempfile
+
+from gi.repository import GLib
+
+from asusd_backend import AsusctlBackend, BRIGHTNESS_LEVELS
+from command_runner import CommandRunner
+from device_state import DeviceState
+from input_coalescer import StepCoalescer
+from test_command_runner import install_fake_asusctl, read_calls
+
+DEBOUNCE_MS = 100
+CLICK_INTERVAL_MS = 20
+
+
+class FailingBackend:
+    """Backend whose absolute sets always fail"""
+
+    def set_kbd_brightness(self, level, callback):
+        GLib.timeout_add(10, lambda: callback(f"-k {level}", False, "fake failure"))
+
+
+def run_clicks(coalescer, clicks, settle_ms=800, pause_after=None, pause_ms=0):
+    """Click coalescer.step() for each step in clicks, then run the loop until idle
+
+    With pause_after, the clicks pause for pause_ms after that many clicks.
+    Returns the state values seen right after each click.
+    """
+    loop = GLib.MainLoop()
+    seen = []
+    delay = 0
+    for n, step in enumerate(clicks):
+        if pause_after is not None and n == pause_after:
+            delay += pause_ms
+
+        def click(step=step):
+            coalescer.step(step)
+            seen.append(coalescer.state.get(coalescer.field))
+            return GLib.SOURCE_REMOVE
+        GLib.timeout_add(delay, click)
+        delay += CLICK_INTERVAL_MS
+    GLib.timeout_add(delay + settle_ms, loop.quit)
+    loop.run()
+    return seen
+
+
+def make_coalescer(state, backend, results):
+    def on_finished(action, success, output):
+        results.append((action, success, output))
+    return StepCoalescer(
+        state, "brightness", lambda: BRIGHTNESS_LEVELS,
+        backend.set_kbd_brightness, getattr(backend, "step_kbd_brightness", None),
+        on_finished, delay_ms=DEBOUNCE_MS
+    )
+
+
+def test_burst(log_path):
+    """Ten rapid clicks send one absolute set, and the UI follows every click"""
+    print("\nTen rapid Next clicks...")
+    state = DeviceState()
+    state.update("brightness", "off")
+    results = []
+    coalescer = make_coalescer(state, AsusctlBackend(CommandRunner()), results)
+    open(log_path, "w").close()
+
+    seen = run_clicks(coalescer, [1] * 10)
+    calls = [args for _, _, args in read_calls(log_path)]
+    expected = BRIGHTNESS_LEVELS[10 % len(BRIGHTNESS_LEVELS)]
+    print(f"  UI values: {' '.join(seen)}")
+    print(f"  Backend calls: {calls}")
+
+    ok = True
+    if seen != [BRIGHTNESS_LEVELS[n % 4] for n in range(1, 11)]:
+        print("  FAIL: UI did not follow each click")
+        ok = False
+    if calls != [f"-k {expected}"]:
+        print(f"  FAIL: expected one call to -k {expected}")
+        ok = False
+    if state.get("brightness") != expected or not results or not results[-1][1]:
+        print("  FAIL: final state or result is wrong")
+        ok = False
+    if ok:
+        print("  PASS")
+    return ok
+
+
+def test_burst_during_call(log_path):
+    """Clicks that continue while a set runs cost exactly one more call"""
+    print("\nClicks while the first set is still running...")
+    state = DeviceState()
+    state.update("brightness", "off")
+    results = []
+    coalescer = make_coalescer(state, AsusctlBackend(CommandRunner()), results)
+    open(log_path, "w").close()
+
+    # The fake asusctl takes 200 ms; the pause lets the first burst go out
+    run_clicks(coalescer, [1] * 5 + [-1] * 6, settle_ms=1000, pause_after=5, pause_ms=DEBOUNCE_MS + 30)
+    calls = [args for _, _, args in read_calls(log_path)]
+    print(f"  Backend calls: {calls}")
+
+    ok = len(calls) <= 2 and calls[-1] == "-k high" and state.get("brightness") == "high"
+    print("  PASS" if ok else "  FAIL: expected at most two calls ending at high")
+    return ok
+
+
+def test_failure_reverts():
+    """A failed set puts the confirmed value back in the state"""
+    print("\nFailed set reverts the optimistic value...")
+    state = DeviceState()
+    state.update("brightness", "low")
+    results = []
+    coalescer = make_coalescer(state, FailingBackend(), results)
+
+    seen = run_clicks(coalescer, [1, 1], settle_ms=300)
+    print(f"  UI values: {' '.join(seen)} -> {state.get('brightness')}")
+    ok = seen == ["med", "high"] and state.get("brightness") == "low" and coalescer.calls == 1
+    print("  PASS" if ok else "  FAIL: state was not reverted to low")
+    return ok
+
+
+def test_aura_known_mode(log_path):
+    """Even with the mode known, asusctl steps with -n/-p, so only supported modes are visited"""
+    print("\nAura mode clicks through asusctl after a static color...")
+    state = DeviceState()
+    state.update("aura_mode", 0)
+    backend = AsusctlBackend(CommandRunner())
+    results = []
+    coalescer = StepCoalescer(
+        state, "aura_mode", backend.aura_modes, backend.set_aura_mode, backend.step_aura_mode,
+        lambda action, success, output: results.append(success), delay_ms=DEBOUNCE_MS
+    )
+    open(log_path, "w").close()
+
+    run_clicks(coalescer, [1, 1, 1, -1, -1], settle_ms=600)
+    calls = [args for _, _, args in read_calls(log_path)]
+    print(f"  Backend calls: {calls} for 5 clicks")
+    ok = calls == ["aura -n"] and results == [True]
+    print("  PASS" if ok else "  FAIL: expected a single aura -n")
+    return ok
+
+
+def test_unknown_position(log_path):
+    """Without a known mode, opposite clicks cancel and the rest are stepped"""
+    print("\nStepping aura modes through asusctl...")
+    state = DeviceState()
+    backend = AsusctlBackend(CommandRunner())
+    results = []
+    coalescer = StepCoalescer(
+        state, "aura_mode", backend.aura_modes, None, backend.step_aura_mode,
+        lambda action, success, output: results.append(success), delay_ms=DEBOUNCE_MS
+    )
+    open(log_path, "w").close()
+
+    run_clicks(coalescer, [1, 1, -1, 1, -1, -1, 1], settle_ms=600)
+    calls = [args for _, _, args in read_calls(log_path)]
+    print(f"  Backend calls: {calls}")
+    ok = calls == ["aura -n"] and results == [True]
+    print("  PASS" if ok else "  FAIL: expected a single aura -n")
+    return ok
+
+
+def main():
+    print("AsusCtrl Input Coalescing Test")
+    print("=" * 50)
+
+    tmpdir = tempfile.mkdtemp(prefix="fake-asusctl-")
+    log_path = install_fake_asusctl(tmpdir, delay=0.2)
+
+    results = [
+        test_burst(log_path),
+        test_burst_during_call(log_path),
+        test_failure_reverts(),
+        test_aura_known_mode(log_path),
+        test_unknown_position(log_path),
+    ]
+    print()
+    print("=" * 50)
+    if all(results):
+        print("All coalescing tests passed")
+    else:
+        print("Some coalescing tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
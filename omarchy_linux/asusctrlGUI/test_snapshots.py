@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test harness for settings snapshots
+Saves and reloads snapshots, reads the file while it is being rewritten, and
+applies a snapshot through the fake asusctl to check that only differing
+settings are sent, concurrently, with one completion
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from gi.repository import GLib
+
+from asusd_backend import AsusctlBackend
+from command_runner import CommandRunner
+from device_state import DeviceState
+from snapshots import LAST_SESSION, SnapshotStore, apply_snapshot, plan
+from test_command_runner import install_fake_asusctl, read_calls
+
+DELAY = 0.2
+
+GAMING = {"profile": "performance", "brightness": "high", "charge_limit": 60,
+          "aura_mode": 0, "rgb": (255, 128, 0)}
+OFFICE = {"profile": "quiet", "brightness": "low", "charge_limit": 80,
+          "aura_mode": None, "rgb": None}
+
+
+def test_round_trip(tmpdir):
+    """Snapshots survive a reload, and unchanged saves do not write"""
+    print("\nSave, reload and save again...")
+    path = os.path.join(tmpdir, "config", "snapshots.json")
+    store = SnapshotStore(path)
+    store.save("Gaming", GAMING)
+    store.save("Office", OFFICE)
+    store.save("Gaming", dict(GAMING))
+    store.remember("brightness", "med")
+    store.write()
+
+    reloaded = SnapshotStore(path)
+    size = os.path.getsize(path)
+    leftovers = [name for name in os.listdir(os.path.dirname(path)) if name != "snapshots.json"]
+    print(f"  {len(reloaded.names())} snapshots in {size} bytes, {store.writes} writes")
+    ok = reloaded.get("Gaming") == GAMING and reloaded.get("Office") == OFFICE
+    ok = ok and reloaded.names() == [LAST_SESSION, "Gaming", "Office"] and reloaded.get(LAST_SESSION)["brightness"] == "med"
+    ok = ok and store.writes == 3 and not leftovers and size < 200
+    print("  PASS" if ok else f"  FAIL: {reloaded.snapshots} leftovers={leftovers}")
+    return ok
+
+
+def test_unreadable_file(tmpdir):
+    """A damaged file is ignored instead of stopping the GUI"""
+    print("\nLoading a damaged file...")
+    path = os.path.join(tmpdir, "damaged.json")
+    with open(path, "w") as f:
+        f.write('{"v":1,"s":{"Gaming":["perf')
+    store = SnapshotStore(path)
+    ok = store.names() == [] and store.save("Gaming", GAMING) and SnapshotStore(path).get("Gaming") == GAMING
+    print("  PASS" if ok else "  FAIL")
+    return ok
+
+
+def test_atomic_writes(tmpdir):
+    """A reader never sees a partly written file while it is rewritten"""
+    print("\nReading while the file is rewritten 200 times...")
+    path = os.path.join(tmpdir, "busy.json")
+    store = SnapshotStore(path)
+    store.save("Gaming", GAMING)
+    stop = threading.Event()
+    reads, torn = [0], []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with open(path) as f:
+                    json.load(f)
+                reads[0] += 1
+            except ValueError as e:
+                torn.append(e)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for n in range(200):
+        store.save(f"Snapshot {n % 20}", dict(OFFICE, charge_limit=50 + n % 50))
+    stop.set()
+    thread.join()
+    print(f"  {reads[0]} complete reads, {len(torn)} torn")
+    ok = not torn and reads[0] > 0
+    print("  PASS" if ok else "  FAIL")
+    return ok
+
+
+def run_snapshot(backend, snapshot, state):
+    """Apply snapshot on a main loop; returns (calls sent, results, seconds)"""
+    loop = GLib.MainLoop()
+    done = []
+
+    def on_done(results):
+        done.append(results)
+        loop.quit()
+
+    start = time.monotonic()
+    sent = apply_snapshot(backend, snapshot, state, on_done)
+    if not done:
+        GLib.timeout_add_seconds(5, loop.quit)
+        loop.run()
+    return sent, done, time.monotonic() - start
+
+
+def test_startup_apply(log_path):
+    """Only differing settings are sent, at the same time, with one completion"""
+    print("\nApplying a snapshot at startup...")
+    state = DeviceState()
+    for field, value in (("profile", "performance"), ("brightness", "med"), ("charge_limit", 80)):
+        state.update(field, value)
+    backend = AsusctlBackend(CommandRunner())
+    open(log_path, "w").close()
+
+    sent, done, elapsed = run_snapshot(backend, GAMING, state)
+    calls = sorted(args for _, _, args in read_calls(log_path))
+    print(f"  Backend calls: {calls} in {elapsed * 1000:.0f} ms")
+    again, done_again, _ = run_snapshot(backend, GAMING, state)
+    print(f"  Applying it again sends {again} call(s)")
+
+    ok = calls == ["-c 60", "-k high", "aura static -c ff8000"] and sent == 3
+    ok = ok and len(done) == 1 and all(success for _, success, _ in done[0])
+    ok = ok and elapsed < 2 * DELAY and state.get("rgb") == (255, 128, 0) and state.get("aura_mode") == 0
+    ok = ok and again == 0 and done_again == [[]]
+    print("  PASS" if ok else f"  FAIL: {done}")
+    return ok
+
+
+def test_mode_without_setter():
+    """asusctl cannot tell which modes the keyboard supports, so the mode is left alone"""
+    print("\nA non-static aura mode through asusctl...")
+    state = DeviceState()
+    calls = plan({"aura_mode": 2, "rgb": (0, 0, 255)}, state, AsusctlBackend(CommandRunner()))
+    ok = calls == []
+    print("  PASS" if ok else f"  FAIL: {calls}")
+    return ok
+
+
+def main():
+    print("AsusCtrl Snapshot Test")
+    print("=" * 50)
+
+    tmpdir = tempfile.mkdtemp(prefix="asusctrl-snapshots-")
+    log_path = install_fake_asusctl(tmpdir, delay=DELAY)
+
+    results = [
+        test_round_trip(tmpdir),
+        test_unreadable_file(tmpdir),
+        test_atomic_writes(tmpdir),
+        test_startup_apply(log_path),
+        test_mode_without_setter(),
+    ]
+    print()
+    print("=" * 50)
+    if all(results):
+        print("All snapshot tests passed")
+    else:
+        print("Some snapshot tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Compare the runtime of the diagnostics engine with the shell scripts
+Runs diagnose.py and test-input.sh / diagnose-boot.sh several times each and
+prints the median wall time. test-input.sh ends with a 3 s evtest capture
+that diagnose.py leaves out, so its time is shown with and without it.
+
+    sudo python3 bench_diagnose.py [--runs N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EVTEST_SECONDS = 3.0
+
+
+def time_command(args, runs):
+    """Median wall time of args in seconds, or None if it fails"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(args, cwd=HERE, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0 and args[0] == "bash":
+            return None
+    return statistics.median(times)
+
+
+def report(label, seconds, baseline=None):
+    if seconds is None:
+        print(f"  {label:<32} skipped (failed; needs root and the tools it calls)")
+        return
+    line = f"  {label:<32} {seconds * 1000:8.0f} ms"
+    if baseline:
+        line += f"   {baseline / seconds:5.1f}x faster"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark diagnose.py against the shell scripts")
+    parser.add_argument("--runs", type=int, default=5, help="runs per command (default: 5)")
+    args = parser.parse_args()
+
+    if os.geteuid() != 0:
+        print("Not running as root: the shell scripts will be skipped or incomplete")
+
+    python = [sys.executable, os.path.join(HERE, "diagnose.py")]
+    cases = [
+        ("input", ["bash", "test-input.sh"], EVTEST_SECONDS),
+        ("boot", ["bash", "diagnose-boot.sh"], 0.0),
+    ]
+    total_shell = total_python = 0.0
+    for profile, shell, interactive in cases:
+        print(f"\n{profile}:")
+        shell_time = time_command(shell, args.runs)
+        python_time = time_command(python + [profile, "--json", os.devnull], args.runs)
+        report(shell[1], shell_time)
+        if shell_time is not None and interactive:
+            report(f"{shell[1]} without evtest", shell_time - interactive)
+        baseline = shell_time - interactive if shell_time is not None else None
+        report(f"diagnose.py {profile}", python_time, baseline)
+        if baseline is not None:
+            total_shell += baseline
+            total_python += python_time
+
+    print("\nall:")
+    all_time = time_command(python + ["all", "--json", os.devnull], args.runs)
+    report("diagnose.py all", all_time, total_shell or None)
+    if total_shell:
+        print(f"  (shell scripts together: {total_shell * 1000:.0f} ms without evtest)")
+
+
+if __name__ == "__main__":
+    main()
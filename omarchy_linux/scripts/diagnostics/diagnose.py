@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+ROG Flow Z13 diagnostics engine
+Runs the checks of test-input.sh and diagnose-boot.sh from one snapshot of
+the system: the kernel log, /proc/modules and /proc/mounts are read once
+into memory, sysfs files and commands are read or run at most once, and
+independent checks run concurrently.
+
+    sudo python3 diagnose.py                 # input and boot checks
+    sudo python3 diagnose.py input --json report.json
+    python3 diagnose.py boot --root /tmp/fake-root     # against a fixture tree
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from hid_discovery import DeviceIndex
+
+GREEN = "\033[0;32m"
+YELLOW = "\033[1;33m"
+RED = "\033[0;31m"
+BLUE = "\033[0;34m"
+NC = "\033[0m"
+
+OK = "ok"
+WARN = "warn"
+FAIL = "fail"
+INFO = "info"
+SYMBOLS = {OK: f"{GREEN}✓{NC}", WARN: f"{YELLOW}⚠{NC}", FAIL: f"{RED}✗{NC}", INFO: f"{BLUE}•{NC}"}
+
+UDEV_RULE = "etc/udev/rules.d/99-rog-flow-z13-input.rules"
+KEYD_CONFIG = "etc/keyd/default.conf"
+# The mandatory SecureBoot variable, under EFI_GLOBAL_VARIABLE
+SECURE_BOOT_VAR = "sys/firmware/efi/efivars/SecureBoot-8be4df61-93ca-11d2-aa0d-00e098032b8c"
+EFI_VAR_WARN = 200
+
+KEYBOARD = (0x0B05, 0x1A30)
+
+
+class KernelLog:
+    """Kernel log lines, read once, with cached keyword searches"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.lower = [line.lower() for line in lines]
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def search(self, any_of, also=()):
+        """Lines containing any word in any_of and, if given, any word in also"""
+        key = (tuple(any_of), tuple(also))
+        with self.lock:
+            if key not in self.cache:
+                self.cache[key] = [
+                    line for line, lower in zip(self.lines, self.lower)
+                    if any(word in lower for word in any_of)
+                    and (not also or any(word in lower for word in also))
+                ]
+            return self.cache[key]
+
+
+def parse_kmsg(data):
+    """Message text of each /dev/kmsg record ("prio,seq,usec,flags;text")"""
+    lines = []
+    for record in data.decode(errors="replace").splitlines():
+        # Continuation lines (" KEY=value") carry device properties
+        if record.startswith(" "):
+            continue
+        header, sep, text = record.partition(";")
+        lines.append(text if sep else record)
+    return lines
+
+
+class Snapshot:
+    """Everything the checks look at, read once
+
+    root is "/" on a live system, or a fixture directory holding the same
+    layout (sys/, proc/, etc/, dev/kmsg as a plain file) plus commands.json,
+    which maps a command line to {"returncode", "stdout"}.
+    """
+
+    def __init__(self, root="/"):
+        self.root = root
+        self.fixture = os.path.abspath(root) != "/"
+        self.lock = threading.Lock()
+        self.results = {}
+        self.reads = {}
+        self.commands = {}
+        if self.fixture:
+            try:
+                with open(os.path.join(root, "commands.json")) as f:
+                    self.commands = json.load(f)
+            except OSError:
+                pass
+        self.kernel_log = KernelLog(self._read_kernel_log())
+        self.modules = {line.split()[0] for line in self.read("proc/modules").splitlines() if line}
+        self.mounts = [line.split() for line in self.read("proc/mounts").splitlines() if line]
+
+    def path(self, relative):
+        return os.path.join(self.root, relative)
+
+    def _read_kernel_log(self):
+        data = b""
+        try:
+            fd = os.open(self.path("dev/kmsg"), os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            fd = None
+        if fd is not None:
+            try:
+                while True:
+                    try:
+                        chunk = os.read(fd, 8192)
+                    except BlockingIOError:
+                        break
+                    except BrokenPipeError:
+                        continue
+                    if not chunk:
+                        break
+                    data += chunk
+            finally:
+                os.close(fd)
+            return parse_kmsg(data)
+        # /dev/kmsg needs root; dmesg may still be allowed
+        result = self.run("dmesg")
+        return result["stdout"].splitlines()
+
+    def _once(self, key, produce):
+        """Return produce() for key, computing it only once across threads"""
+        with self.lock:
+            future = self.results.get(key)
+            owner = future is None
+            if owner:
+                future = self.results[key] = Future()
+        if owner:
+            try:
+                future.set_result(produce())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def read(self, relative, default=""):
+        """Contents of a file under root, stripped; default if unreadable"""
+        def produce():
+            self.reads[relative] = self.reads.get(relative, 0) + 1
+            try:
+                with open(self.path(relative), errors="replace") as f:
+                    return f.read().strip()
+            except OSError:
+                return None
+        value = self._once(("read", relative), produce)
+        return default if value is None else value
+
+    def exists(self, relative):
+        return self._once(("exists", relative), lambda: os.path.exists(self.path(relative)))
+
+    def glob(self, pattern):
+        return self._once(("glob", pattern), lambda: sorted(
+            os.path.relpath(p, self.root) for p in glob.glob(self.path(pattern))))
+
+    def which(self, name):
+        if self.fixture:
+            return any(cmd.split()[0] == name for cmd in self.commands)
+        return shutil.which(name) is not None
+
+    def run(self, command):
+        """{"returncode", "stdout"} of a command line, run at most once"""
+        def produce():
+            if self.fixture:
+                return self.commands.get(command, {"returncode": 127, "stdout": ""})
+            try:
+                result = subprocess.run(command.split(), capture_output=True, text=True, timeout=10)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                return {"returncode": 127, "stdout": "", "error": str(e)}
+            return {"returncode": result.returncode, "stdout": result.stdout}
+        return self._once(("run", command), produce)
+
+
+class Result:
+    def __init__(self, status, message, details=None):
+        self.status = status
+        self.message = message
+        self.details = details or []
+
+    def to_dict(self):
+        return {"status": self.status, "message": self.message, "details": self.details}
+
+
+CHECKS = {"input": [], "boot": []}
+
+
+def check(profile, section):
+    """Register a check function returning a list of Results"""
+    def register(function):
+        CHECKS[profile].append((section, function))
+        return function
+    return register
+
+
+# Input checks (test-input.sh)
+
+@check("input", "Kernel Driver Status")
+def check_driver(snap):
+    results = []
+    if "hid_asus" in snap.modules:
+        results.append(Result(OK, "hid_asus driver is loaded"))
+    else:
+        results.append(Result(FAIL, "hid_asus driver NOT loaded"))
+    errors = [line for line in snap.kernel_log.search(["failed with error -12"]) if "asus" in line.lower()]
+    if errors:
+        results.append(Result(WARN, "hid_asus probe errors detected (error -12)", errors[:5]))
+    else:
+        results.append(Result(OK, "No hid_asus probe errors"))
+    return results
+
+
+@check("input", "Input Devices Detected")
+def check_input_devices(snap):
+    keyboards = snap.glob("dev/input/by-path/*kbd*")
+    touchpads = snap.glob("dev/input/by-path/*mouse*") + snap.glob("dev/input/by-path/*touchpad*")
+    results = []
+    if keyboards:
+        results.append(Result(OK, f"{len(keyboards)} keyboard device(s)", [os.path.basename(k) for k in keyboards]))
+    else:
+        results.append(Result(FAIL, "No keyboard devices found"))
+    results.append(Result(INFO, f"{len(touchpads)} touchpad/mouse device(s)", [os.path.basename(t) for t in touchpads]))
+    return results
+
+
+def libinput_block(output, names, lines=8):
+    """The device blocks of libinput list-devices whose name matches"""
+    found = []
+    rows = output.splitlines()
+    for i, row in enumerate(rows):
+        if row.startswith("Device:") and any(name in row for name in names):
+            found.append(" ".join(r.strip() for r in rows[i:i + lines] if r.strip()))
+    return found
+
+
+@check("input", "Keyboard HID Interfaces")
+def check_hid_interfaces(snap):
+    index = DeviceIndex(snap.path("sys"))
+    port = index.usb_port(*KEYBOARD)
+    if port is None:
+        return [Result(WARN, "Keyboard (0b05:1a30) not attached")]
+    interfaces = index.hid_interfaces(*KEYBOARD)
+    if not interfaces:
+        return [Result(FAIL, f"Keyboard on USB port {port} has no hidraw nodes")]
+    aura = index.aura_interface(*KEYBOARD)
+    details = [f"interface {i.interface}: {i.node} ({i.name}){' <- Aura' if i is aura and i.aura else ''}"
+               for i in interfaces]
+    results = [Result(OK, f"Keyboard on USB port {port}: {len(interfaces)} hidraw node(s)", details)]
+    if not aura.aura:
+        results.append(Result(WARN, "No keyboard interface on the Aura usage page"))
+    return results
+
+
+@check("input", "libinput Device Classification")
+def check_libinput(snap):
+    if not snap.which("libinput"):
+        return [Result(FAIL, "libinput not installed")]
+    output = snap.run("libinput list-devices")["stdout"]
+    results = []
+    for label, names in (("ASUS keyboard", ["GZ302EA-Keyboard", "Asus Keyboard"]),
+                         ("keyd virtual keyboard", ["keyd virtual keyboard"]),
+                         ("AT Translated keyboard", ["AT Translated"])):
+        blocks = libinput_block(output, names)
+        results.append(Result(INFO if blocks else WARN,
+                              f"{label}: {'found' if blocks else 'not found'}", blocks))
+    return results
+
+
+@check("input", "keyd Status")
+def check_keyd(snap):
+    if not snap.which("keyd"):
+        return [Result(FAIL, "keyd is NOT installed")]
+    results = [Result(OK, "keyd is installed")]
+    if snap.run("systemctl is-active keyd")["returncode"] == 0:
+        results.append(Result(OK, "keyd service is running"))
+    else:
+        results.append(Result(FAIL, "keyd service is NOT running"))
+    if snap.run("systemctl is-enabled keyd")["returncode"] == 0:
+        results.append(Result(OK, "keyd service is enabled"))
+    else:
+        results.append(Result(WARN, "keyd service is NOT enabled"))
+    if snap.exists(KEYD_CONFIG):
+        results.append(Result(OK, "keyd config exists"))
+    else:
+        results.append(Result(FAIL, "keyd config NOT found"))
+    return results
+
+
+@check("input", "udev Rules")
+def check_udev(snap):
+    if snap.exists(UDEV_RULE):
+        return [Result(OK, "ROG Flow Z13 udev rule installed")]
+    return [Result(FAIL, "ROG Flow Z13 udev rule NOT found")]
+
+
+# Boot checks (diagnose-boot.sh)
+
+@check("boot", "UEFI Boot Mode")
+def check_uefi(snap):
+    if snap.exists("sys/firmware/efi"):
+        size = snap.read("sys/firmware/efi/fw_platform_size", "unknown")
+        return [Result(OK, f"Booted in UEFI mode ({size}-bit)")]
+    return [Result(FAIL, "NOT in UEFI mode - this may cause boot issues")]
+
+
+@check("boot", "EFI Boot Configuration")
+def check_efibootmgr(snap):
+    result = snap.run("efibootmgr -v")
+    if result["returncode"] != 0:
+        return [Result(WARN, "efibootmgr failed or is not installed")]
+    lines = result["stdout"].splitlines()
+    order = next((line.split(":", 1)[1].strip() for line in lines if line.startswith("BootOrder:")), "unknown")
+    return [Result(INFO, f"Boot order: {order}", lines[:20])]
+
+
+@check("boot", "ASUS/Firmware Errors in Kernel Log")
+def check_firmware_errors(snap):
+    errors = snap.kernel_log.search(["asus", "firmware"], ["error", "fail", "warn"])
+    if errors:
+        return [Result(WARN, f"{len(errors)} potential ASUS/firmware issue(s)", errors[:10])]
+    return [Result(OK, "No critical ASUS/firmware errors found")]
+
+
+@check("boot", "System Firmware Information")
+def check_firmware_info(snap):
+    results = []
+    for label, attribute in (("BIOS Version", "bios_version"), ("BIOS Date", "bios_date"),
+                             ("Product", "product_name")):
+        value = snap.read(f"sys/class/dmi/id/{attribute}")
+        if value:
+            results.append(Result(INFO, f"{label}: {value}"))
+    return results
+
+
+@check("boot", "Secure Boot Status")
+def check_secure_boot(snap):
+    if not snap.exists(SECURE_BOOT_VAR):
+        return [Result(INFO, "Secure Boot: Not available")]
+    try:
+        with open(snap.path(SECURE_BOOT_VAR), "rb") as f:
+            # 4 bytes of variable attributes, then the value
+            data = f.read()
+    except OSError:
+        return [Result(INFO, "Secure Boot: Unknown")]
+    if len(data) >= 5 and data[4] == 1:
+        return [Result(WARN, "Secure Boot: Enabled")]
+    return [Result(OK, "Secure Boot: Disabled")]
+
+
+@check("boot", "EFI Variables Storage")
+def check_efivars(snap):
+    if not snap.exists("sys/firmware/efi/efivars"):
+        return [Result(FAIL, "EFI variables not accessible")]
+    count = len(snap.glob("sys/firmware/efi/efivars/*"))
+    if count > EFI_VAR_WARN:
+        return [Result(WARN, f"EFI Variables: {count} entries - may cause boot issues")]
+    return [Result(OK, f"EFI Variables: {count} entries")]
+
+
+@check("boot", "Boot Partition Check")
+def check_boot_partition(snap):
+    if not any(len(mount) > 1 and mount[1] == "/boot" for mount in snap.mounts):
+        return [Result(WARN, "/boot not separately mounted")]
+    try:
+        stat = os.statvfs(snap.path("boot"))
+        free = f"{stat.f_bavail * stat.f_frsize / 2**20:.0f}M available"
+    except OSError:
+        free = "free space unknown"
+    return [Result(OK, f"/boot is mounted, {free}")]
+
+
+@check("boot", "ACPI Error Check")
+def check_acpi(snap):
+    errors = snap.kernel_log.search(["acpi"], ["error", "fail"])
+    if errors:
+        return [Result(WARN, f"{len(errors)} ACPI error(s) detected", errors[:5])]
+    return [Result(OK, "No critical ACPI errors")]
+
+
+def recommendations(report):
+    """Follow-up steps for failed input checks, like test-input.sh's summary"""
+    messages = {result["message"] for section in report["sections"] for result in section["results"]}
+    steps = []
+    if "hid_asus driver NOT loaded" in messages:
+        steps.append("Load hid_asus driver: sudo modprobe hid_asus")
+    if "keyd is NOT installed" in messages:
+        steps.append("Install keyd: sudo pacman -S keyd")
+    if "keyd service is NOT running" in messages:
+        steps.append("Start keyd: sudo systemctl start keyd")
+    if "ROG Flow Z13 udev rule NOT found" in messages:
+        steps.append("Run the fix script: sudo ./scripts/setup/02-fix-keyboard.sh")
+    return steps
+
+
+def diagnose(profiles, root="/", workers=8, snap=None):
+    """Run the checks of profiles concurrently; returns a JSON-ready report"""
+    start = time.perf_counter()
+    snap = snap or Snapshot(root)
+    checks = [(profile, section, function) for profile in profiles for section, function in CHECKS[profile]]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(function, snap) for _, _, function in checks]
+    sections = []
+    for (profile, section, function), future in zip(checks, futures):
+        try:
+            results = future.result()
+        except Exception as e:
+            results = [Result(FAIL, f"check crashed: {e}")]
+        sections.append({"profile": profile, "section": section,
+                         "results": [result.to_dict() for result in results]})
+    report = {"profiles": list(profiles), "sections": sections}
+    report["recommendations"] = recommendations(report)
+    report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return report
+
+
+def print_report(report):
+    for n, section in enumerate(report["sections"], 1):
+        print(f"\n{GREEN}========================================{NC}")
+        print(f"{GREEN}{n}. {section['section']}{NC}")
+        print(f"{GREEN}========================================{NC}")
+        for result in section["results"]:
+            print(f"{SYMBOLS[result['status']]} {result['message']}")
+            for detail in result["details"]:
+                print(f"   {detail}")
+    if report["recommendations"]:
+        print(f"\n{YELLOW}Recommendations:{NC}")
+        for step in report["recommendations"]:
+            print(f"• {step}")
+    print(f"\nChecks finished in {report['elapsed_ms']:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diagnose ROG Flow Z13 input and boot issues")
+    parser.add_argument("profile", nargs="?", choices=["input", "boot", "all"], default="all")
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON (- for stdout only)")
+    parser.add_argument("--root", default="/", help="system root, or a fixture directory")
+    args = parser.parse_args()
+
+    if os.geteuid() != 0 and args.root == "/":
+        print(f"{YELLOW}Not running as root: the kernel log, libinput and efibootmgr may be incomplete{NC}")
+
+    profiles = ["input", "boot"] if args.profile == "all" else [args.profile]
+    report = diagnose(profiles, args.root)
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=1)
+        print()
+        return
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"JSON report saved to: {args.json}")
+    if any(result["status"] == FAIL for section in report["sections"] for result in section["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+../../../common/hid_discovery.py
\ No newline at end of file
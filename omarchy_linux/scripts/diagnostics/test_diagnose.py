@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Fixture test for the diagnostics engine
+Builds a fake system root in a temporary directory (sysfs, /proc, /etc, a
+kmsg file and canned command output) and checks the results and JSON report
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import diagnose
+from diagnose import FAIL, OK, WARN, Snapshot, diagnose as run_diagnose, parse_kmsg
+
+LIBINPUT = """Device:           ASUSTeK Computer Inc. GZ302EA-Keyboard
+Kernel:           /dev/input/event5
+Capabilities:     keyboard
+
+Device:           keyd virtual keyboard
+Kernel:           /dev/input/event20
+Capabilities:     keyboard
+"""
+
+
+def write(root, relative, value="", mode="w"):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode) as f:
+        f.write(value)
+
+
+def kmsg(*texts):
+    records = [f"6,{n},{n * 1000},-;{text}\n SUBSYSTEM=hid\n" for n, text in enumerate(texts)]
+    return "".join(records)
+
+
+def add_keyboard(root, with_hidraw=True):
+    """The keyboard on USB port 1-5, with its Aura interface bound to hidraw0"""
+    device = "sys/devices/pci0000:00/0000:00:14.0/usb1/1-5"
+    write(root, f"{device}/idVendor", "0b05\n")
+    write(root, f"{device}/idProduct", "1a30\n")
+    os.makedirs(os.path.join(root, "sys/bus/usb/devices"))
+    os.symlink(os.path.join(root, device), os.path.join(root, "sys/bus/usb/devices/1-5"))
+    if with_hidraw:
+        hid = f"{device}/1-5:1.0/0003:0B05:1A30.0001"
+        write(root, f"{hid}/report_descriptor", b"\x06\x31\xff\x09\x76", "wb")
+        os.makedirs(os.path.join(root, hid, "hidraw/hidraw0"))
+        os.makedirs(os.path.join(root, "sys/class/hidraw"))
+        os.symlink(os.path.join(root, hid, "hidraw/hidraw0"), os.path.join(root, "sys/class/hidraw/hidraw0"))
+
+
+def fake_root(healthy=True, efi_vars=10):
+    root = tempfile.mkdtemp(prefix="fake-root-")
+    write(root, "proc/modules", "hid_multitouch 45056 0 - Live 0x0\n"
+          + ("hid_asus 36864 0 - Live 0x0\n" if healthy else ""))
+    write(root, "proc/mounts", "/dev/nvme0n1p2 / ext4 rw 0 0\n"
+          + ("/dev/nvme0n1p1 /boot vfat rw 0 0\n" if healthy else ""))
+    messages = ["Linux version 6.17.0", "usb 1-5: new full-speed USB device"]
+    if not healthy:
+        messages += ["asus 0003:0B05:1A30.0002: probe failed with error -12",
+                     "ACPI Error: AE_NOT_FOUND, While resolving a named reference"]
+    write(root, "dev/kmsg", kmsg(*messages))
+    for name in ("usb-ASUSTeK_GZ302EA-Keyboard-event-kbd", "usb-ASUSTeK_GZ302EA-Keyboard-event-mouse"):
+        write(root, f"dev/input/by-path/{name}")
+    add_keyboard(root, with_hidraw=healthy)
+    write(root, "sys/firmware/efi/fw_platform_size", "64\n")
+    write(root, "sys/class/dmi/id/bios_version", "GZ302EA.308\n")
+    write(root, "sys/class/dmi/id/product_name", "ROG Flow Z13 GZ302EA\n")
+    write(root, diagnose.SECURE_BOOT_VAR, b"\x06\x00\x00\x00\x00", "wb")
+    for n in range(efi_vars - 1):
+        write(root, f"sys/firmware/efi/efivars/Boot{n:04X}-8be4df61-93ca-11d2-aa0d-00e098032b8c")
+    if healthy:
+        write(root, diagnose.KEYD_CONFIG, "[ids]\n*\n")
+        write(root, diagnose.UDEV_RULE, "# rule\n")
+    commands = {
+        "libinput list-devices": {"returncode": 0, "stdout": LIBINPUT},
+        "efibootmgr -v": {"returncode": 0, "stdout": "BootCurrent: 0001\nBootOrder: 0001,0000\n"},
+        "systemctl is-active keyd": {"returncode": 0 if healthy else 3, "stdout": ""},
+        "systemctl is-enabled keyd": {"returncode": 0 if healthy else 1, "stdout": ""},
+    }
+    if healthy:
+        commands["keyd --version"] = {"returncode": 0, "stdout": "keyd v2.5.0\n"}
+    write(root, "commands.json", json.dumps(commands))
+    return root
+
+
+def statuses(report):
+    return {result["message"]: result["status"]
+            for section in report["sections"] for result in section["results"]}
+
+
+def test_healthy():
+    """A healthy system has no failed checks"""
+    print("\nHealthy fixture...")
+    report = run_diagnose(["input", "boot"], fake_root())
+    found = statuses(report)
+    failed = [message for message, status in found.items() if status == FAIL]
+    ok = not failed and not report["recommendations"]
+    ok = ok and found.get("hid_asus driver is loaded") == OK
+    ok = ok and found.get("Booted in UEFI mode (64-bit)") == OK
+    ok = ok and found.get("Secure Boot: Disabled") == OK
+    ok = ok and found.get("Keyboard on USB port 1-5: 1 hidraw node(s)") == OK
+    print(f"  {len(found)} results in {report['elapsed_ms']} ms")
+    print("  PASS" if ok else f"  FAIL: {failed} {report['recommendations']}")
+    return ok
+
+
+def test_broken():
+    """Missing driver, keyd and udev rule fail, kernel errors warn"""
+    print("\nBroken fixture...")
+    report = run_diagnose(["input", "boot"], fake_root(healthy=False, efi_vars=250))
+    found = statuses(report)
+    expected = {
+        "hid_asus driver NOT loaded": FAIL,
+        "hid_asus probe errors detected (error -12)": WARN,
+        "keyd is NOT installed": FAIL,
+        "ROG Flow Z13 udev rule NOT found": FAIL,
+        "Keyboard on USB port 1-5 has no hidraw nodes": FAIL,
+        "1 ACPI error(s) detected": WARN,
+        "EFI Variables: 250 entries - may cause boot issues": WARN,
+        "/boot not separately mounted": WARN,
+    }
+    wrong = {message: found.get(message) for message, status in expected.items() if found.get(message) != status}
+    ok = not wrong and len(report["recommendations"]) == 3
+    print("  PASS" if ok else f"  FAIL: {wrong} {report['recommendations']}")
+    return ok
+
+
+def test_json_order():
+    """The JSON report keeps the registration order despite concurrency"""
+    print("\nJSON report...")
+    report = json.loads(json.dumps(run_diagnose(["input", "boot"], fake_root())))
+    sections = [section["section"] for section in report["sections"]]
+    expected = [section for profile in ("input", "boot") for section, _ in diagnose.CHECKS[profile]]
+    ok = sections == expected and report["profiles"] == ["input", "boot"]
+    print("  PASS" if ok else f"  FAIL: {sections}")
+    return ok
+
+
+def test_read_once():
+    """Each file is read once however many threads ask for it"""
+    print("\nConcurrent reads...")
+    snap = Snapshot(fake_root())
+    barrier = threading.Barrier(8)
+
+    def reader():
+        barrier.wait()
+        for _ in range(10):
+            snap.read("sys/class/dmi/id/bios_version")
+
+    threads = [threading.Thread(target=reader) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    run_diagnose(["input", "boot"], snap=snap)
+    ok = snap.reads.get("sys/class/dmi/id/bios_version") == 1 and set(snap.reads.values()) == {1}
+    print("  PASS" if ok else f"  FAIL: {snap.reads}")
+    return ok
+
+
+def test_parse_kmsg():
+    """Records are reduced to their text; property continuation lines are dropped"""
+    print("\nParsing kmsg records...")
+    lines = parse_kmsg(kmsg("first", "second; with a semicolon").encode())
+    ok = lines == ["first", "second; with a semicolon"]
+    print("  PASS" if ok else f"  FAIL: {lines}")
+    return ok
+
+
+def main():
+    print("Diagnostics Engine Test")
+    print("=" * 50)
+    results = [
+        test_parse_kmsg(),
+        test_healthy(),
+        test_broken(),
+        test_json_order(),
+        test_read_once(),
+    ]
+    print()
+    if all(results):
+        print("All tests passed")
+    else:
+        print("Some tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
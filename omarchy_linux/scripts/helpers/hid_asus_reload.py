@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Boot-time touchpad check for the ROG Flow Z13 detachable keyboard
+Reloads hid_asus only when the touchpad interface is not bound to it,
+instead of unconditionally on every boot
+
+Run by hid-asus-reload.service before the display manager. While the
+touchpad is still probing, kernel messages are followed through a
+non-blocking /dev/kmsg reader rather than by sleeping.
+
+    sudo python3 hid_asus_reload.py            # check, reload only if needed
+    sudo python3 hid_asus_reload.py --dry-run  # only report what it would do
+"""
+
+import argparse
+import glob
+import os
+import select
+import subprocess
+import sys
+import time
+
+HID_ID = "0003:0B05:1A30"
+# USB interface the touchpad is on; 0, 2 and 3 probe, 1 and 4 fail with -12
+TOUCHPAD_INTERFACE = "1.3"
+DRIVER = "asus"
+MODULE = "hid_asus"
+
+# How long a touchpad that is still probing gets before the module is reloaded
+PROBE_TIMEOUT = 2.0
+# How long the reloaded driver gets to bind the touchpad
+RELOAD_TIMEOUT = 5.0
+# What the old service always spent on the boot path besides the two modprobes
+OLD_SLEEP = 1.0
+
+OK = "ok"
+ABSENT = "absent"
+MISSING = "missing"
+WRONG_DRIVER = "wrong driver"
+
+
+def read_attribute(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def probe_touchpad(sysfs_root="/sys"):
+    """Return (status, detail) for the keyboard's touchpad
+
+    ABSENT if the keyboard is not attached, MISSING if its touchpad
+    interface has no HID device or input node yet, WRONG_DRIVER if it is
+    bound to something other than hid_asus (usually hid-generic).
+    """
+    devices = sorted(glob.glob(os.path.join(sysfs_root, "bus/hid/devices", f"{HID_ID}.*")))
+    if not devices:
+        return ABSENT, "keyboard not attached"
+    for link in devices:
+        device = os.path.realpath(link)
+        if not os.path.basename(os.path.dirname(device)).endswith(f":{TOUCHPAD_INTERFACE}"):
+            continue
+        driver = os.path.join(device, "driver")
+        driver = os.path.basename(os.path.realpath(driver)) if os.path.exists(driver) else None
+        if driver != DRIVER:
+            return WRONG_DRIVER, f"{os.path.basename(device)} bound to {driver or 'no driver'}"
+        for input_dir in glob.glob(os.path.join(device, "input", "input*")):
+            if glob.glob(os.path.join(input_dir, "event*")):
+                return OK, f"{read_attribute(os.path.join(input_dir, 'name'))} on {os.path.basename(device)}"
+        return MISSING, f"{os.path.basename(device)} has no input node yet"
+    return MISSING, f"no HID device on interface {TOUCHPAD_INTERFACE}"
+
+
+class KmsgReader:
+    """Non-blocking reader for /dev/kmsg records
+
+    Each read() of /dev/kmsg returns one record, "prio,seq,usec,flags;text";
+    a FIFO or pipe carrying several records per read works too. The reader
+    starts at the end of the buffer, so only new messages are seen.
+    """
+
+    def __init__(self, path="/dev/kmsg"):
+        self.fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        if path == "/dev/kmsg":
+            os.lseek(self.fd, 0, os.SEEK_END)
+
+    def messages(self):
+        """Return the text of every record available right now"""
+        texts = []
+        while True:
+            try:
+                data = os.read(self.fd, 8192)
+            except BlockingIOError:
+                break
+            except BrokenPipeError:
+                # Records were overwritten before we read them; carry on
+                continue
+            if not data:
+                break
+            for record in data.decode(errors="replace").splitlines():
+                header, sep, text = record.partition(";")
+                if sep:
+                    texts.append(text)
+        return texts
+
+    def wait(self, timeout):
+        """Block until a record arrives or timeout seconds pass"""
+        readable, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        return bool(readable)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def relevant(text):
+    return HID_ID in text.upper() or "Touchpad" in text
+
+
+def wait_for_touchpad(sysfs_root, kmsg, timeout, waiting=(MISSING,), clock=time.monotonic):
+    """Re-probe on each relevant kernel message while the status is in waiting
+
+    Gives up after timeout seconds; returns the last probe.
+    """
+    deadline = clock() + timeout
+    result = probe_touchpad(sysfs_root)
+    while result[0] in waiting and clock() < deadline:
+        if not kmsg.wait(deadline - clock()):
+            break
+        if any(relevant(text) for text in kmsg.messages()):
+            result = probe_touchpad(sysfs_root)
+    return result
+
+
+def reload_module(run=subprocess.run):
+    """Unload and load hid_asus; modprobe -r returns once the driver is gone, so no sleep"""
+    for args in (["modprobe", "-r", MODULE], ["modprobe", MODULE]):
+        result = run(args, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"{' '.join(args)} failed: {result.stderr.strip()}")
+            return False
+    return True
+
+
+def check(sysfs_root="/sys", kmsg_path="/dev/kmsg", dry_run=False, run=subprocess.run,
+          clock=time.monotonic):
+    """Check the touchpad and reload hid_asus only if needed; returns (reloaded, ok, seconds)"""
+    start = clock()
+    try:
+        kmsg = KmsgReader(kmsg_path)
+    except OSError as e:
+        print(f"Could not open {kmsg_path} ({e}), not waiting for kernel messages")
+        kmsg = None
+
+    status, detail = probe_touchpad(sysfs_root)
+    if status == MISSING and kmsg:
+        status, detail = wait_for_touchpad(sysfs_root, kmsg, PROBE_TIMEOUT, clock=clock)
+    print(f"Touchpad: {status} ({detail})")
+
+    reloaded = False
+    if status in (MISSING, WRONG_DRIVER) and not dry_run:
+        print(f"Reloading {MODULE}")
+        reloaded = reload_module(run)
+        # Between unload and load the touchpad briefly has no driver at all
+        status, detail = (wait_for_touchpad(sysfs_root, kmsg, RELOAD_TIMEOUT, (MISSING, WRONG_DRIVER), clock)
+                          if kmsg and reloaded else probe_touchpad(sysfs_root))
+        print(f"Touchpad after reload: {status} ({detail})")
+    if kmsg:
+        kmsg.close()
+    return reloaded, status in (OK, ABSENT), clock() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reload hid_asus only if the touchpad did not bind to it")
+    parser.add_argument("--dry-run", action="store_true", help="report, but do not reload")
+    parser.add_argument("--sysfs", default="/sys", help=argparse.SUPPRESS)
+    parser.add_argument("--kmsg", default="/dev/kmsg", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if os.geteuid() != 0 and not args.dry_run:
+        print("This needs root to reload hid_asus. Try running with sudo.")
+        sys.exit(1)
+
+    reloaded, ok, seconds = check(args.sysfs, args.kmsg, args.dry_run)
+    if reloaded:
+        print(f"Reloaded {MODULE}: {seconds * 1000:.0f} ms on the boot path, "
+              f"{(OLD_SLEEP - seconds) * 1000:.0f} ms less than the old fixed sleep plus reload")
+    elif ok:
+        print(f"No reload needed: {seconds * 1000:.0f} ms on the boot path, saving at least "
+              f"{(OLD_SLEEP - seconds) * 1000:.0f} ms plus two modprobe runs")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
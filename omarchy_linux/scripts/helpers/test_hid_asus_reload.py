@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Fake sysfs test for the boot-time hid_asus check
+Builds the keyboard's HID devices in a temporary directory, feeds kernel
+messages through a FIFO standing in for /dev/kmsg, and checks that the
+module is only reloaded when the touchpad is not bound to hid_asus
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import hid_asus_reload
+from hid_asus_reload import ABSENT, MISSING, OK, WRONG_DRIVER, KmsgReader, check, probe_touchpad
+
+USB = "devices/pci0000:00/0000:00:14.0/usb1/1-5"
+TOUCHPAD_HID = "0003:0B05:1A30.0004"
+
+
+def fake_sysfs(touchpad_driver="asus", with_input=True):
+    """Keyboard with interfaces 0 (keys) and 3 (touchpad)"""
+    root = tempfile.mkdtemp(prefix="fake-sysfs-")
+    for driver in ("asus", "hid-generic"):
+        os.makedirs(os.path.join(root, "bus/hid/drivers", driver))
+    os.makedirs(os.path.join(root, "bus/hid/devices"))
+    add_hid(root, "1.0", "0003:0B05:1A30.0001", "asus", "Keyboard")
+    add_hid(root, "1.3", TOUCHPAD_HID, touchpad_driver, "Touchpad" if with_input else None)
+    return root
+
+
+def add_hid(root, interface, name, driver, input_name):
+    device = os.path.join(root, USB, f"1-5:{interface}", name)
+    os.makedirs(device, exist_ok=True)
+    link = os.path.join(root, "bus/hid/devices", name)
+    if not os.path.lexists(link):
+        os.symlink(device, link)
+    bind(root, device, driver)
+    if input_name:
+        add_input(device, input_name)
+
+
+def bind(root, device, driver):
+    link = os.path.join(device, "driver")
+    if os.path.lexists(link):
+        os.remove(link)
+    if driver:
+        os.symlink(os.path.join(root, "bus/hid/drivers", driver), link)
+
+
+def add_input(device, input_name):
+    input_dir = os.path.join(device, "input", "input12")
+    os.makedirs(os.path.join(input_dir, "event9"), exist_ok=True)
+    with open(os.path.join(input_dir, "name"), "w") as f:
+        f.write(f"ASUSTeK Computer Inc. GZ302EA-Keyboard {input_name}\n")
+
+
+def touchpad_dir(root):
+    return os.path.join(root, USB, "1-5:1.3", TOUCHPAD_HID)
+
+
+def fake_kmsg():
+    """A FIFO standing in for /dev/kmsg; returns (path, writer)"""
+    path = os.path.join(tempfile.mkdtemp(prefix="fake-kmsg-"), "kmsg")
+    os.mkfifo(path)
+    return path
+
+
+def kmsg_record(text, seq=[0]):
+    seq[0] += 1
+    return f"6,{seq[0]},{int(time.monotonic() * 1e6)},-;{text}\n".encode()
+
+
+class FakeModprobe:
+    """Stands in for modprobe; on load, binds the touchpad to hid_asus"""
+
+    def __init__(self, root, kmsg_fd):
+        self.root = root
+        self.kmsg_fd = kmsg_fd
+        self.calls = []
+
+    def __call__(self, args, capture_output=True, text=True):
+        self.calls.append(" ".join(args))
+        device = touchpad_dir(self.root)
+        if "-r" in args:
+            bind(self.root, device, None)
+            shutil.rmtree(os.path.join(device, "input"), ignore_errors=True)
+        else:
+            bind(self.root, device, "asus")
+            add_input(device, "Touchpad")
+            os.write(self.kmsg_fd, kmsg_record(
+                f"input: ASUSTeK Computer Inc. GZ302EA-Keyboard Touchpad as /{USB}/1-5:1.3/{TOUCHPAD_HID}/input/input12"))
+        return subprocess.CompletedProcess(args, 0, "", "")
+
+
+def run_check(root, delayed=None):
+    """Run check() against root with a fake kmsg; delayed(fd) runs in a thread"""
+    kmsg_path = fake_kmsg()
+    kmsg_fd_holder = {}
+    # Opening a FIFO for writing blocks until the reader has opened it
+    opener = threading.Thread(target=lambda: kmsg_fd_holder.setdefault(
+        "fd", os.open(kmsg_path, os.O_WRONLY)))
+    opener.start()
+    reader_probe = os.open(kmsg_path, os.O_RDONLY | os.O_NONBLOCK)
+    opener.join()
+    fd = kmsg_fd_holder["fd"]
+    modprobe = FakeModprobe(root, fd)
+    if delayed:
+        threading.Thread(target=delayed, args=(fd,), daemon=True).start()
+    result = check(root, kmsg_path, run=modprobe)
+    os.close(fd)
+    os.close(reader_probe)
+    return result, modprobe.calls
+
+
+def test_probe_states():
+    """The touchpad state is read from the HID device on interface 3"""
+    print("\nProbing fake sysfs trees...")
+    cases = [
+        (fake_sysfs(), OK),
+        (fake_sysfs("hid-generic"), WRONG_DRIVER),
+        (fake_sysfs(with_input=False), MISSING),
+    ]
+    absent = tempfile.mkdtemp(prefix="fake-sysfs-")
+    os.makedirs(os.path.join(absent, "bus/hid/devices"))
+    cases.append((absent, ABSENT))
+    ok = True
+    for root, expected in cases:
+        status, detail = probe_touchpad(root)
+        if status != expected:
+            print(f"  FAIL: expected {expected}, got {status} ({detail})")
+            ok = False
+    if ok:
+        print("  PASS")
+    return ok
+
+
+def test_no_reload_when_bound():
+    """A touchpad bound to hid_asus is left alone"""
+    print("\nTouchpad already bound to hid_asus...")
+    (reloaded, ok, seconds), calls = run_check(fake_sysfs())
+    print(f"  {seconds * 1000:.1f} ms, modprobe calls: {calls}")
+    passed = ok and not reloaded and not calls and seconds < 0.1
+    print("  PASS" if passed else "  FAIL: expected no reload")
+    return passed
+
+
+def test_reload_when_generic():
+    """A touchpad bound to hid-generic is reloaded at once, without a sleep"""
+    print("\nTouchpad bound to hid-generic...")
+    root = fake_sysfs("hid-generic")
+    (reloaded, ok, seconds), calls = run_check(root)
+    print(f"  {seconds * 1000:.1f} ms, modprobe calls: {calls}")
+    passed = ok and reloaded and calls == ["modprobe -r hid_asus", "modprobe hid_asus"]
+    passed = passed and probe_touchpad(root)[0] == OK and seconds < hid_asus_reload.OLD_SLEEP
+    print("  PASS" if passed else "  FAIL: expected one reload that fixed the touchpad")
+    return passed
+
+
+def test_waits_for_late_probe():
+    """A touchpad still probing is waited for through kernel messages, not reloaded"""
+    print("\nTouchpad input appears 300 ms after the check starts...")
+    root = fake_sysfs(with_input=False)
+
+    def finish_probe(fd):
+        time.sleep(0.3)
+        add_input(touchpad_dir(root), "Touchpad")
+        os.write(fd, kmsg_record("asus 0003:0B05:1A30.0004: input,hidraw3: USB HID v1.10 Mouse"))
+
+    (reloaded, ok, seconds), calls = run_check(root, finish_probe)
+    print(f"  {seconds * 1000:.1f} ms, modprobe calls: {calls}")
+    passed = ok and not reloaded and not calls and 0.25 < seconds < hid_asus_reload.PROBE_TIMEOUT
+    print("  PASS" if passed else "  FAIL: expected to wait for the probe without reloading")
+    return passed
+
+
+def test_kmsg_reader():
+    """Records are split into their message text, and an empty FIFO does not block"""
+    print("\nReading kmsg records...")
+    path = fake_kmsg()
+    reader = KmsgReader(path)
+    fd = os.open(path, os.O_WRONLY)
+    empty = reader.messages()
+    os.write(fd, kmsg_record("first") + kmsg_record("second; with a semicolon"))
+    texts = reader.messages()
+    os.close(fd)
+    reader.close()
+    passed = empty == [] and texts == ["first", "second; with a semicolon"]
+    print("  PASS" if passed else f"  FAIL: {texts}")
+    return passed
+
+
+def main():
+    print("hid_asus Boot Check Test")
+    print("=" * 50)
+    results = [
+        test_probe_states(),
+        test_kmsg_reader(),
+        test_no_reload_when_bound(),
+        test_reload_when_generic(),
+        test_waits_for_late_probe(),
+    ]
+    print()
+    if all(results):
+        print("All tests passed")
+    else:
+        print("Some tests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
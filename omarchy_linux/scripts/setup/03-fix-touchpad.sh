@@ -16,6 +16,7 @@ fi
 echo "[INFO] Installing systemd service..."
 SCRIPT_DIR="$(cd "$(dirname "$0")/../.." && pwd)"
 cp -v "$SCRIPT_DIR/config/systemd/hid-asus-reload.service" /etc/systemd/system/
+install -v -m 755 "$SCRIPT_DIR/scripts/helpers/hid_asus_reload.py" /usr/local/bin/hid-asus-reload
 
 # Reload systemd
 echo "[INFO] Reloading systemd..."
@@ -33,7 +34,8 @@ echo ""
 echo "========================================"
 echo "[SUCCESS] Touchpad fix installed!"
 echo ""
-echo "The hid_asus module will be automatically reloaded on every boot."
+echo "On every boot the touchpad is checked, and hid_asus is reloaded only"
+echo "if the touchpad did not bind to it."
 echo "Your touchpad two-finger scrolling should work after each restart."
 echo ""
 echo "To check status: sudo systemctl status hid-asus-reload"
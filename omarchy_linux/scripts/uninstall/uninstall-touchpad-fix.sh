@@ -20,6 +20,7 @@ systemctl disable hid-asus-reload.service || true
 # Remove systemd service
 echo "[INFO] Removing systemd service..."
 rm -fv /etc/systemd/system/hid-asus-reload.service
+rm -fv /usr/local/bin/hid-asus-reload
 
 # Reload systemd
 echo "[INFO] Reloading systemd..."